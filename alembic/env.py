@@ -5,6 +5,7 @@ from sqlalchemy import pool
 
 from alembic import context
 from app.models.user_model import Base  # adjust "myapp.models" to the actual location of your Base
+import app.models.token_model  # noqa: F401 registers the refresh_tokens and revoked_tokens tables on Base.metadata
 
 
 # this is the Alembic Config object, which provides
@@ -0,0 +1,34 @@
+"""add users filter indexes
+
+Revision ID: 3b9d6f2a8c15
+Revises: e7a2c9d4f1b3
+Create Date: 2024-05-14 10:27:03.518462
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b9d6f2a8c15'
+down_revision: Union[str, None] = 'e7a2c9d4f1b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_users_role_created_at_id', 'users', ['role', 'created_at', 'id'], unique=False)
+    op.create_index('ix_users_last_login_at_id', 'users', ['last_login_at', 'id'], unique=False)
+    op.create_index('ix_users_locked_created_at_id', 'users', ['created_at', 'id'], unique=False, postgresql_where=sa.text('is_locked'))
+    op.create_index('ix_users_professional_created_at_id', 'users', ['created_at', 'id'], unique=False, postgresql_where=sa.text('is_professional'))
+    op.create_index('ix_users_unverified_created_at_id', 'users', ['created_at', 'id'], unique=False, postgresql_where=sa.text('NOT email_verified'))
+
+
+def downgrade() -> None:
+    op.drop_index('ix_users_unverified_created_at_id', table_name='users')
+    op.drop_index('ix_users_professional_created_at_id', table_name='users')
+    op.drop_index('ix_users_locked_created_at_id', table_name='users')
+    op.drop_index('ix_users_last_login_at_id', table_name='users')
+    op.drop_index('ix_users_role_created_at_id', table_name='users')
@@ -0,0 +1,30 @@
+"""add revoked tokens created_at
+
+Revision ID: 5c2f8e1a7d34
+Revises: 9a4e1c7b2d60
+Create Date: 2024-05-21 09:12:44.103527
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c2f8e1a7d34'
+down_revision: Union[str, None] = '9a4e1c7b2d60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('revoked_tokens', sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('clock_timestamp()'), nullable=False))
+    op.create_index(op.f('ix_revoked_tokens_created_at'), 'revoked_tokens', ['created_at'], unique=False)
+    op.drop_index('ix_revoked_tokens_revoked_at', table_name='revoked_tokens')
+
+
+def downgrade() -> None:
+    op.create_index('ix_revoked_tokens_revoked_at', 'revoked_tokens', ['revoked_at'], unique=False)
+    op.drop_index(op.f('ix_revoked_tokens_created_at'), table_name='revoked_tokens')
+    op.drop_column('revoked_tokens', 'created_at')
@@ -0,0 +1,36 @@
+"""add users search indexes
+
+Revision ID: 9a4e1c7b2d60
+Revises: 3b9d6f2a8c15
+Create Date: 2024-05-17 14:02:51.390127
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a4e1c7b2d60'
+down_revision: Union[str, None] = '3b9d6f2a8c15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SEARCH_COLUMNS = ('nickname', 'email', 'first_name', 'last_name')
+
+
+def upgrade() -> None:
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for column in SEARCH_COLUMNS:
+        op.create_index(f'ix_users_{column}_trgm', 'users', [column], unique=False, postgresql_using='gin', postgresql_ops={column: 'gin_trgm_ops'})
+    op.create_index('ix_users_nickname_prefix', 'users', [sa.text('nickname COLLATE "C"')], unique=False, postgresql_include=['id'])
+    op.create_index('ix_users_email_prefix', 'users', [sa.text('email COLLATE "C"')], unique=False, postgresql_include=['id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_users_email_prefix', table_name='users')
+    op.drop_index('ix_users_nickname_prefix', table_name='users')
+    for column in reversed(SEARCH_COLUMNS):
+        op.drop_index(f'ix_users_{column}_trgm', table_name='users')
+    # The pg_trgm extension is left installed; other objects in the database may depend on it
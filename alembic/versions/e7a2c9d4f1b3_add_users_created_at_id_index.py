@@ -0,0 +1,26 @@
+"""add users created_at id index
+
+Revision ID: e7a2c9d4f1b3
+Revises: c41e7a9b5d20
+Create Date: 2024-05-10 09:12:44.730215
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7a2c9d4f1b3'
+down_revision: Union[str, None] = 'c41e7a9b5d20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_users_created_at_id', 'users', ['created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_users_created_at_id', table_name='users')
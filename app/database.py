@@ -1,21 +1,274 @@
+from builtins import BaseException, Exception, bool, dict, enumerate, float, int, len, list, max, round, str, super
+import asyncio
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+import logging
+import threading
+import time
+from typing import List, Optional
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.orm import Session, declarative_base, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from settings.config import settings as default_settings
+from app.utils.metrics import register_metrics_source
 
 Base = declarative_base()
+logger = logging.getLogger(__name__)
+
+# Set once the current request has committed a write, so its later reads see it
+_request_wrote: ContextVar[bool] = ContextVar("request_wrote", default=False)
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Queue pool that records how long each checkout waited for a connection.
+
+    The wait covers both queuing behind other checkouts when the pool and its overflow are exhausted
+    and opening a new connection, which is what a request actually experiences.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.checkout_timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except Exception:
+            with self._stats_lock:
+                self.checkout_timeouts += 1
+            raise
+        waited = time.perf_counter() - started
+        with self._stats_lock:
+            self.checkouts += 1
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+        return connection
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            checkouts, total_wait, max_wait, timeouts = self.checkouts, self.total_wait, self.max_wait, self.checkout_timeouts
+        return {
+            "pool_size": self.size(),
+            "checked_out": self.checkedout(),
+            "idle": self.checkedin(),
+            "overflow": max(0, self.overflow()),
+            "max_overflow": self._max_overflow,
+            "checkouts": checkouts,
+            "checkout_failures": timeouts,
+            "avg_checkout_wait_ms": round(total_wait / checkouts * 1000, 3) if checkouts else 0.0,
+            "max_checkout_wait_ms": round(max_wait * 1000, 3),
+        }
+
+def engine_options(settings, database_url: str) -> dict:
+    """
+    Translates the `db_*` settings into keyword arguments for `create_async_engine`.
+
+    Driver-level options (statement cache, timeouts) are only passed for asyncpg URLs.
+    """
+    options = {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout_seconds,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+        "pool_recycle": settings.db_pool_recycle_seconds,
+    }
+    if "+asyncpg" in database_url:
+        connect_args = {
+            # SQLAlchemy's per-connection cache of asyncpg prepared statements, and asyncpg's own cache;
+            # both must be 0 behind a transaction-pooling PgBouncer.
+            "prepared_statement_cache_size": settings.db_statement_cache_size,
+            "statement_cache_size": settings.db_statement_cache_size,
+            "timeout": settings.db_connect_timeout_seconds,
+        }
+        if settings.db_command_timeout_seconds > 0:
+            connect_args["command_timeout"] = settings.db_command_timeout_seconds
+        options["connect_args"] = connect_args
+    return options
+
+def build_engine(database_url: str, echo: bool = False, settings=None):
+    """Creates the async engine with the pool and driver options from `settings`."""
+    settings = settings or default_settings
+    options = engine_options(settings, database_url)
+    return create_async_engine(database_url, echo=echo, future=True, **options)
+
+def read_only_options(settings) -> dict:
+    """
+    Execution options that make every transaction on a connection READ ONLY.
+
+    With `db_read_deferrable` the transactions are also SERIALIZABLE DEFERRABLE: they wait for a safe
+    snapshot once at the start and can then never fail with a serialization error.
+    """
+    options = {"postgresql_readonly": True}
+    if settings.db_read_deferrable:
+        options.update(postgresql_deferrable=True, isolation_level="SERIALIZABLE")
+    return options
+
+@asynccontextmanager
+async def unit_of_work(session: AsyncSession):
+    """
+    Groups the writes made in the block into one transaction on `session`.
+
+    Commits when the block completes and rolls back if it raises, so callers never leave a
+    half-applied change in the session.
+    """
+    try:
+        yield session
+    except BaseException:
+        await session.rollback()
+        raise
+    await session.commit()
+    mark_request_wrote()
+
+def mark_request_wrote():
+    """Routes the rest of the current request's reads to the primary."""
+    _request_wrote.set(True)
+
+# Zero when the replica has replayed everything it received, otherwise the age of the last replayed
+# transaction. Also zero on a server that is not in recovery, i.e. a primary.
+REPLICA_LAG_QUERY = text(
+    "SELECT CASE WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+class ReplicaRouter:
+    """
+    Picks the engine each read-only session statement runs on.
+
+    Reads go round-robin to the replicas whose last measured lag is within `max_lag_seconds`, and fall
+    back to the primary when no replica qualifies or the current request has already written. Lag is
+    measured on every replica every `check_interval` seconds by a background task, so requests only
+    read the last measurement; a replica that cannot be reached counts as too far behind until the
+    next check.
+    """
+
+    def __init__(self, primary, replicas: List, max_lag_seconds: float, check_interval: float):
+        self.primary = primary
+        self.replicas = replicas
+        self.max_lag_seconds = max_lag_seconds
+        self.check_interval = check_interval
+        self._lags: List[Optional[float]] = [None] * len(replicas)
+        self._check_task: Optional[asyncio.Task] = None
+        self._next_replica = 0
+        self.replica_reads = 0
+        self.primary_reads = 0
+        self.read_your_writes = 0
+
+    async def _measure_lag(self, engine) -> Optional[float]:
+        try:
+            async with engine.connect() as connection:
+                return float((await connection.execute(REPLICA_LAG_QUERY)).scalar())
+        except Exception as e:
+            logger.warning(f"Replica lag check failed for {engine.url.render_as_string(hide_password=True)}: {e}")
+            return None
+
+    async def refresh(self):
+        """Measures the lag of every replica."""
+        self._lags = list(await asyncio.gather(*(self._measure_lag(engine) for engine in self.replicas)))
+
+    async def _check_in_background(self):
+        while True:
+            await self.refresh()
+            await asyncio.sleep(self.check_interval)
+
+    def start(self):
+        """Starts measuring replica lag in the background, when there are replicas."""
+        if self.replicas and (self._check_task is None or self._check_task.done()):
+            self._check_task = asyncio.get_running_loop().create_task(self._check_in_background())
+
+    async def stop(self):
+        """Cancels the background lag checks."""
+        if self._check_task is not None and not self._check_task.done():
+            self._check_task.cancel()
+            try:
+                await self._check_task
+            except asyncio.CancelledError:
+                pass
+        self._check_task = None
+
+    def bind_for_read(self, current=None):
+        """
+        Returns the sync engine the next read should use.
+
+        `current` is the engine the session already reads from; it is kept, so one session does not
+        spread its reads over several connections, unless the request has since written.
+        """
+        if _request_wrote.get():
+            self.read_your_writes += 1
+            self.primary_reads += 1
+            return self.primary.sync_engine
+        if current is not None:
+            return current
+        healthy = [index for index, lag in enumerate(self._lags) if lag is not None and lag <= self.max_lag_seconds]
+        if not healthy:
+            self.primary_reads += 1
+            return self.primary.sync_engine
+        self._next_replica = (self._next_replica + 1) % len(healthy)
+        self.replica_reads += 1
+        return self.replicas[healthy[self._next_replica]].sync_engine
+
+    def stats(self) -> dict:
+        return {
+            "replicas": len(self.replicas),
+            "replica_lag_seconds": self._lags,
+            "max_lag_seconds": self.max_lag_seconds,
+            "replica_reads": self.replica_reads,
+            "primary_reads": self.primary_reads,
+            "read_your_writes": self.read_your_writes,
+        }
+
+class RoutingSession(Session):
+    """Session that asks the `ReplicaRouter` in its `info` which engine to use for every statement."""
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        bind = self.info["router"].bind_for_read(self.info.get("bind"))
+        self.info["bind"] = bind
+        return bind
 
 class Database:
     """Handles database connections and sessions."""
     _engine = None
+    _replica_engines = []
     _session_factory = None
+    _read_session_factory = None
+    router = None
 
     @classmethod
-    def initialize(cls, database_url: str, echo: bool = False):
-        """Initialize the async engine and sessionmaker."""
+    def initialize(cls, database_url: str, echo: bool = False, settings=None, replica_urls: Optional[List[str]] = None):
+        """
+        Initialize the async engines and sessionmakers.
+
+        Writes always use the primary at `database_url`. Read-only sessions are routed by a
+        `ReplicaRouter` across `replica_urls` (default: `settings.database_replica_urls`), or simply use
+        the primary when there are none.
+        """
         if cls._engine is None:  # Ensure engine is created once
-            cls._engine = create_async_engine(database_url, echo=echo, future=True)
+            settings = settings or default_settings
+            if replica_urls is None:
+                replica_urls = settings.database_replica_urls
+            cls._engine = build_engine(database_url, echo, settings)
+            cls._replica_engines = [build_engine(url, echo, settings) for url in replica_urls]
             cls._session_factory = sessionmaker(
                 bind=cls._engine, class_=AsyncSession, expire_on_commit=False, future=True
             )
+            # Transactions on read sessions start READ ONLY and are never committed
+            read_only = read_only_options(settings)
+            cls.router = ReplicaRouter(
+                cls._engine.execution_options(**read_only),
+                [engine.execution_options(**read_only) for engine in cls._replica_engines],
+                settings.db_replica_max_lag_seconds,
+                settings.db_replica_lag_check_seconds,
+            )
+            cls._read_session_factory = sessionmaker(
+                class_=AsyncSession, sync_session_class=RoutingSession, info={"router": cls.router},
+                expire_on_commit=False, future=True
+            )
 
     @classmethod
     def get_session_factory(cls):
@@ -23,3 +276,35 @@ class Database:
         if cls._session_factory is None:
             raise ValueError("Database not initialized. Call `initialize()` first.")
         return cls._session_factory
+
+    @classmethod
+    def get_read_session_factory(cls):
+        """Returns the factory for read-only sessions, ensuring it's initialized."""
+        if cls._read_session_factory is None:
+            raise ValueError("Database not initialized. Call `initialize()` first.")
+        return cls._read_session_factory
+
+    @classmethod
+    def pool_stats(cls) -> dict:
+        """Reports this worker's connection pool usage and checkout waits."""
+        if cls._engine is None:
+            return {"initialized": False}
+        stats = cls._engine_pool_stats(cls._engine)
+        if cls._replica_engines:
+            stats["replicas"] = [cls._engine_pool_stats(engine) for engine in cls._replica_engines]
+        return stats
+
+    @staticmethod
+    def _engine_pool_stats(engine) -> dict:
+        pool = engine.pool
+        if isinstance(pool, InstrumentedQueuePool):
+            return pool.stats()
+        return {"status": pool.status()}
+
+    @classmethod
+    def routing_stats(cls) -> dict:
+        """Reports where read-only sessions sent their reads."""
+        return cls.router.stats() if cls.router else {"initialized": False}
+
+register_metrics_source("database_pool", Database.pool_stats)
+register_metrics_source("read_routing", Database.routing_stats)
@@ -1,14 +1,23 @@
 from builtins import Exception, dict, str
 from fastapi import Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
+from pydantic import ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import AsyncGenerator
 from app.database import Database
+from app.schemas.token_schema import AccessTokenClaims
 from app.utils.template_manager import TemplateManager
 from app.services.email_service import EmailService
-from app.services.jwt_service import decode_token
+from app.services.jwt_service import decode_token_cached
+from app.services.token_revocation_service import revocation_list
+from app.utils.concurrency import ConcurrencyLimitExceeded, ConcurrencyLimiter
+from app.utils.metrics import register_metrics_source
+from app.utils.permissions import permissions_for, role_bit, roles_mask, route_permission
 from settings.config import Settings
 from fastapi import Depends
+from logging import getLogger
+
+logger = getLogger(__name__)
 
 def get_settings() -> Settings:
     """Return application settings."""
@@ -24,27 +33,92 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
     async with async_session_factory() as session:
         try:
             yield session
+        except (HTTPException, ConcurrencyLimitExceeded):
+            # Overload errors reach their own handlers, which answer with a retryable status
+            raise
+        except Exception as e:
+            logger.exception("Unhandled error in database session: %s", e)
+            raise HTTPException(status_code=500, detail="An unexpected error occurred.")
+
+async def get_read_session_factory():
+    """
+    Dependency that provides the read-only session factory, for responses that read from the
+    database after the request's dependencies have been closed, such as streamed exports.
+    """
+    return Database.get_read_session_factory()
+
+async def get_read_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Dependency that provides a read-only database session for endpoints that only look data up.
+
+    Its transaction is READ ONLY and is never committed; it is rolled back when the connection
+    returns to the pool, after the response has been sent. Statements run on a replica when one is
+    configured and within the lag threshold, otherwise on the primary.
+    """
+    async_session_factory = Database.get_read_session_factory()
+    async with async_session_factory() as session:
+        try:
+            yield session
+        except (HTTPException, ConcurrencyLimitExceeded):
+            # Overload errors reach their own handlers, which answer with a retryable status
+            raise
         except Exception as e:
-            raise HTTPException(status_code=500, detail=str(e))
-        
+            logger.exception("Unhandled error in database session: %s", e)
+            raise HTTPException(status_code=500, detail="An unexpected error occurred.")
+
+_settings = get_settings()
+auth_admission = ConcurrencyLimiter("auth admission", _settings.auth_max_in_flight, _settings.auth_max_wait_seconds)
+register_metrics_source("auth_admission", auth_admission.stats)
+
+async def limit_auth_concurrency() -> AsyncGenerator[None, None]:
+    """
+    Dependency that admits a bounded number of concurrent login/register requests.
+
+    Requests that cannot get a slot within `auth_max_wait_seconds` are shed with a 429 so password
+    hashing bursts cannot starve the rest of the API.
+    """
+    try:
+        await auth_admission.acquire()
+    except ConcurrencyLimitExceeded:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many authentication requests. Please retry shortly.",
+            headers={"Retry-After": str(_settings.auth_retry_after_seconds)},
+        )
+    try:
+        yield
+    finally:
+        auth_admission.release()
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/login")
 
 # In app/dependencies.py
-def get_current_user(token: str = Depends(oauth2_scheme)):
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
     credentials_exception = HTTPException(
         status_code=401,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    payload = decode_token(token)
+    payload = decode_token_cached(token)
     if payload is None:
         raise credentials_exception
-    user_id: str = payload.get("sub")
-    user_role: str = payload.get("role")
-    if user_id is None or user_role is None:
+    try:
+        claims = AccessTokenClaims.model_validate(payload)
+    except ValidationError:
+        raise credentials_exception
+    if claims.subject_is_email and not _settings.jwt_accept_email_subject:
         raise credentials_exception
-    return {"user_id": user_id, "role": user_role}
+    await revocation_list.refresh_if_stale(db)
+    if revocation_list.is_revoked(payload):
+        raise credentials_exception
+    # Legacy tokens identify the user by email only; routes that need the id look it up
+    return {
+        "user_id": None if claims.subject_is_email else claims.sub,
+        "email": claims.sub if claims.subject_is_email else None,
+        "role": claims.role,
+        "jti": claims.jti,
+        "exp": claims.exp,
+    }
 
 def require_role(roles):
     """
@@ -56,18 +130,32 @@ def require_role(roles):
     # Convert to list if a single role was provided
     if isinstance(roles, str):
         roles = [roles]
+    # Compile the allowed roles once, so each request is a single bitwise AND
+    allowed_roles = roles_mask(roles)
     
-    def role_checker(current_user: dict = Depends(get_current_user)):
-        # Get user role from the token and convert to uppercase for consistent comparison
-        user_role = current_user.get("role", "").upper()
-        
-        # Convert all required roles to uppercase for consistent comparison
-        required_roles = [r.upper() for r in roles]
-        
-        if user_role not in required_roles:
+    async def role_checker(current_user: dict = Depends(get_current_user)):
+        if not role_bit(current_user.get("role", "")) & allowed_roles:
             raise HTTPException(
                 status_code=403, 
                 detail=f"Operation not permitted. Required roles: {', '.join(roles)}"
             )
         return current_user
     return role_checker
+
+def authorize(route_name: str):
+    """
+    Dependency that enforces the policy declared for a route in `app.utils.permissions.ROUTE_POLICIES`.
+
+    The required permission is resolved when the route is declared, so a route without a policy fails
+    at startup and each request only ANDs the caller's permission mask with the required bit.
+
+    Args:
+        route_name: Name of the route, as used in `ROUTE_POLICIES`.
+    """
+    required = route_permission(route_name)
+
+    async def permission_checker(current_user: dict = Depends(get_current_user)):
+        if not permissions_for(current_user.get("role", "")) & required:
+            raise HTTPException(status_code=403, detail="Operation not permitted.")
+        return current_user
+    return permission_checker
@@ -4,8 +4,11 @@ from starlette.responses import JSONResponse
 from starlette.middleware.cors import CORSMiddleware  # Import the CORSMiddleware
 from app.database import Database
 from app.dependencies import get_settings
-from app.routers import user_routes
+from app.routers import metrics_routes, user_routes
+from app.services.nickname_service import nickname_pool
+from app.services.token_purge_service import token_purger
 from app.utils.api_description import getDescription
+from app.utils.security import PasswordHashingBusyError, calibrate_password_hashing, hashing_pool
 app = FastAPI(
     title="User Management",
     description=getDescription(),
@@ -31,12 +34,29 @@ app.add_middleware(
 @app.on_event("startup")
 async def startup_event():
     settings = get_settings()
-    Database.initialize(settings.database_url, settings.debug)
+    Database.initialize(settings.database_url, settings.debug, settings)
+    Database.router.start()
+    nickname_pool.start(Database.get_session_factory())
+    token_purger.start(Database.get_session_factory())
+    if settings.password_hash_target_ms > 0:
+        calibrate_password_hashing(settings.password_hash_target_ms)
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await nickname_pool.stop()
+    await token_purger.stop()
+    await Database.router.stop()
+    hashing_pool.shutdown()
+
+@app.exception_handler(PasswordHashingBusyError)
+async def password_hashing_busy_handler(request, exc):
+    return JSONResponse(status_code=503, content={"message": "Server is busy, please retry shortly."}, headers={"Retry-After": "1"})
 
 @app.exception_handler(Exception)
 async def exception_handler(request, exc):
     return JSONResponse(status_code=500, content={"message": "An unexpected error occurred."})
 
 app.include_router(user_routes.router)
+app.include_router(metrics_routes.router)
 
 
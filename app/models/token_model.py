@@ -0,0 +1,64 @@
+from builtins import str
+from datetime import datetime
+import uuid
+from sqlalchemy import Column, String, DateTime, ForeignKey, func
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+from app.database import Base
+
+class RefreshToken(Base):
+    """
+    Represents an issued refresh token, corresponding to the 'refresh_tokens' table in the database.
+    Only a SHA-256 digest of the token is stored, so a database leak does not expose usable tokens.
+
+    Attributes:
+        id (UUID): Unique identifier for the token row.
+        user_id (UUID): The user the token was issued to.
+        family_id (UUID): Shared by every token in one rotation chain, starting at login.
+        token_hash (str): Hex SHA-256 digest of the opaque token handed to the client.
+        expires_at (datetime): Time after which the token can no longer be used.
+        revoked_at (datetime): Time the token was rotated or revoked; null while it is usable.
+        replaced_by (UUID): The token issued when this one was rotated.
+        created_at (datetime): Timestamp when the token was issued, set by the server.
+    """
+    __tablename__ = "refresh_tokens"
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id: Mapped[uuid.UUID] = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    family_id: Mapped[uuid.UUID] = Column(UUID(as_uuid=True), nullable=False, index=True)
+    token_hash: Mapped[str] = Column(String(64), unique=True, nullable=False, index=True)
+    expires_at: Mapped[datetime] = Column(DateTime(timezone=True), nullable=False)
+    revoked_at: Mapped[datetime] = Column(DateTime(timezone=True), nullable=True)
+    replaced_by: Mapped[uuid.UUID] = Column(UUID(as_uuid=True), nullable=True)
+    created_at: Mapped[datetime] = Column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self) -> str:
+        """Provides a readable representation of a refresh token without exposing its hash."""
+        return f"<RefreshToken {self.id}, User: {self.user_id}>"
+
+class RevokedToken(Base):
+    """
+    Represents a revocation of access tokens, corresponding to the 'revoked_tokens' table in the database.
+    A row revokes either one token by its `jti`, or every token of a subject issued up to `revoked_at`.
+
+    Attributes:
+        id (UUID): Unique identifier for the revocation.
+        jti (str): JWT ID of the single revoked token, if revoking one token.
+        subject (str): JWT subject whose earlier tokens are revoked, if revoking a user.
+        revoked_at (datetime): Timestamp of the revocation; for a subject, set by the app, on the clock tokens are issued by.
+        expires_at (datetime): Time after which every affected token has expired and the row can be pruned.
+        created_at (datetime): When the row was written, on the database's clock; only used by workers
+            to load the revocations they have not seen yet.
+    """
+    __tablename__ = "revoked_tokens"
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    jti: Mapped[str] = Column(String(64), nullable=True, index=True)
+    subject: Mapped[str] = Column(String(255), nullable=True, index=True)
+    revoked_at: Mapped[datetime] = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    expires_at: Mapped[datetime] = Column(DateTime(timezone=True), nullable=False)
+    created_at: Mapped[datetime] = Column(DateTime(timezone=True), server_default=func.clock_timestamp(), nullable=False, index=True)
+
+    def __repr__(self) -> str:
+        """Provides a readable representation of a token revocation."""
+        return f"<RevokedToken jti={self.jti}, subject={self.subject}>"
@@ -3,12 +3,20 @@ from datetime import datetime
 from enum import Enum
 import uuid
 from sqlalchemy import (
-    Column, String, Integer, DateTime, Boolean, func, Enum as SQLAlchemyEnum
+    DDL, Column, String, Integer, DateTime, Boolean, Index, event, func, text, Enum as SQLAlchemyEnum
 )
 from sqlalchemy.dialects.postgresql import UUID, ENUM
 from sqlalchemy.orm import Mapped, mapped_column
 from app.database import Base
 
+# Columns searched by GET /users/search
+SEARCH_COLUMNS = ("nickname", "email", "first_name", "last_name")
+
+def _pg_trgm_available(ddl, target, bind, **kw) -> bool:
+    # pg_trgm ships with PostgreSQL's contrib modules, which a bare server may lack; schemas built with
+    # create_all (as in tests) then skip the trigram indexes instead of failing. Migrations require it.
+    return bind.execute(text("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")).first() is not None
+
 class UserRole(Enum):
     """Enumeration of user roles within the application, stored as ENUM in the database."""
     ANONYMOUS = "ANONYMOUS"
@@ -52,6 +60,26 @@ class User(Base):
     """
     __tablename__ = "users"
     __mapper_args__ = {"eager_defaults": True}
+    __table_args__ = (
+        # Sort key of keyset pagination over users
+        Index("ix_users_created_at_id", "created_at", "id"),
+        # Filters of GET /users/: the rare side of each flag gets a small partial index in the same
+        # sort order; the common side is served by the index above
+        Index("ix_users_role_created_at_id", "role", "created_at", "id"),
+        Index("ix_users_last_login_at_id", "last_login_at", "id"),
+        Index("ix_users_locked_created_at_id", "created_at", "id", postgresql_where=text("is_locked")),
+        Index("ix_users_professional_created_at_id", "created_at", "id", postgresql_where=text("is_professional")),
+        Index("ix_users_unverified_created_at_id", "created_at", "id", postgresql_where=text("NOT email_verified")),
+        # Substring and fuzzy search, one trigram index per searched column
+        *(
+            Index(f"ix_users_{column}_trgm", column, postgresql_using="gin", postgresql_ops={column: "gin_trgm_ops"})
+            .ddl_if(callable_=_pg_trgm_available)
+            for column in SEARCH_COLUMNS
+        ),
+        # Prefix autocomplete: byte-ordered, so a prefix is one range, and covering id for index-only scans
+        Index("ix_users_nickname_prefix", text('nickname COLLATE "C"'), postgresql_include=["id"]),
+        Index("ix_users_email_prefix", text('email COLLATE "C"'), postgresql_include=["id"]),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     nickname: Mapped[str] = Column(
@@ -100,3 +128,9 @@ class User(Base):
         """Updates the professional status and logs the update time."""
         self.is_professional = status
         self.professional_status_updated_at = func.now()
+
+event.listen(
+    User.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(callable_=_pg_trgm_available),
+)
@@ -0,0 +1,20 @@
+"""
+Operational metrics for administrators.
+
+Exposes the in-process counters and gauges registered through `app.utils.metrics`, such as the
+password hashing pool, so operators can size workers and spot saturation.
+"""
+
+from builtins import dict
+from fastapi import APIRouter, Depends
+from app.dependencies import authorize
+from app.utils.metrics import collect_metrics
+
+router = APIRouter()
+
+@router.get("/metrics/", name="get_metrics", tags=["Operations Requires (Admin Role)"])
+async def get_metrics(current_user: dict = Depends(authorize("get_metrics"))):
+    """
+    Return a snapshot of this worker's runtime metrics, grouped by subsystem.
+    """
+    return collect_metrics()
@@ -18,21 +18,34 @@ Key Highlights:
 - Utilizes OAuth2PasswordBearer for securing API endpoints, requiring valid access tokens for operations.
 """
 
-from builtins import dict, int, len, str
-from datetime import timedelta
+from builtins import ValueError, dict, getattr, int, len, str
+from datetime import datetime, timedelta, timezone
+from typing import Optional
 import logging
+from math import ceil
 from uuid import UUID
-from fastapi import APIRouter, Depends, HTTPException, Response, logger, status, Request
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Response, logger, status, Request
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.dependencies import get_current_user, get_db, get_email_service, require_role
+from app.dependencies import authorize, get_current_user, get_db, get_email_service, get_read_db, get_read_session_factory, limit_auth_concurrency
 from app.schemas.pagination_schema import EnhancedPagination
-from app.schemas.token_schema import TokenResponse
-from app.schemas.user_schemas import LoginRequest, UserBase, UserCreate, UserListResponse, UserResponse, UserUpdate
-from app.services.user_service import UserService
-from app.services.jwt_service import create_access_token
+from app.schemas.token_schema import RefreshTokenRequest, TokenResponse
+from app.schemas.user_schemas import (
+    AutocompleteField, BulkImportReport, LoginRequest, SortOrder, UserAutocompleteResponse, UserBase, UserBatchGetRequest,
+    UserBatchGetResponse, UserCreate, UserListFilters, UserListResponse, UserResponse, UserSearchResponse, UserSearchResult,
+    UserSortField, UserSuggestion, UserUpdate,
+)
+from app.services.user_count_service import UserCountService
+from app.services.user_import_service import BulkImportTooLarge, UserImportService
+from app.services.user_service import PROFILE_FIELDS, LoginOutcome, UserExistsError, UserService
+from app.services.jwt_service import create_user_access_token
+from app.services.refresh_token_service import RefreshTokenService
+from app.services.token_revocation_service import TokenRevocationService
+from app.utils.client_ip import client_ip
+from app.utils.cursor import InvalidCursorError
 from app.utils.link_generation import create_user_links, generate_pagination_links
+from app.utils.record_formats import EXPORT_MEDIA_TYPES, encode_records, parse_records, record_format
 from app.dependencies import get_settings
 from app.services.email_service import EmailService
 import urllib.parse
@@ -40,8 +53,70 @@ import urllib.parse
 router = APIRouter()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 settings = get_settings()
+
+def profile_response(user, request: Request) -> UserResponse:
+    """Builds a UserResponse with links from a row of `PROFILE_COLUMNS`, without re-validating it."""
+    return UserResponse.model_construct(
+        **{field: getattr(user, field) for field in PROFILE_FIELDS},
+        links=create_user_links(user.id, request)
+    )
+
+# Declared before /users/{user_id} so "export", "search" and "autocomplete" are not parsed as user ids
+@router.get("/users/export", name="export_users", tags=["User Management Requires (Admin or Manager Roles)"])
+async def export_users(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    session_factory = Depends(get_read_session_factory),
+    current_user: dict = Depends(authorize("export_users"))
+):
+    """
+    Stream every user's profile columns as NDJSON or CSV.
+
+    Rows are read from a server-side cursor and written out a batch at a time, so the export runs in
+    constant memory however many users there are.
+    """
+    async def body():
+        # The response outlives the request's dependencies, so the stream keeps its own session
+        async with session_factory() as session:
+            batches = UserService.stream_profiles(session, settings.export_batch_size)
+            async for chunk in encode_records(PROFILE_FIELDS, batches, format):
+                yield chunk
+
+    return StreamingResponse(
+        body(),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="users.{format}"'},
+    )
+
+@router.get("/users/search", response_model=UserSearchResponse, name="search_users", tags=["User Management Requires (Admin or Manager Roles)"])
+async def search_users(
+    q: str = Query(..., min_length=3, max_length=100, description="Text to look for in nicknames, emails and names"),
+    limit: int = Query(20, ge=1, le=settings.search_max_results),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: dict = Depends(authorize("search_users"))
+):
+    """
+    Search users by nickname, email, first or last name, ranked by similarity.
+
+    Matches include substrings and near misses such as small typos. The query needs at least three
+    characters, the length of one trigram.
+    """
+    users = await UserService.search(db, q, limit)
+    return UserSearchResponse(items=[UserSearchResult.model_validate(user) for user in users])
+
+@router.get("/users/autocomplete", response_model=UserAutocompleteResponse, name="autocomplete_users", tags=["User Management Requires (Admin or Manager Roles)"])
+async def autocomplete_users(
+    prefix: str = Query(..., min_length=1, max_length=100),
+    field: AutocompleteField = AutocompleteField.NICKNAME,
+    limit: int = Query(10, ge=1, le=settings.autocomplete_max_results),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: dict = Depends(authorize("autocomplete_users"))
+):
+    """Suggest users whose nickname (or email) starts with `prefix`; matching is case-sensitive."""
+    suggestions = await UserService.autocomplete(db, prefix, field, limit)
+    return UserAutocompleteResponse(items=[UserSuggestion(id=row.id, value=row.value) for row in suggestions])
+
 @router.get("/users/{user_id}", response_model=UserResponse, name="get_user", tags=["User Management Requires (Admin or Manager Roles)"])
-async def get_user(user_id: UUID, request: Request, db: AsyncSession = Depends(get_db), token: str = Depends(oauth2_scheme), current_user: dict = Depends(require_role(["ADMIN", "MANAGER"]))):
+async def get_user(user_id: UUID, request: Request, db: AsyncSession = Depends(get_read_db), token: str = Depends(oauth2_scheme), current_user: dict = Depends(authorize("get_user"))):
     """
     Endpoint to fetch a user by their unique identifier (UUID).
 
@@ -54,26 +129,11 @@ async def get_user(user_id: UUID, request: Request, db: AsyncSession = Depends(g
         db: Dependency that provides an AsyncSession for database access.
         token: The OAuth2 access token obtained through OAuth2PasswordBearer dependency.
     """
-    user = await UserService.get_by_id(db, user_id)
+    user = await UserService.get_profile(db, user_id)
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
 
-    return UserResponse.model_construct(
-        id=user.id,
-        nickname=user.nickname,
-        first_name=user.first_name,
-        last_name=user.last_name,
-        bio=user.bio,
-        profile_picture_url=user.profile_picture_url,
-        github_profile_url=user.github_profile_url,
-        linkedin_profile_url=user.linkedin_profile_url,
-        role=user.role,
-        email=user.email,
-        last_login_at=user.last_login_at,
-        created_at=user.created_at,
-        updated_at=user.updated_at,
-        links=create_user_links(user.id, request)  
-    )
+    return profile_response(user, request)
 
 # Additional endpoints for update, delete, create, and list users follow a similar pattern, using
 # asynchronous database operations, handling security with OAuth2PasswordBearer, and enhancing response
@@ -83,7 +143,7 @@ async def get_user(user_id: UUID, request: Request, db: AsyncSession = Depends(g
 # experience by adhering to REST principles and providing self-discoverable operations.
 
 @router.put("/users/{user_id}", response_model=UserResponse, name="update_user", tags=["User Management Requires (Admin or Manager Roles)"])
-async def update_user(user_id: UUID, user_update: UserUpdate, request: Request, db: AsyncSession = Depends(get_db), token: str = Depends(oauth2_scheme), current_user: dict = Depends(require_role(["ADMIN", "MANAGER"]))):
+async def update_user(user_id: UUID, user_update: UserUpdate, request: Request, db: AsyncSession = Depends(get_db), token: str = Depends(oauth2_scheme), current_user: dict = Depends(authorize("update_user"))):
     """
     Update user information.
 
@@ -95,25 +155,10 @@ async def update_user(user_id: UUID, user_update: UserUpdate, request: Request,
     if not updated_user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
 
-    return UserResponse.model_construct(
-        id=updated_user.id,
-        bio=updated_user.bio,
-        first_name=updated_user.first_name,
-        last_name=updated_user.last_name,
-        nickname=updated_user.nickname,
-        email=updated_user.email,
-        role=updated_user.role,
-        last_login_at=updated_user.last_login_at,
-        profile_picture_url=updated_user.profile_picture_url,
-        github_profile_url=updated_user.github_profile_url,
-        linkedin_profile_url=updated_user.linkedin_profile_url,
-        created_at=updated_user.created_at,
-        updated_at=updated_user.updated_at,
-        links=create_user_links(updated_user.id, request)
-    )
+    return profile_response(updated_user, request)
 
 @router.delete("/users/{user_id}", status_code=status.HTTP_204_NO_CONTENT, name="delete_user", tags=["User Management Requires (Admin or Manager Roles)"])
-async def delete_user(user_id: UUID, db: AsyncSession = Depends(get_db), token: str = Depends(oauth2_scheme), current_user: dict = Depends(require_role(["ADMIN", "MANAGER"]))):
+async def delete_user(user_id: UUID, db: AsyncSession = Depends(get_db), token: str = Depends(oauth2_scheme), current_user: dict = Depends(authorize("delete_user"))):
     """
     Delete a user by their ID.
 
@@ -125,7 +170,7 @@ async def delete_user(user_id: UUID, db: AsyncSession = Depends(get_db), token:
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 @router.post("/users/", response_model=UserResponse, status_code=status.HTTP_201_CREATED, tags=["User Management Requires (Admin or Manager Roles)"], name="create_user")
-async def create_user(user: UserCreate, request: Request, db: AsyncSession = Depends(get_db), email_service: EmailService = Depends(get_email_service), token: str = Depends(oauth2_scheme), current_user: dict = Depends(require_role(["ADMIN", "MANAGER"]))):
+async def create_user(user: UserCreate, request: Request, db: AsyncSession = Depends(get_db), email_service: EmailService = Depends(get_email_service), token: str = Depends(oauth2_scheme), current_user: dict = Depends(authorize("create_user"))):
     """
     Create a new user.
 
@@ -141,11 +186,10 @@ async def create_user(user: UserCreate, request: Request, db: AsyncSession = Dep
     Returns:
     - UserResponse: The newly created user's information along with navigation links.
     """
-    existing_user = await UserService.get_by_email(db, user.email)
-    if existing_user:
+    try:
+        created_user = await UserService.create(db, user.model_dump(), email_service)
+    except UserExistsError:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already exists")
-    
-    created_user = await UserService.create(db, user.model_dump(), email_service)
     if not created_user:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to create user")
     
@@ -169,68 +213,210 @@ async def list_users(
     request: Request,
     skip: int = 0,
     limit: int = 10,
-    db: AsyncSession = Depends(get_db),
-    current_user: dict = Depends(require_role(["ADMIN", "MANAGER"]))
+    cursor: Optional[str] = None,
+    sort_by: UserSortField = UserSortField.CREATED_AT,
+    order: SortOrder = SortOrder.ASC,
+    filters: UserListFilters = Depends(),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: dict = Depends(authorize("list_users"))
 ):
-    total_users = await UserService.count(db)
-    users = await UserService.list_users(db, skip, limit)
+    """
+    List users a page at a time, optionally filtered and sorted.
+
+    Filters (`role`, `is_locked`, `is_professional`, `email_verified`, and `created_*`/`last_login_*`
+    ranges) are applied in the database, and `total` counts only matching users.
+
+    Pass `cursor` to page by keyset: an empty cursor returns the first page, and the `next`/`prev`
+    links carry the cursors of the neighbouring pages. Keyset pages follow the default
+    `created_at` ascending order. Without `cursor`, `skip` and `limit` page by offset as before.
+    """
+    if cursor is not None and (sort_by is not UserSortField.CREATED_AT or order is not SortOrder.ASC):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor pagination only supports the default sort order")
+    total_users, count_strategy = await UserService.count_users(db, filters)
+    if cursor is not None:
+        try:
+            users, next_cursor, prev_cursor = await UserService.list_users_page(db, limit, cursor, filters)
+        except InvalidCursorError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid pagination cursor")
+        page = None
+        pagination_links = generate_pagination_links(request, skip, limit, total_users, cursor, next_cursor, prev_cursor)
+    else:
+        users = await UserService.list_users(db, skip, limit, filters, sort_by, order)
+        page = skip // limit + 1
+        pagination_links = generate_pagination_links(request, skip, limit, total_users)
 
     user_responses = [
         UserResponse.model_validate(user) for user in users
     ]
     
-    pagination_links = generate_pagination_links(request, skip, limit, total_users)
-    
     # Construct the final response with pagination details
     return UserListResponse(
         items=user_responses,
         total=total_users,
-        page=skip // limit + 1,
+        total_strategy=count_strategy.value,
+        page=page,
         size=len(user_responses),
-        links=pagination_links  # Ensure you have appropriate logic to create these links
+        links=pagination_links
     )
 
-@router.post("/register/", response_model=UserResponse, tags=["Login and Registration"])
+@router.post("/users/batch-get", response_model=UserBatchGetResponse, name="batch_get_users", tags=["User Management Requires (Admin or Manager Roles)"])
+async def batch_get_users(
+    body: UserBatchGetRequest,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: dict = Depends(authorize("batch_get_users"))
+):
+    """
+    Fetch many users by id and/or email in one request.
+
+    All keys are resolved with a single query. Keys that match no user are listed in `missing`.
+    """
+    if len(body.ids) + len(body.emails) > settings.batch_get_max_keys:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.batch_get_max_keys} ids and emails may be requested at once",
+        )
+    users = await UserService.get_profiles(db, body.ids, body.emails)
+    found_ids = {user.id for user in users}
+    found_emails = {user.email for user in users}
+    missing = [str(user_id) for user_id in body.ids if user_id not in found_ids]
+    missing += [email for email in body.emails if email not in found_emails]
+    return UserBatchGetResponse(items=[UserResponse.model_validate(user) for user in users], missing=missing)
+
+@router.post("/register/", response_model=UserResponse, tags=["Login and Registration"], dependencies=[Depends(limit_auth_concurrency)])
 async def register(user_data: UserCreate, session: AsyncSession = Depends(get_db), email_service: EmailService = Depends(get_email_service)):
-    user = await UserService.register_user(session, user_data.model_dump(), email_service)
+    try:
+        user = await UserService.register_user(session, user_data.model_dump(), email_service)
+    except UserExistsError:
+        raise HTTPException(status_code=400, detail="Email already exists")
     if user:
         return user
     raise HTTPException(status_code=400, detail="Email already exists")
 
-@router.post("/login/", response_model=TokenResponse, tags=["Login and Registration"])
-async def login(form_data: OAuth2PasswordRequestForm = Depends(), session: AsyncSession = Depends(get_db)):
-    if await UserService.is_account_locked(session, form_data.username):
+@router.post("/login/", response_model=TokenResponse, tags=["Login and Registration"], dependencies=[Depends(limit_auth_concurrency)])
+async def login(request: Request, form_data: OAuth2PasswordRequestForm = Depends(), session: AsyncSession = Depends(get_db)):
+    outcome, result = await UserService.authenticate(session, form_data.username, form_data.password, client_ip(request))
+    if outcome is LoginOutcome.THROTTLED:
+        # A throttled attempt comes back with the seconds until the oldest failure leaves the window
+        raise HTTPException(
+            status_code=429,
+            detail="Too many failed login attempts from this address. Please retry later.",
+            headers={"Retry-After": str(ceil(result))},
+        )
+    user = result
+    if outcome is LoginOutcome.LOCKED:
         raise HTTPException(status_code=400, detail="Account locked due to too many failed login attempts.")
-
-    user = await UserService.login_user(session, form_data.username, form_data.password)
     if user:
         access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
 
-        access_token = create_access_token(
-            data={"sub": user.email, "role": str(user.role.name)},
-            expires_delta=access_token_expires
-        )
+        access_token = create_user_access_token(user.id, str(user.role.name), access_token_expires)
+        refresh_token = await RefreshTokenService.issue(session, user.id)
 
-        return {"access_token": access_token, "token_type": "bearer"}
+        return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
     raise HTTPException(status_code=401, detail="Incorrect email or password.")
 
-@router.post("/login/", include_in_schema=False, response_model=TokenResponse, tags=["Login and Registration"])
-async def login(form_data: OAuth2PasswordRequestForm = Depends(), session: AsyncSession = Depends(get_db)):
-    if await UserService.is_account_locked(session, form_data.username):
+@router.post("/login/", include_in_schema=False, response_model=TokenResponse, tags=["Login and Registration"], dependencies=[Depends(limit_auth_concurrency)])
+async def login(request: Request, form_data: OAuth2PasswordRequestForm = Depends(), session: AsyncSession = Depends(get_db)):
+    outcome, result = await UserService.authenticate(session, form_data.username, form_data.password, client_ip(request))
+    if outcome is LoginOutcome.THROTTLED:
+        # A throttled attempt comes back with the seconds until the oldest failure leaves the window
+        raise HTTPException(
+            status_code=429,
+            detail="Too many failed login attempts from this address. Please retry later.",
+            headers={"Retry-After": str(ceil(result))},
+        )
+    user = result
+    if outcome is LoginOutcome.LOCKED:
         raise HTTPException(status_code=400, detail="Account locked due to too many failed login attempts.")
-
-    user = await UserService.login_user(session, form_data.username, form_data.password)
     if user:
         access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
 
-        access_token = create_access_token(
-            data={"sub": user.email, "role": str(user.role.name)},
-            expires_delta=access_token_expires
-        )
+        access_token = create_user_access_token(user.id, str(user.role.name), access_token_expires)
+        refresh_token = await RefreshTokenService.issue(session, user.id)
 
-        return {"access_token": access_token, "token_type": "bearer"}
+        return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
     raise HTTPException(status_code=401, detail="Incorrect email or password.")
 
+@router.post("/token/refresh", response_model=TokenResponse, tags=["Login and Registration"])
+async def refresh_access_token(body: RefreshTokenRequest, session: AsyncSession = Depends(get_db)):
+    """
+    Exchange a refresh token for a new access token and a new refresh token.
+
+    The presented refresh token is consumed. Reusing a consumed token revokes every token issued
+    from the same login, so a stolen token stops working as soon as either party uses it again.
+    """
+    rotated = await RefreshTokenService.rotate(session, body.refresh_token)
+    if rotated is None:
+        raise HTTPException(status_code=401, detail="Invalid or expired refresh token.")
+    refresh_token, user_id, email, role = rotated
+    access_token = create_user_access_token(user_id, str(role.name), timedelta(minutes=settings.access_token_expire_minutes))
+    return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
+
+@router.post("/token/revoke", status_code=status.HTTP_204_NO_CONTENT, tags=["Login and Registration"])
+async def revoke_refresh_token(body: RefreshTokenRequest, session: AsyncSession = Depends(get_db)):
+    """
+    Revoke a refresh token and every token rotated from the same login.
+
+    Always answers 204 so the endpoint cannot be used to probe which tokens exist.
+    """
+    await RefreshTokenService.revoke(session, body.refresh_token)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+@router.post("/logout/", status_code=status.HTTP_204_NO_CONTENT, tags=["Login and Registration"])
+async def logout(body: Optional[RefreshTokenRequest] = None, session: AsyncSession = Depends(get_db), current_user: dict = Depends(get_current_user)):
+    """
+    Log out by revoking the access token used for this request.
+
+    When a refresh token is supplied it is revoked too, together with every token rotated from the same login.
+    """
+    if current_user.get("jti") and current_user.get("exp"):
+        expires_at = datetime.fromtimestamp(current_user["exp"], timezone.utc)
+        await TokenRevocationService.revoke_token(session, current_user["jti"], expires_at)
+    if body is not None:
+        await RefreshTokenService.revoke(session, body.refresh_token)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+@router.post("/users/bulk", response_model=BulkImportReport, name="bulk_import_users", tags=["User Management Requires (Admin or Manager Roles)"])
+async def bulk_import_users(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db),
+    email_service: EmailService = Depends(get_email_service),
+    current_user: dict = Depends(authorize("bulk_import_users"))
+):
+    """
+    Import many users from an NDJSON (`application/x-ndjson`) or CSV (`text/csv`) request body.
+
+    The body is read as a stream and imported in batches; each record takes the fields of user
+    creation, with either `password` or an existing bcrypt/argon2id `hashed_password`. Verification
+    emails are sent after the response. The report gives the outcome of every row; if the upload fails
+    after some batches were committed, it covers those rows and is marked `truncated`.
+    """
+    fmt = record_format(request.headers.get("content-type"))
+    if fmt is None:
+        raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail="Send application/x-ndjson or text/csv")
+    try:
+        report, created = await UserImportService.import_users(db, parse_records(request.stream(), fmt, settings.bulk_import_max_line_bytes))
+    except (BulkImportTooLarge, ValueError) as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if created:
+        background_tasks.add_task(UserImportService.send_verification_emails, email_service, created)
+    return report
+
+@router.post("/users/{user_id}/force-logout", status_code=status.HTTP_204_NO_CONTENT, name="force_logout_user", tags=["User Management Requires (Admin or Manager Roles)"])
+async def force_logout_user(user_id: UUID, db: AsyncSession = Depends(get_db), current_user: dict = Depends(authorize("force_logout_user"))):
+    """
+    Revoke every access and refresh token issued to a user so far.
+
+    - **user_id**: UUID of the user to log out everywhere.
+    """
+    user = await UserService.get_by_id(db, user_id)
+    if not user:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+    # Tokens carry the id as their subject, or the email if minted before that
+    await TokenRevocationService.revoke_subjects(db, [str(user.id), user.email])
+    await RefreshTokenService.revoke_all_for_user(db, user.id)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
 @router.get("/verify-email/{user_id}/{token}", status_code=status.HTTP_200_OK, name="verify_email", tags=["Login and Registration"])
 async def verify_email(user_id: UUID, token: str, db: AsyncSession = Depends(get_db)):
     """
@@ -293,7 +479,7 @@ async def update_own_profile(
     profile_update: UserUpdate,
     request: Request,
     db: AsyncSession = Depends(get_db),
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(authorize("update_own_profile"))
 ):
     """
     Update the authenticated user's profile information.
@@ -312,51 +498,26 @@ async def update_own_profile(
     """
     user_id = current_user.get("user_id")
     logger = logging.getLogger(__name__)
-    logger.info(f"Updating profile for user with ID/email: {user_id}")
+    logger.info(f"Updating profile for user with ID/email: {user_id or current_user.get('email')}")
     
-    # Convert email to user ID if necessary
-    if "@" in user_id:  # If user_id is actually an email
-        user = await UserService.get_by_email(db, user_id)
-        if user is None:
+    # Tokens minted before subjects were user ids only carry the email
+    if user_id is None:
+        user_id = await UserService.get_id_by_email(db, current_user["email"])
+        if user_id is None:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
-        user_id = user.id
     
     # Exclude role from update data for security
     update_data = profile_update.model_dump(exclude_unset=True)
     if "role" in update_data:
         del update_data["role"]
     
-    user = await UserService.get_by_id(db, user_id)
-    if not user:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
-        
-    logger.info(f"Found user: {user.email}, ID: {user.id}, is_professional: {user.is_professional}")
-    
+    # The update returns the new profile, or nothing if the user does not exist
     updated_user = await UserService.update(db, user_id, update_data)
     if not updated_user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
-    
-    # Ensure we have the latest data
-    await db.refresh(updated_user)
     logger.info(f"Updated user: {updated_user.email}, is_professional: {updated_user.is_professional}")
     
-    return UserResponse.model_construct(
-        id=updated_user.id,
-        nickname=updated_user.nickname,
-        first_name=updated_user.first_name,
-        last_name=updated_user.last_name,
-        bio=updated_user.bio,
-        profile_picture_url=updated_user.profile_picture_url,
-        github_profile_url=updated_user.github_profile_url,
-        linkedin_profile_url=updated_user.linkedin_profile_url,
-        role=updated_user.role,
-        email=updated_user.email,
-        is_professional=updated_user.is_professional,
-        last_login_at=updated_user.last_login_at,
-        created_at=updated_user.created_at,
-        updated_at=updated_user.updated_at,
-        links=create_user_links(updated_user.id, request)
-    )
+    return profile_response(updated_user, request)
 
 @router.put("/users/{user_id}/professional-status", response_model=UserResponse, tags=["User Management Requires (Admin or Manager Roles)"])
 async def update_professional_status(
@@ -365,7 +526,7 @@ async def update_professional_status(
     professional_status: bool = True,
     db: AsyncSession = Depends(get_db),
     email_service: EmailService = Depends(get_email_service),
-    current_user: dict = Depends(require_role(["ADMIN", "MANAGER"]))
+    current_user: dict = Depends(authorize("update_professional_status"))
 ):
     """
     Update a user's professional status.
@@ -383,50 +544,25 @@ async def update_professional_status(
     Returns:
         UserResponse: The updated user profile with navigation links.
     """
-    # Fetch the user
-    user = await UserService.get_by_id(db, user_id)
+    user, changed = await UserService.set_professional_status(db, user_id, professional_status)
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
     
-    # Only update if status is different
-    if user.is_professional != professional_status:
-        # Update the professional status
-        user.update_professional_status(professional_status)
-        db.add(user)
-        await db.commit()
-        await db.refresh(user)
-        
-        # Send email notification if upgraded to professional
-        if professional_status:
-            try:
-                # Prepare user data for email
-                user_data = {
-                    "name": user.first_name or user.nickname,
-                    "email": user.email,
-                    "verification_url": f"{settings.server_base_url}/users/{user.id}",
-                }
-                # Send the professional status upgrade email
-                await email_service.send_user_email(user_data, 'professional_upgrade')
-            except Exception as e:
-                # Log the error but don't fail the request
-                logger = logging.getLogger(__name__)
-                logger.error(f"Failed to send professional upgrade email: {str(e)}")
+    # Send email notification if upgraded to professional
+    if changed and professional_status:
+        try:
+            # Prepare user data for email
+            user_data = {
+                "name": user.first_name or user.nickname,
+                "email": user.email,
+                "verification_url": f"{settings.server_base_url}/users/{user.id}",
+            }
+            # Send the professional status upgrade email
+            await email_service.send_user_email(user_data, 'professional_upgrade')
+        except Exception as e:
+            # Log the error but don't fail the request
+            logger = logging.getLogger(__name__)
+            logger.error(f"Failed to send professional upgrade email: {str(e)}")
     
     # Return the updated user
-    return UserResponse.model_construct(
-        id=user.id,
-        nickname=user.nickname,
-        first_name=user.first_name,
-        last_name=user.last_name,
-        bio=user.bio,
-        profile_picture_url=user.profile_picture_url,
-        github_profile_url=user.github_profile_url,
-        linkedin_profile_url=user.linkedin_profile_url,
-        role=user.role,
-        email=user.email,
-        is_professional=user.is_professional,
-        last_login_at=user.last_login_at,
-        created_at=user.created_at,
-        updated_at=user.updated_at,
-        links=create_user_links(user.id, request)
-    )
\ No newline at end of file
+    return profile_response(user, request)
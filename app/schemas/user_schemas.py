@@ -6,6 +6,7 @@ from enum import Enum
 import uuid
 import re
 from app.models.user_model import UserRole
+from app.schemas.pagination_schema import PaginationLink
 from app.utils.nickname_gen import generate_nickname
 
 
@@ -67,6 +68,79 @@ class UserResponse(UserBase):
     is_professional: Optional[bool] = Field(default=False, example=True)
     role: UserRole
 
+class UserImportRow(UserCreate):
+    """One row of a bulk import. Either a plain password or an existing password hash must be given."""
+    password: Optional[str] = Field(None, example="Secure*1234")
+    hashed_password: Optional[str] = Field(None, description="bcrypt or argon2id hash carried over from another system")
+    role: Optional[UserRole] = Field(None, description="Ignored: imported users start unverified, like registered ones")
+
+    @root_validator(pre=True)
+    def check_one_password(cls, values):
+        if bool(values.get("password")) == bool(values.get("hashed_password")):
+            raise ValueError("Exactly one of password or hashed_password must be provided")
+        return values
+
+class BulkImportRowResult(BaseModel):
+    row: int = Field(..., example=1, description="1-based position of the record in the upload")
+    status: str = Field(..., example="created", description="'created', 'invalid' or 'duplicate'")
+    email: Optional[str] = Field(None, example="john.doe@example.com")
+    id: Optional[uuid.UUID] = Field(None, example=uuid.uuid4())
+    error: Optional[str] = Field(None, example="Email already exists")
+
+class BulkImportReport(BaseModel):
+    total: int = Field(..., example=3)
+    created: int = Field(..., example=2)
+    failed: int = Field(..., example=1)
+    rows: List[BulkImportRowResult] = []
+    truncated: bool = Field(False, description="The import stopped early; rows after the last reported one were not imported")
+    error: Optional[str] = Field(None, example=None, description="Why the import stopped early")
+
+class UserBatchGetRequest(BaseModel):
+    ids: List[uuid.UUID] = Field([], example=[uuid.uuid4()])
+    emails: List[EmailStr] = Field([], example=["john.doe@example.com"])
+
+class UserBatchGetResponse(BaseModel):
+    items: List[UserResponse] = []
+    missing: List[str] = Field([], example=["jane.doe@example.com"], description="Requested ids and emails that matched no user")
+
+class UserSortField(str, Enum):
+    CREATED_AT = "created_at"
+    LAST_LOGIN_AT = "last_login_at"
+    EMAIL = "email"
+    NICKNAME = "nickname"
+
+class SortOrder(str, Enum):
+    ASC = "asc"
+    DESC = "desc"
+
+class UserListFilters(BaseModel):
+    """Filters of GET /users/; unset fields do not filter. Ranges include their start and exclude their end."""
+    role: Optional[UserRole] = Field(None, example="MANAGER")
+    is_locked: Optional[bool] = Field(None, example=True)
+    is_professional: Optional[bool] = Field(None, example=False)
+    email_verified: Optional[bool] = Field(None, example=True)
+    created_after: Optional[datetime] = Field(None, example="2024-05-06T00:00:00Z")
+    created_before: Optional[datetime] = Field(None, example="2024-05-13T00:00:00Z")
+    last_login_after: Optional[datetime] = Field(None, example="2024-05-06T00:00:00Z")
+    last_login_before: Optional[datetime] = Field(None, example="2024-05-13T00:00:00Z")
+
+class UserSearchResult(UserResponse):
+    score: float = Field(..., example=0.8, description="Best word similarity of the query to the nickname, email or name, from 0 to 1")
+
+class UserSearchResponse(BaseModel):
+    items: List[UserSearchResult] = []
+
+class AutocompleteField(str, Enum):
+    NICKNAME = "nickname"
+    EMAIL = "email"
+
+class UserSuggestion(BaseModel):
+    id: uuid.UUID = Field(..., example=uuid.uuid4())
+    value: str = Field(..., example="john_doe123")
+
+class UserAutocompleteResponse(BaseModel):
+    items: List[UserSuggestion] = []
+
 class LoginRequest(BaseModel):
     email: str = Field(..., example="john.doe@example.com")
     password: str = Field(..., example="Secure*1234")
@@ -85,5 +159,7 @@ class UserListResponse(BaseModel):
         "github_profile_url": "https://github.com/johndoe"
     }])
     total: int = Field(..., example=100)
-    page: int = Field(..., example=1)
+    total_strategy: str = Field("exact", example="exact", description="How total was obtained: 'exact', 'cached' (may lag recent changes) or 'estimated' (planner statistics).")
+    page: Optional[int] = Field(None, example=1, description="Page number in offset mode; not set when paging by cursor.")
     size: int = Field(..., example=10)
+    links: List[PaginationLink] = []
@@ -1,22 +1,133 @@
 # app/services/jwt_service.py
-from builtins import dict, str
+from builtins import bool, dict, float, int, isinstance, len, str
+import hashlib
+import heapq
+import time
+import uuid
+from collections import OrderedDict
+from typing import List, Optional, Tuple
 import jwt
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from settings.config import settings
+from app.schemas.token_schema import ACCESS_TOKEN_VERSION
+from app.utils.metrics import register_metrics_source
 
 def create_access_token(*, data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
     # Convert role to uppercase before encoding the JWT
     if 'role' in to_encode:
         to_encode['role'] = to_encode['role'].upper()
-    expire = datetime.utcnow() + (expires_delta if expires_delta else timedelta(minutes=settings.access_token_expire_minutes))
-    to_encode.update({"exp": expire})
+    issued_at = datetime.now(timezone.utc)
+    expire = issued_at + (expires_delta if expires_delta else timedelta(minutes=settings.access_token_expire_minutes))
+    # jti identifies this token for revocation; iat lets a per-user revocation cover earlier tokens only.
+    # iat keeps its fraction of a second, so a token minted right after a revocation is told apart from
+    # the ones minted right before it.
+    to_encode.update({"exp": expire, "iat": issued_at.timestamp(), "jti": uuid.uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, settings.jwt_secret_key, algorithm=settings.jwt_algorithm)
     return encoded_jwt
 
+def create_user_access_token(user_id: uuid.UUID, role: str, expires_delta: timedelta = None):
+    """Mints an access token for a user, with their immutable id as the subject (claims version 2)."""
+    return create_access_token(
+        data={"sub": str(user_id), "role": role, "ver": ACCESS_TOKEN_VERSION},
+        expires_delta=expires_delta,
+    )
+
 def decode_token(token: str):
     try:
         decoded = jwt.decode(token, settings.jwt_secret_key, algorithms=[settings.jwt_algorithm])
         return decoded
     except jwt.PyJWTError:
         return None
+
+class VerifiedTokenCache:
+    """
+    Bounded LRU of already-verified JWT claims, keyed by a SHA-256 digest of the token.
+
+    Entries are dropped once the token's `exp` passes, so a cached token is never accepted after
+    it would have failed verification. A min-heap of expiries lets `put` evict expired entries first,
+    so tokens that are never presented again do not hold capacity. Tokens without an `exp` claim are
+    not cached.
+
+    Only used from the async `get_current_user`, on the event loop thread; no method awaits, so none
+    needs a lock.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: "OrderedDict[bytes, tuple]" = OrderedDict()
+        # (exp, key) per put; entries already evicted or replaced are skipped when popped
+        self._expiries: List[Tuple[float, bytes]] = []
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode('utf-8')).digest()
+
+    def get(self, token: str) -> Optional[dict]:
+        key = self._key(token)
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, claims = entry
+            if expires_at > time.time():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return claims
+            del self._entries[key]
+        self.misses += 1
+        return None
+
+    def put(self, token: str, claims: dict):
+        expires_at = claims.get("exp")
+        if not isinstance(expires_at, (int, float)):
+            return
+        self._evict_expired(time.time())
+        key = self._key(token)
+        self._entries[key] = (expires_at, claims)
+        self._entries.move_to_end(key)
+        heapq.heappush(self._expiries, (expires_at, key))
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        if len(self._expiries) > 2 * self.max_size:
+            # LRU evictions leave stale heap items behind; rebuild from the live entries
+            self._expiries = [(entry[0], entry_key) for entry_key, entry in self._entries.items()]
+            heapq.heapify(self._expiries)
+
+    def _evict_expired(self, now: float):
+        while self._expiries and self._expiries[0][0] <= now:
+            expires_at, key = heapq.heappop(self._expiries)
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == expires_at:
+                del self._entries[key]
+
+    def clear(self):
+        self._entries.clear()
+        self._expiries.clear()
+
+    def stats(self) -> dict:
+        return {
+            "enabled": settings.jwt_cache_enabled,
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+verified_token_cache = VerifiedTokenCache(settings.jwt_cache_max_size)
+register_metrics_source("jwt_cache", verified_token_cache.stats)
+
+def decode_token_cached(token: str) -> Optional[dict]:
+    """
+    Decodes a token like `decode_token`, reusing claims from tokens verified earlier by this worker.
+
+    The returned claims are shared with the cache and must not be mutated.
+    """
+    if not settings.jwt_cache_enabled:
+        return decode_token(token)
+    claims = verified_token_cache.get(token)
+    if claims is None:
+        claims = decode_token(token)
+        if claims is not None:
+            verified_token_cache.put(token, claims)
+    return claims
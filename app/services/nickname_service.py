@@ -0,0 +1,131 @@
+from builtins import Exception, dict, int, len, list, set, str
+import asyncio
+from collections import deque
+from typing import Callable, Deque, Iterable, Optional, Set
+from sqlalchemy import String, any_, bindparam, select
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.dependencies import get_settings
+from app.models.user_model import User
+from app.utils.metrics import register_metrics_source
+from app.utils.nickname_gen import NicknameGenerator, nickname_generator
+import logging
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+class NicknamePool:
+    """
+    Per-worker pool of generated nicknames already checked to be free.
+
+    Candidates are checked against users in bulk, with one `nickname = ANY(...)` query per refill, and
+    handed out with `claim()` in O(1). When the pool falls below `refill_threshold` it is topped up by a
+    background task, once `start()` has given it a session factory; otherwise, or if it runs dry, the
+    claiming session refills it inline.
+
+    A pooled nickname can still be taken by another worker or by a user's own choice before it is used,
+    so inserts must tolerate a nickname conflict and claim again.
+    """
+
+    def __init__(self, generator: NicknameGenerator, size: int, refill_threshold: int):
+        self.generator = generator
+        self.size = size
+        self.refill_threshold = refill_threshold
+        self._free: Deque[str] = deque()
+        self._members: Set[str] = set()
+        self._session_factory: Optional[Callable[[], AsyncSession]] = None
+        self._refill_task: Optional[asyncio.Task] = None
+        self.claims = 0
+        self.misses = 0
+        self.refills = 0
+        self.candidates_taken = 0
+        self.conflicts = 0
+
+    def __len__(self) -> int:
+        return len(self._free)
+
+    def start(self, session_factory: Callable[[], AsyncSession]):
+        """Enables background refills using sessions from `session_factory`, and starts the first one."""
+        self._session_factory = session_factory
+        self._schedule_refill()
+
+    async def stop(self):
+        """Cancels a running background refill and disables further ones."""
+        self._session_factory = None
+        if self._refill_task is not None and not self._refill_task.done():
+            self._refill_task.cancel()
+            try:
+                await self._refill_task
+            except asyncio.CancelledError:
+                pass
+        self._refill_task = None
+
+    @staticmethod
+    async def _taken(session: AsyncSession, candidates: Iterable[str]) -> Set[str]:
+        query = select(User.nickname).where(User.nickname == any_(bindparam("nicknames", list(candidates), type_=ARRAY(String))))
+        result = await session.execute(query)
+        return set(result.scalars().all())
+
+    async def refill(self, session: AsyncSession) -> int:
+        """Tops the pool up to `size` with nicknames no user has; returns how many were added."""
+        needed = self.size - len(self._free)
+        if needed <= 0:
+            return 0
+        candidates = self.generator.generate_many(needed) - self._members
+        if not candidates:
+            return 0
+        taken = await self._taken(session, candidates)
+        # Claims made while the query ran may have refilled the pool already
+        free = [nickname for nickname in candidates - taken if nickname not in self._members][: self.size - len(self._free)]
+        self._free.extend(free)
+        self._members.update(free)
+        self.refills += 1
+        self.candidates_taken += len(taken)
+        return len(free)
+
+    async def claim(self, session: AsyncSession) -> str:
+        """Returns a nickname that was free when the pool was filled, refilling with `session` if the pool is empty."""
+        self.claims += 1
+        if not self._free:
+            self.misses += 1
+            await self.refill(session)
+        if self._free:
+            nickname = self._free.popleft()
+            self._members.discard(nickname)
+        else:
+            # Only when the generator is nearly exhausted; the insert's conflict handling still applies
+            nickname = self.generator.generate()
+        if len(self._free) < self.refill_threshold:
+            self._schedule_refill()
+        return nickname
+
+    def record_conflict(self):
+        """Counts a claimed nickname that turned out to be taken when it was inserted."""
+        self.conflicts += 1
+
+    def _schedule_refill(self):
+        if self._session_factory is None or (self._refill_task is not None and not self._refill_task.done()):
+            return
+        self._refill_task = asyncio.get_running_loop().create_task(self._refill_in_background())
+
+    async def _refill_in_background(self):
+        try:
+            async with self._session_factory() as session:
+                await self.refill(session)
+        except Exception as e:
+            logger.error(f"Nickname pool refill failed: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "free": len(self._free),
+            "size": self.size,
+            "capacity": self.generator.capacity,
+            "claims": self.claims,
+            "misses": self.misses,
+            "refills": self.refills,
+            "candidates_taken": self.candidates_taken,
+            "conflicts": self.conflicts,
+        }
+
+nickname_pool = NicknamePool(nickname_generator, settings.nickname_pool_size, settings.nickname_pool_refill_threshold)
+register_metrics_source("nickname_pool", nickname_pool.stats)
@@ -0,0 +1,154 @@
+from builtins import bool, classmethod, int, str
+from datetime import datetime, timedelta, timezone
+import hashlib
+import secrets
+from typing import Optional, Tuple
+from uuid import UUID, uuid4
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.dependencies import get_settings
+from app.models.token_model import RefreshToken
+from app.models.user_model import User, UserRole
+import logging
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+class RefreshTokenService:
+    """
+    Issues, rotates and revokes opaque refresh tokens.
+
+    Every refresh rotates the token: the presented token is consumed and a new one in the same family
+    is issued. Presenting a token that was already consumed means it was copied, so the whole family
+    is revoked and the client must log in again.
+    """
+
+    @staticmethod
+    def _hash(token: str) -> str:
+        return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+    @classmethod
+    async def issue(cls, session: AsyncSession, user_id: UUID, family_id: Optional[UUID] = None, token_id: Optional[UUID] = None) -> str:
+        """
+        Issue a new refresh token for a user and return the opaque token value.
+
+        Args:
+            session: Database session
+            user_id: UUID of the user the token is for
+            family_id: Rotation chain to add the token to; a new chain is started when omitted
+            token_id: Pre-assigned row id, used when rotating so the old row can point at it
+
+        Returns:
+            str: The token to hand to the client. Only its hash is stored.
+        """
+        token = secrets.token_urlsafe(32)
+        await session.execute(insert(RefreshToken).values(
+            id=token_id or uuid4(),
+            user_id=user_id,
+            family_id=family_id or uuid4(),
+            token_hash=cls._hash(token),
+            expires_at=datetime.now(timezone.utc) + timedelta(minutes=settings.refresh_token_expire_minutes),
+        ))
+        await session.commit()
+        return token
+
+    @classmethod
+    async def rotate(cls, session: AsyncSession, token: str) -> Optional[Tuple[str, UUID, str, UserRole]]:
+        """
+        Consume a refresh token and issue its replacement.
+
+        The token is claimed with one UPDATE ... FROM users ... RETURNING on the unique token hash, which
+        also fetches what the new access token needs, so a renewal never touches the password hash.
+
+        Args:
+            session: Database session
+            token: The refresh token presented by the client
+
+        Returns:
+            Optional[Tuple[str, UUID, str, UserRole]]: The new refresh token and the user's id, email
+            and role, or None if the token is unknown, expired, revoked or reused.
+        """
+        now = datetime.now(timezone.utc)
+        token_hash = cls._hash(token)
+        replacement_id = uuid4()
+        # Core tables rather than ORM entities: ORM bulk UPDATE cannot return columns of the joined users table
+        tokens, users = RefreshToken.__table__, User.__table__
+        query = (
+            update(tokens)
+            .where(
+                tokens.c.token_hash == token_hash,
+                tokens.c.revoked_at.is_(None),
+                tokens.c.expires_at > now,
+                tokens.c.user_id == users.c.id,
+                users.c.is_locked.isnot(True),
+            )
+            .values(revoked_at=now, replaced_by=replacement_id)
+            .returning(tokens.c.family_id, tokens.c.user_id, users.c.email, users.c.role)
+        )
+        claimed = (await session.execute(query)).first()
+        if claimed is None:
+            await cls._revoke_family_on_reuse(session, token_hash, now)
+            return None
+
+        family_id, user_id, email, role = claimed
+        new_token = await cls.issue(session, user_id, family_id=family_id, token_id=replacement_id)
+        return new_token, user_id, email, role
+
+    @classmethod
+    async def _revoke_family_on_reuse(cls, session: AsyncSession, token_hash: str, now: datetime):
+        result = await session.execute(
+            select(RefreshToken.family_id, RefreshToken.user_id, RefreshToken.replaced_by).where(RefreshToken.token_hash == token_hash)
+        )
+        row = result.first()
+        if row is None or row.replaced_by is None:
+            # Unknown, expired or explicitly revoked: nothing more to do
+            await session.rollback()
+            return
+        logger.warning(f"Refresh token reuse detected for user {row.user_id}; revoking token family {row.family_id}")
+        await cls._revoke_where(session, RefreshToken.family_id == row.family_id, now)
+
+    @classmethod
+    async def revoke(cls, session: AsyncSession, token: str) -> bool:
+        """
+        Revoke the family of the given refresh token, ending that login session.
+
+        Returns:
+            bool: True if an active token was revoked, False otherwise.
+        """
+        now = datetime.now(timezone.utc)
+        result = await session.execute(
+            select(RefreshToken.family_id).where(RefreshToken.token_hash == cls._hash(token), RefreshToken.revoked_at.is_(None))
+        )
+        family_id = result.scalar()
+        if family_id is None:
+            await session.rollback()
+            return False
+        await cls._revoke_where(session, RefreshToken.family_id == family_id, now)
+        return True
+
+    @classmethod
+    async def revoke_all_for_user(cls, session: AsyncSession, user_id: UUID):
+        """Revoke every active refresh token of a user, ending all of their sessions."""
+        await cls._revoke_where(session, RefreshToken.user_id == user_id, datetime.now(timezone.utc))
+
+    @classmethod
+    async def _revoke_where(cls, session: AsyncSession, criterion, now: datetime):
+        query = (
+            update(RefreshToken)
+            .where(criterion, RefreshToken.revoked_at.is_(None))
+            .values(revoked_at=now)
+            .execution_options(synchronize_session=False)
+        )
+        await session.execute(query)
+        await session.commit()
+
+    @classmethod
+    async def purge_expired(cls, session: AsyncSession) -> int:
+        """
+        Deletes refresh tokens past their expiry, whether active, rotated or revoked. Returns the number of rows removed.
+
+        Consumed tokens are kept until then so that replaying one is still detected as reuse.
+        """
+        result = await session.execute(delete(RefreshToken).where(RefreshToken.expires_at <= datetime.now(timezone.utc)))
+        await session.commit()
+        return result.rowcount
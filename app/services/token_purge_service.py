@@ -0,0 +1,69 @@
+from builtins import Exception, dict, float, int
+import asyncio
+from typing import Callable, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.dependencies import get_settings
+from app.services.refresh_token_service import RefreshTokenService
+from app.services.token_revocation_service import TokenRevocationService
+from app.utils.metrics import register_metrics_source
+import logging
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+class ExpiredTokenPurger:
+    """
+    Deletes expired rows from `refresh_tokens` and `revoked_tokens` every `interval` seconds.
+
+    Every refresh adds a row and every logout or forced logout adds a revocation, so without the purge
+    both tables and their indexes would grow without bound. Each worker runs its own purge; the DELETEs
+    are idempotent, so overlapping purges only repeat work.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+        self.runs = 0
+        self.refresh_tokens_purged = 0
+        self.revocations_purged = 0
+
+    async def purge(self, session: AsyncSession):
+        """Deletes expired refresh tokens and revocations using `session`."""
+        self.refresh_tokens_purged += await RefreshTokenService.purge_expired(session)
+        self.revocations_purged += await TokenRevocationService.purge_expired(session)
+        self.runs += 1
+
+    async def _purge_in_background(self, session_factory: Callable[[], AsyncSession]):
+        while True:
+            try:
+                async with session_factory() as session:
+                    await self.purge(session)
+            except Exception as e:
+                logger.error(f"Expired token purge failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self, session_factory: Callable[[], AsyncSession]):
+        """Starts purging in the background with sessions from `session_factory`, unless disabled."""
+        if self.interval > 0 and (self._task is None or self._task.done()):
+            self._task = asyncio.get_running_loop().create_task(self._purge_in_background(session_factory))
+
+    async def stop(self):
+        """Cancels the background purge."""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "interval_seconds": self.interval,
+            "runs": self.runs,
+            "refresh_tokens_purged": self.refresh_tokens_purged,
+            "revocations_purged": self.revocations_purged,
+        }
+
+token_purger = ExpiredTokenPurger(settings.token_purge_interval_seconds)
+register_metrics_source("token_purge", token_purger.stats)
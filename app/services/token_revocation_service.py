@@ -0,0 +1,165 @@
+from builtins import Exception, bool, dict, float, int, len, list, str
+from datetime import datetime, timedelta, timezone
+import time
+from typing import Dict, Iterable, Optional
+from sqlalchemy import delete, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from settings.config import settings
+from app.models.token_model import RevokedToken
+from app.utils.metrics import register_metrics_source
+import logging
+
+logger = logging.getLogger(__name__)
+
+class TokenRevocationList:
+    """
+    Per-worker in-memory view of the `revoked_tokens` table.
+
+    Revoked JWT IDs and revoked subjects are held in hash maps, so checking a token that was not revoked,
+    the common case, is a dictionary lookup with no database query. The maps are brought up to date
+    incrementally, at most once every `token_revocation_refresh_seconds`, by loading only the rows
+    revoked since the previous load. Revocations made by this worker apply immediately; those made by
+    other workers apply within one refresh interval.
+    """
+
+    def __init__(self, refresh_seconds: float):
+        self.refresh_seconds = refresh_seconds
+        self._jtis: Dict[str, datetime] = {}  # jti -> when the revoked token expires
+        self._subjects: Dict[str, datetime] = {}  # subject -> tokens issued up to this time are revoked
+        self._watermark: Optional[datetime] = None
+        self._next_refresh = 0.0
+        self._refreshing = False
+        self.checks = 0
+        self.revoked_hits = 0
+        self.refreshes = 0
+        self.refresh_failures = 0
+
+    def is_revoked(self, claims: dict) -> bool:
+        """Checks decoded token claims against the in-memory revocations."""
+        self.checks += 1
+        jti = claims.get("jti")
+        if jti is not None and jti in self._jtis:
+            self.revoked_hits += 1
+            return True
+        revoked_before = self._subjects.get(claims.get("sub"))
+        if revoked_before is not None:
+            issued_at = claims.get("iat")
+            # Tokens without an issue time cannot prove they post-date the revocation
+            if issued_at is None or issued_at <= revoked_before.timestamp():
+                self.revoked_hits += 1
+                return True
+        return False
+
+    def _remember(self, jti: Optional[str], subject: Optional[str], revoked_at: datetime, expires_at: datetime):
+        if jti is not None:
+            self._jtis[jti] = expires_at
+        if subject is not None:
+            current = self._subjects.get(subject)
+            if current is None or revoked_at > current:
+                self._subjects[subject] = revoked_at
+
+    def _prune(self, now: datetime):
+        self._jtis = {jti: expires_at for jti, expires_at in self._jtis.items() if expires_at > now}
+        oldest_live_token = now - timedelta(minutes=settings.access_token_expire_minutes)
+        self._subjects = {subject: revoked_at for subject, revoked_at in self._subjects.items() if revoked_at > oldest_live_token}
+
+    async def refresh_if_stale(self, session: AsyncSession):
+        """Loads revocations made since the last refresh once the refresh interval has passed."""
+        if self._refreshing or time.monotonic() < self._next_refresh:
+            return
+        self._refreshing = True
+        try:
+            now = datetime.now(timezone.utc)
+            query = select(
+                RevokedToken.jti, RevokedToken.subject, RevokedToken.revoked_at, RevokedToken.expires_at, RevokedToken.created_at
+            ).where(RevokedToken.expires_at > now)
+            if self._watermark is not None:
+                # Loads are keyed on created_at, which only the database's clock sets; revoked_at comes
+                # from whichever host revoked. Overlap the previous window: created_at is set before the
+                # inserting transaction commits, so a row can become visible after rows written later.
+                query = query.where(RevokedToken.created_at > self._watermark - timedelta(seconds=self.refresh_seconds))
+            result = await session.execute(query)
+            for jti, subject, revoked_at, expires_at, created_at in result:
+                self._remember(jti, subject, revoked_at, expires_at)
+                if self._watermark is None or created_at > self._watermark:
+                    self._watermark = created_at
+            self._prune(now)
+            self.refreshes += 1
+        except Exception as e:
+            # Keep authenticating against the revocations already loaded instead of failing every request
+            self.refresh_failures += 1
+            logger.warning(f"Loading token revocations failed; retrying in {self.refresh_seconds}s: {e}")
+            await session.rollback()
+        finally:
+            self._next_refresh = time.monotonic() + self.refresh_seconds
+            self._refreshing = False
+
+    def reset(self):
+        """Forgets all revocations so the next refresh reloads them from the database."""
+        self._jtis.clear()
+        self._subjects.clear()
+        self._watermark = None
+        self._next_refresh = 0.0
+
+    def stats(self) -> dict:
+        return {
+            "revoked_jtis": len(self._jtis),
+            "revoked_subjects": len(self._subjects),
+            "checks": self.checks,
+            "revoked_hits": self.revoked_hits,
+            "refreshes": self.refreshes,
+            "refresh_failures": self.refresh_failures,
+        }
+
+revocation_list = TokenRevocationList(settings.token_revocation_refresh_seconds)
+register_metrics_source("token_revocation", revocation_list.stats)
+
+class TokenRevocationService:
+    """Persists access token revocations and applies them to this worker's revocation list."""
+
+    @classmethod
+    async def revoke_token(cls, session: AsyncSession, jti: str, expires_at: datetime):
+        """
+        Revoke a single access token by its JWT ID.
+
+        Args:
+            session: Database session
+            jti: JWT ID of the token
+            expires_at: The token's expiry; the revocation is kept until then
+        """
+        await cls._insert(session, [{"jti": jti, "expires_at": expires_at}])
+
+    @classmethod
+    async def revoke_subjects(cls, session: AsyncSession, subjects: Iterable[str]):
+        """
+        Revoke every access token issued so far to the given JWT subjects.
+
+        Args:
+            session: Database session
+            subjects: Subjects to revoke; a user may appear under more than one (id and email)
+        """
+        # Stamped with the clock that sets tokens' iat rather than the database's, so clock skew between
+        # them cannot spare earlier tokens or revoke ones minted just after
+        revoked_at = datetime.now(timezone.utc)
+        expires_at = revoked_at + timedelta(minutes=settings.access_token_expire_minutes)
+        await cls._insert(session, [
+            {"subject": subject, "revoked_at": revoked_at, "expires_at": expires_at} for subject in subjects
+        ])
+
+    @classmethod
+    async def _insert(cls, session: AsyncSession, rows: list):
+        result = await session.execute(
+            insert(RevokedToken).returning(RevokedToken.jti, RevokedToken.subject, RevokedToken.revoked_at, RevokedToken.expires_at),
+            rows,
+        )
+        revoked = result.all()
+        await session.commit()
+        for jti, subject, revoked_at, expires_at in revoked:
+            revocation_list._remember(jti, subject, revoked_at, expires_at)
+
+    @classmethod
+    async def purge_expired(cls, session: AsyncSession) -> int:
+        """Deletes revocations whose tokens have all expired. Returns the number of rows removed."""
+        result = await session.execute(delete(RevokedToken).where(RevokedToken.expires_at <= datetime.now(timezone.utc)))
+        await session.commit()
+        return result.rowcount
@@ -0,0 +1,111 @@
+from builtins import ValueError, classmethod, dict, float, int, max, str
+from enum import Enum
+import time
+from typing import Optional, Sequence, Tuple
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.dependencies import get_settings
+from app.models.user_model import User
+from app.utils.metrics import register_metrics_source
+import logging
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+class CountStrategy(str, Enum):
+    """How the total number of users reported with a users page is obtained."""
+    EXACT = "exact"          # SELECT count(*), always correct, cost grows with the table
+    CACHED = "cached"        # Per-worker counter, adjusted on create/delete and recounted after a TTL
+    ESTIMATED = "estimated"  # Planner statistics, constant cost, as fresh as the last ANALYZE
+
+class UserCountCache:
+    """
+    Per-worker running total of users.
+
+    The total is recounted with `count(*)` at most once every `ttl_seconds`; in between it is adjusted
+    by the creates and deletes made through this worker, so it drifts only by what other workers
+    changed since the last recount.
+    """
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._total: Optional[int] = None
+        self._expires_at = 0.0
+        self.hits = 0
+        self.recounts = 0
+
+    def get(self) -> Optional[int]:
+        if self._total is None or time.monotonic() >= self._expires_at:
+            return None
+        self.hits += 1
+        return self._total
+
+    def set(self, total: int):
+        self._total = total
+        self._expires_at = time.monotonic() + self.ttl_seconds
+        self.recounts += 1
+
+    def adjust(self, delta: int):
+        if self._total is not None:
+            self._total = max(0, self._total + delta)
+
+    def invalidate(self):
+        self._total = None
+
+    def stats(self) -> dict:
+        return {"total": self._total, "hits": self.hits, "recounts": self.recounts, "ttl_seconds": self.ttl_seconds}
+
+user_count_cache = UserCountCache(settings.user_count_cache_seconds)
+register_metrics_source("user_count", user_count_cache.stats)
+
+# Built once; filtered counts extend a copy of it
+USER_COUNT = select(func.count()).select_from(User)
+
+class UserCountService:
+    @classmethod
+    async def exact(cls, session: AsyncSession, conditions: Sequence = ()) -> int:
+        """Counts users, or those matching `conditions` if given."""
+        result = await session.execute(USER_COUNT.where(*conditions) if conditions else USER_COUNT)
+        return result.scalar()
+
+    @classmethod
+    async def estimated(cls, session: AsyncSession) -> Optional[int]:
+        """Returns the planner's row estimate for users, or None if the table was never analyzed."""
+        result = await session.execute(
+            text("SELECT reltuples FROM pg_class WHERE oid = to_regclass(:table)"), {"table": User.__tablename__}
+        )
+        reltuples = result.scalar()
+        # -1 (or 0 on older servers) until VACUUM/ANALYZE has looked at the table
+        if reltuples is None or reltuples <= 0:
+            return None
+        return int(reltuples)
+
+    @classmethod
+    async def total(cls, session: AsyncSession, strategy: Optional[str] = None) -> Tuple[int, CountStrategy]:
+        """
+        Count users with the configured strategy.
+
+        Args:
+            session: Database session
+            strategy: Overrides `settings.user_count_strategy`
+
+        Returns:
+            Tuple[int, CountStrategy]: The total and the strategy that produced it. An estimate that is
+            not available yet falls back to an exact count, and says so.
+
+        Raises:
+            ValueError: If the strategy is unknown.
+        """
+        strategy = CountStrategy(strategy or settings.user_count_strategy)
+        if strategy is CountStrategy.ESTIMATED:
+            estimate = await cls.estimated(session)
+            if estimate is not None:
+                return estimate, CountStrategy.ESTIMATED
+            return await cls.exact(session), CountStrategy.EXACT
+        if strategy is CountStrategy.CACHED:
+            total = user_count_cache.get()
+            if total is None:
+                total = await cls.exact(session)
+                user_count_cache.set(total)
+            return total, CountStrategy.CACHED
+        return await cls.exact(session), CountStrategy.EXACT
@@ -0,0 +1,221 @@
+from builtins import Exception, ValueError, classmethod, dict, len, list, set, str, zip
+import uuid
+from typing import AsyncIterator, Iterable, List, Set, Tuple
+from pydantic import ValidationError
+from sqlalchemy import String, any_, bindparam, select
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import unit_of_work
+from app.dependencies import get_settings
+from app.models.user_model import User, UserRole
+from app.schemas.user_schemas import BulkImportReport, BulkImportRowResult, UserImportRow
+from app.services.email_service import EmailService
+from app.services.user_count_service import user_count_cache
+from app.utils.nickname_gen import generate_nickname
+from app.utils.record_formats import ParsedRecord
+from app.utils.security import PasswordHashingBusyError, async_hash_passwords, generate_verification_token, password_hashers
+import logging
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Returned for each inserted user; enough to report the row and send its verification email
+_INSERTED_COLUMNS = (User.id, User.email, User.first_name, User.verification_token)
+
+class BulkImportTooLarge(Exception):
+    """Raised when an upload has more rows than `bulk_import_max_rows`."""
+
+class UserImportService:
+    """
+    Imports users from a stream of parsed records, a batch at a time.
+
+    Per batch: rows are validated, emails and nicknames are checked against the table with one
+    `= ANY(...)` query each, passwords are hashed concurrently, and the users are written with one
+    multi-row INSERT ... ON CONFLICT DO NOTHING RETURNING, committed on its own. A row that conflicts
+    with a concurrent insert is reported as a duplicate instead of failing the batch.
+    """
+
+    @staticmethod
+    def _error(result: dict, status: str, message: str):
+        result.update(status=status, error=message)
+
+    @classmethod
+    async def _existing(cls, session: AsyncSession, column, values: Iterable[str]) -> Set[str]:
+        values = list(values)
+        if not values:
+            return set()
+        query = select(column).where(column == any_(bindparam("values", values, type_=ARRAY(String))))
+        result = await session.execute(query)
+        return set(result.scalars().all())
+
+    @classmethod
+    async def _assign_nicknames(cls, session: AsyncSession, rows: List[dict], taken: Set[str]):
+        # Generated nicknames are redrawn until none collides with the table or this import
+        pending = [row for row in rows if not row.get("nickname")]
+        while pending:
+            for row in pending:
+                row["nickname"] = generate_nickname()
+            candidates = [row["nickname"] for row in pending]
+            clashes = await cls._existing(session, User.nickname, candidates)
+            seen: Set[str] = set()
+            retry = []
+            for row in pending:
+                nickname = row["nickname"]
+                if nickname in clashes or nickname in taken or nickname in seen:
+                    retry.append(row)
+                else:
+                    seen.add(nickname)
+            taken.update(seen)
+            pending = retry
+
+    @classmethod
+    async def _import_batch(
+        cls,
+        session: AsyncSession,
+        batch: List[ParsedRecord],
+        emails_seen: Set[str],
+        nicknames_seen: Set[str],
+    ) -> Tuple[List[dict], list]:
+        results = []
+        candidates: List[Tuple[dict, dict]] = []  # (result, row values)
+        for row_number, record, parse_error in batch:
+            result = {"row": row_number, "status": "created", "email": None, "id": None, "error": None}
+            results.append(result)
+            if parse_error:
+                cls._error(result, "invalid", parse_error)
+                continue
+            result["email"] = record.get("email")
+            try:
+                data = UserImportRow(**record).model_dump(exclude={"role"})
+            except ValidationError as e:
+                first = e.errors()[0]
+                location = ".".join(str(part) for part in first["loc"])
+                cls._error(result, "invalid", f"{location}: {first['msg']}" if location else first["msg"])
+                continue
+            if data["hashed_password"] and password_hashers.identify(data["hashed_password"]) is None:
+                cls._error(result, "invalid", "hashed_password is not a supported hash format")
+                continue
+            if data["email"] in emails_seen:
+                cls._error(result, "duplicate", "Email appears earlier in this import")
+                continue
+            emails_seen.add(data["email"])
+            candidates.append((result, data))
+
+        existing_emails = await cls._existing(session, User.email, (data["email"] for _, data in candidates))
+        requested = [data["nickname"] for _, data in candidates if data.get("nickname")]
+        existing_nicknames = await cls._existing(session, User.nickname, requested)
+        accepted = []
+        for result, data in candidates:
+            if data["email"] in existing_emails:
+                cls._error(result, "duplicate", "Email already exists")
+            elif data.get("nickname") and (data["nickname"] in existing_nicknames or data["nickname"] in nicknames_seen):
+                cls._error(result, "duplicate", "Nickname already exists")
+            else:
+                if data.get("nickname"):
+                    nicknames_seen.add(data["nickname"])
+                accepted.append((result, data))
+        if not accepted:
+            return results, []
+
+        await cls._assign_nicknames(session, [data for _, data in accepted], nicknames_seen)
+        to_hash = [data for _, data in accepted if not data["hashed_password"]]
+        hashes = await async_hash_passwords([data["password"] for data in to_hash], settings.bulk_import_hash_concurrency)
+        for data, hashed in zip(to_hash, hashes):
+            data["hashed_password"] = hashed
+
+        rows = []
+        for _, data in accepted:
+            data.pop("password")
+            rows.append({
+                **data,
+                "id": uuid.uuid4(),
+                "role": UserRole.ANONYMOUS,
+                "email_verified": False,
+                "verification_token": generate_verification_token(),
+                "is_professional": False,
+                "is_locked": False,
+                "failed_login_attempts": 0,
+            })
+        async with unit_of_work(session):
+            result = await session.execute(insert(User).on_conflict_do_nothing().returning(*_INSERTED_COLUMNS), rows)
+            inserted = {row.email: row for row in result.all()}
+        for result_entry, data in accepted:
+            row = inserted.get(data["email"])
+            if row is None:
+                cls._error(result_entry, "duplicate", "Email or nickname was taken during the import")
+            else:
+                result_entry["id"] = row.id
+        return results, list(inserted.values())
+
+    @classmethod
+    async def import_users(cls, session: AsyncSession, records: AsyncIterator[ParsedRecord]) -> Tuple[BulkImportReport, list]:
+        """
+        Import users from parsed records.
+
+        Imported users are created like registered ones: unverified, with the ANONYMOUS role and a
+        verification token. Each batch is committed on its own, so when the upload turns out to be too
+        large or malformed, or hashing is saturated, after a batch was committed, the import stops and
+        returns a truncated report of the committed batches instead of raising; the rows it lists are
+        exactly the first `total` rows of the upload.
+
+        Args:
+            session: Database session
+            records: (row number, record, parse error) tuples, e.g. from `parse_records`
+
+        Returns:
+            Tuple[BulkImportReport, list]: The per-row report, and the inserted users (id, email,
+            first_name, verification_token) to send verification emails to.
+
+        Raises:
+            BulkImportTooLarge: If there are more than `bulk_import_max_rows` records, before any batch was committed.
+            ValueError: If the upload cannot be parsed, before any batch was committed.
+            PasswordHashingBusyError: If the hashing pool stays saturated, before any batch was committed.
+        """
+        results: List[dict] = []
+        created = []
+        emails_seen: Set[str] = set()
+        nicknames_seen: Set[str] = set()
+        batch: List[ParsedRecord] = []
+        error = None
+        try:
+            async for parsed in records:
+                if parsed[0] > settings.bulk_import_max_rows:
+                    raise BulkImportTooLarge(f"An import may contain at most {settings.bulk_import_max_rows} rows")
+                batch.append(parsed)
+                if len(batch) >= settings.bulk_import_batch_size:
+                    batch_results, batch_created = await cls._import_batch(session, batch, emails_seen, nicknames_seen)
+                    results.extend(batch_results)
+                    created.extend(batch_created)
+                    batch = []
+            if batch:
+                batch_results, batch_created = await cls._import_batch(session, batch, emails_seen, nicknames_seen)
+                results.extend(batch_results)
+                created.extend(batch_created)
+        except (BulkImportTooLarge, ValueError, PasswordHashingBusyError) as e:
+            if not results:
+                raise
+            # Earlier batches are committed: report them, so their users are counted and emailed
+            logger.warning(f"Bulk import stopped after {len(results)} rows: {e}")
+            error = str(e)
+        user_count_cache.adjust(len(created))
+        report = BulkImportReport(
+            total=len(results),
+            created=len(created),
+            failed=len(results) - len(created),
+            rows=[BulkImportRowResult(**result) for result in results],
+            truncated=error is not None,
+            error=error,
+        )
+        return report, created
+
+    @classmethod
+    async def send_verification_emails(cls, email_service: EmailService, users: list):
+        """Sends the verification emails of imported users; a failed send is logged and skipped."""
+        sent = 0
+        for user in users:
+            try:
+                await email_service.send_verification_email(user)
+                sent += 1
+            except Exception as e:
+                logger.error(f"Failed to send verification email to imported user {user.id}: {e}")
+        logger.info(f"Sent {sent} of {len(users)} verification emails for imported users")
@@ -1,80 +1,262 @@
-from builtins import Exception, bool, classmethod, int, str
+from builtins import Exception, ValueError, bool, chr, classmethod, getattr, int, isinstance, len, list, ord, range, str
 from datetime import datetime, timezone
 import secrets
-from typing import Optional, Dict, List
+from enum import Enum
+from typing import AsyncIterator, Optional, Dict, List, Tuple, Union
 from pydantic import ValidationError
-from sqlalchemy import func, null, update, select
+from sqlalchemy import Row, String, any_, bindparam, exists, func, null, or_, tuple_, update, select
+from sqlalchemy.dialects.postgresql import ARRAY, UUID as PG_UUID, insert
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import Database, unit_of_work
 from app.dependencies import get_email_service, get_settings
-from app.models.user_model import User
-from app.schemas.user_schemas import UserCreate, UserUpdate
-from app.utils.nickname_gen import generate_nickname
-from app.utils.security import generate_verification_token, hash_password, verify_password
+from app.models.user_model import SEARCH_COLUMNS, User
+from app.schemas.user_schemas import AutocompleteField, SortOrder, UserCreate, UserListFilters, UserSortField, UserUpdate
+from app.utils.batch_loader import BatchLoader
+from app.utils.cursor import NEXT, PREV, decode_cursor, encode_cursor
+from app.utils.login_attempts import login_attempt_tracker
+from app.utils.metrics import register_metrics_source
+from app.utils.security import async_hash_password, async_verify_password, generate_verification_token, needs_rehash
 from uuid import UUID
 from app.services.email_service import EmailService
+from app.services.nickname_service import nickname_pool
+from app.services.user_count_service import CountStrategy, UserCountService, user_count_cache
 from app.models.user_model import UserRole
 import logging
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
 
+# Advisory lock taken while deciding whether a signup is the first user
+FIRST_USER_LOCK_ID = 0x55534552
+
+class UserExistsError(Exception):
+    """Raised when creating a user whose email is already registered."""
+
+class LoginOutcome(Enum):
+    """Result of an authentication attempt, used by the login route to pick a response."""
+    SUCCESS = "SUCCESS"
+    INVALID_CREDENTIALS = "INVALID_CREDENTIALS"
+    UNVERIFIED = "UNVERIFIED"
+    LOCKED = "LOCKED"
+    THROTTLED = "THROTTLED"
+
+# What read paths select: the columns of UserResponse plus the pagination key. Secrets such as
+# hashed_password and verification_token are only loaded by the full-entity lookups writes use.
+PROFILE_COLUMNS = (
+    User.id,
+    User.email,
+    User.nickname,
+    User.first_name,
+    User.last_name,
+    User.bio,
+    User.profile_picture_url,
+    User.linkedin_profile_url,
+    User.github_profile_url,
+    User.role,
+    User.is_professional,
+    User.created_at,
+)
+PROFILE_FIELDS = tuple(column.key for column in PROFILE_COLUMNS)
+
+# Hot queries, built once and executed with named parameters. A statement object memoizes its cache
+# key, so each call skips building the construct and generating the key before the compiled-SQL cache
+# lookup, and the fixed SQL text is reused as one asyncpg prepared statement per connection (see
+# db_statement_cache_size). Queries whose shape depends on the call's filters are still built per call.
+USER_BY_EMAIL = select(User).where(User.email == bindparam("email"))
+USER_BY_NICKNAME = select(User).where(User.nickname == bindparam("nickname"))
+USER_BY_ID = select(User).where(User.id == bindparam("id"))
+USER_ID_BY_EMAIL = select(User.id).where(User.email == bindparam("email"))
+USER_LOCKED_BY_EMAIL = select(User.is_locked).where(User.email == bindparam("email"))
+PROFILE_BY_ID = select(*PROFILE_COLUMNS).where(User.id == bindparam("id"))
+USERS_BY_IDS = select(User).where(User.id == any_(bindparam("ids", type_=ARRAY(PG_UUID(as_uuid=True)))))
+PROFILES_BY_IDS = select(*PROFILE_COLUMNS).where(User.id == any_(bindparam("ids", type_=ARRAY(PG_UUID(as_uuid=True)))))
+
+def _list_statement(sort_by: UserSortField, order: SortOrder):
+    sort_column = getattr(User, sort_by.value)
+    ordering = (sort_column.desc(), User.id.desc()) if order is SortOrder.DESC else (sort_column, User.id)
+    return select(*PROFILE_COLUMNS).order_by(*ordering).offset(bindparam("skip")).limit(bindparam("limit"))
+
+# GET /users/ offset pages, one statement per sort; filters are added per call
+PROFILE_LISTS = {(sort_by, order): _list_statement(sort_by, order) for sort_by in UserSortField for order in SortOrder}
+
+def _prefix_upper_bound(prefix: str) -> Optional[str]:
+    """
+    The least string above every string that starts with `prefix`, in code point (and so "C") order.
+
+    The last code point that can be incremented is, skipping the surrogates UTF-8 cannot encode, and
+    trailing U+10FFFF are dropped; a prefix made only of U+10FFFF has no upper bound.
+    """
+    while prefix:
+        code = ord(prefix[-1])
+        if code < 0x10FFFF:
+            code = 0xE000 if code + 1 == 0xD800 else code + 1
+            return prefix[:-1] + chr(code)
+        prefix = prefix[:-1]
+    return None
+
 class UserService:
+    # Set once this worker has seen a user row; from then on no signup can be the first
+    _users_exist = False
+
     @classmethod
-    async def _execute_query(cls, session: AsyncSession, query):
+    async def _read(cls, session: AsyncSession, query, params: Optional[Dict] = None):
+        # Lookups never commit: on a read-only session the transaction is simply discarded, and
+        # inside a write flow the read joins the unit of work that commits the write.
         try:
-            result = await session.execute(query)
-            await session.commit()
-            return result
+            return await session.execute(query, params)
         except SQLAlchemyError as e:
             logger.error(f"Database error: {e}")
             await session.rollback()
             return None
 
     @classmethod
-    async def _fetch_user(cls, session: AsyncSession, **filters) -> Optional[User]:
-        query = select(User).filter_by(**filters)
-        result = await cls._execute_query(session, query)
+    async def _fetch_user(cls, session: AsyncSession, query, **params) -> Optional[User]:
+        result = await cls._read(session, query, params)
         return result.scalars().first() if result else None
 
+    @classmethod
+    async def _email_exists(cls, session: AsyncSession, email: str) -> bool:
+        return await cls.get_id_by_email(session, email) is not None
+
+    @staticmethod
+    def _coalesces(session: AsyncSession) -> bool:
+        # Only read-only sessions hand their lookups to the shared loaders. Write flows need the entity
+        # in their own session, read from the primary, so they keep querying it directly.
+        return "router" in session.info
+
+    @classmethod
+    async def _load_by_ids(cls, query, user_ids: List[UUID]) -> Dict[UUID, Union[User, Row]]:
+        # Batches run on their own short-lived read session, as the waiting requests each have another
+        async with Database.get_read_session_factory()() as session:
+            result = await cls._read(session, query, {"ids": user_ids})
+            if result is None:
+                return {}
+            rows = result.scalars() if query is USERS_BY_IDS else result
+            return {row.id: row for row in rows}
+
     @classmethod
     async def get_by_id(cls, session: AsyncSession, user_id: UUID) -> Optional[User]:
-        return await cls._fetch_user(session, id=user_id)
+        """
+        Fetch a user by id.
+
+        On a read-only session, concurrent calls from all requests of this worker within one batch
+        window are coalesced into a single `WHERE id = ANY(...)` query, and the user is returned
+        detached from `session`.
+        """
+        try:
+            user_id = user_id if isinstance(user_id, UUID) else UUID(str(user_id))
+        except ValueError:
+            return None
+        if cls._coalesces(session):
+            return await user_loader.load(user_id)
+        return await cls._fetch_user(session, USER_BY_ID, id=user_id)
+
+    @classmethod
+    async def get_id_by_email(cls, session: AsyncSession, email: str) -> Optional[UUID]:
+        result = await cls._read(session, USER_ID_BY_EMAIL, {"email": email})
+        return result.scalar() if result else None
+
+    @classmethod
+    async def get_profiles(cls, session: AsyncSession, user_ids: List[UUID] = (), emails: List[str] = ()) -> List[Row]:
+        """Fetch the profiles of many users by id and/or email with one query, as rows of `PROFILE_COLUMNS`."""
+        conditions = []
+        if user_ids:
+            conditions.append(User.id == any_(bindparam("ids", list(user_ids), type_=ARRAY(PG_UUID(as_uuid=True)))))
+        if emails:
+            conditions.append(User.email == any_(bindparam("emails", list(emails), type_=ARRAY(String))))
+        if not conditions:
+            return []
+        result = await cls._read(session, select(*PROFILE_COLUMNS).where(or_(*conditions)))
+        return result.all() if result else []
+
+    @classmethod
+    async def get_profile(cls, session: AsyncSession, user_id: UUID) -> Optional[Row]:
+        """
+        Fetch the public profile of a user as a lightweight row of `PROFILE_COLUMNS`.
+
+        Use `get_by_id` instead when the user is going to be modified. On a read-only session, concurrent
+        calls are coalesced as for `get_by_id`.
+        """
+        if cls._coalesces(session):
+            return await profile_loader.load(user_id)
+        result = await cls._read(session, PROFILE_BY_ID, {"id": user_id})
+        return result.first() if result else None
 
     @classmethod
     async def get_by_nickname(cls, session: AsyncSession, nickname: str) -> Optional[User]:
-        return await cls._fetch_user(session, nickname=nickname)
+        return await cls._fetch_user(session, USER_BY_NICKNAME, nickname=nickname)
 
     @classmethod
     async def get_by_email(cls, session: AsyncSession, email: str) -> Optional[User]:
-        return await cls._fetch_user(session, email=email)
+        return await cls._fetch_user(session, USER_BY_EMAIL, email=email)
+
+    @classmethod
+    async def _is_first_user(cls, session: AsyncSession) -> bool:
+        """
+        Whether the user about to be inserted is the first one, who becomes the admin.
+
+        Must run in the inserting transaction: the advisory lock is held until it commits, so concurrent
+        first signups cannot both see an empty table. Once users are known to exist, which is every
+        signup after the first per worker, this issues no query at all.
+        """
+        if cls._users_exist:
+            return False
+        await session.execute(select(func.pg_advisory_xact_lock(FIRST_USER_LOCK_ID)))
+        cls._users_exist = (await session.execute(select(exists().select_from(User)))).scalar()
+        return not cls._users_exist
+
+    @classmethod
+    async def _insert_user(cls, session: AsyncSession, values: Dict) -> Optional[User]:
+        # Unique constraints do the duplicate checks: a conflicting row is not inserted and RETURNING is
+        # empty. Only then is it worth a query to tell a taken email from a taken pooled nickname.
+        for _ in range(settings.nickname_claim_attempts):
+            values['nickname'] = await nickname_pool.claim(session)
+            async with unit_of_work(session):
+                if await cls._is_first_user(session):
+                    values.update(role=UserRole.ADMIN, email_verified=True, verification_token=None)
+                else:
+                    values.update(role=UserRole.ANONYMOUS, email_verified=False, verification_token=generate_verification_token())
+                query = insert(User).values(**values).on_conflict_do_nothing().returning(User)
+                new_user = (await session.execute(query)).scalar_one_or_none()
+            if new_user is not None:
+                cls._users_exist = True
+                return new_user
+            if await cls._email_exists(session, values['email']):
+                raise UserExistsError(f"A user with email {values['email']} already exists")
+            nickname_pool.record_conflict()
+        return None
 
     @classmethod
     async def create(cls, session: AsyncSession, user_data: Dict[str, str], email_service: EmailService) -> Optional[User]:
+        """
+        Create a user with a pooled nickname. The first user ever created becomes a verified admin;
+        everyone else starts as an unverified ANONYMOUS user and is sent a verification email.
+
+        In the common case this is an indexed email lookup, then one INSERT ... ON CONFLICT DO NOTHING
+        RETURNING and its commit. The lookup rejects a known email before the password is hashed, so
+        signups with registered emails cannot tie up the hashing pool, and its transaction ends before
+        hashing starts; the INSERT still catches a signup racing for the same email.
+
+        Raises:
+            UserExistsError: If the email is already registered.
+            PasswordHashingBusyError: If the hashing pool stays saturated.
+        """
         try:
             validated_data = UserCreate(**user_data).model_dump()
-            existing_user = await cls.get_by_email(session, validated_data['email'])
-            if existing_user:
-                logger.error("User with given email already exists.")
+            email_taken = await cls._email_exists(session, validated_data['email'])
+            # End the lookup's transaction so the pooled connection is not held while the password hashes
+            await session.commit()
+            if email_taken:
+                raise UserExistsError(f"A user with email {validated_data['email']} already exists")
+            validated_data['hashed_password'] = await async_hash_password(validated_data.pop('password'))
+            new_user = await cls._insert_user(session, validated_data)
+            if new_user is None:
+                logger.error("No free nickname could be claimed for the new user.")
                 return None
-            validated_data['hashed_password'] = hash_password(validated_data.pop('password'))
-            new_user = User(**validated_data)
-            new_nickname = generate_nickname()
-            while await cls.get_by_nickname(session, new_nickname):
-                new_nickname = generate_nickname()
-            new_user.nickname = new_nickname
             logger.info(f"User Role: {new_user.role}")
-            user_count = await cls.count(session)
-            new_user.role = UserRole.ADMIN if user_count == 0 else UserRole.ANONYMOUS            
-            if new_user.role == UserRole.ADMIN:
-                new_user.email_verified = True
-            else:
-                new_user.verification_token = generate_verification_token()
+            user_count_cache.adjust(1)
 
-            session.add(new_user)
-            await session.commit()
-            await session.refresh(new_user)
-            
             # Send verification email only after user is committed to the database and has an ID
             if new_user.role != UserRole.ADMIN and new_user.verification_token:
                 await email_service.send_verification_email(new_user)
@@ -85,86 +267,329 @@ class UserService:
             return None
 
     @classmethod
-    async def update(cls, session: AsyncSession, user_id: UUID, update_data: Dict[str, str]) -> Optional[User]:
+    async def update(cls, session: AsyncSession, user_id: UUID, update_data: Dict[str, str]) -> Optional[Row]:
+        """
+        Update a user with one UPDATE ... RETURNING, and return the updated row of `PROFILE_COLUMNS`.
+
+        Returns None if the user does not exist or the update is invalid.
+        """
         try:
-            # validated_data = UserUpdate(**update_data).dict(exclude_unset=True)
             validated_data = UserUpdate(**update_data).model_dump(exclude_unset=True)
 
             if 'password' in validated_data:
-                validated_data['hashed_password'] = hash_password(validated_data.pop('password'))
-            query = update(User).where(User.id == user_id).values(**validated_data).execution_options(synchronize_session="fetch")
-            await cls._execute_query(session, query)
-            updated_user = await cls.get_by_id(session, user_id)
+                validated_data['hashed_password'] = await async_hash_password(validated_data.pop('password'))
+            query = update(User).where(User.id == user_id).values(**validated_data).returning(*PROFILE_COLUMNS)
+            async with unit_of_work(session):
+                updated_user = (await session.execute(query)).first()
             if updated_user:
-                session.refresh(updated_user)  # Explicitly refresh the updated user object
                 logger.info(f"User {user_id} updated successfully.")
-                return updated_user
             else:
-                logger.error(f"User {user_id} not found after update attempt.")
-            return None
+                logger.error(f"User {user_id} not found for update.")
+            return updated_user
         except Exception as e:  # Broad exception handling for debugging
             logger.error(f"Error during user update: {e}")
             return None
 
+    @classmethod
+    async def set_professional_status(cls, session: AsyncSession, user_id: UUID, is_professional: bool) -> Tuple[Optional[Row], bool]:
+        """
+        Set a user's professional status, as a row of `PROFILE_COLUMNS`.
+
+        The UPDATE only matches when the status actually changes, so a change is one statement and
+        its RETURNING row; only a no-op costs a second query to read the profile.
+
+        Returns:
+            Tuple[Optional[Row], bool]: The user (None if not found), and whether the status changed.
+        """
+        query = (
+            update(User)
+            .where(User.id == user_id, User.is_professional.is_distinct_from(is_professional))
+            .values(is_professional=is_professional, professional_status_updated_at=func.now())
+            .returning(*PROFILE_COLUMNS)
+        )
+        async with unit_of_work(session):
+            updated_user = (await session.execute(query)).first()
+        if updated_user is not None:
+            return updated_user, True
+        return await cls.get_profile(session, user_id), False
+
     @classmethod
     async def delete(cls, session: AsyncSession, user_id: UUID) -> bool:
         user = await cls.get_by_id(session, user_id)
         if not user:
             logger.info(f"User with ID {user_id} not found.")
             return False
-        await session.delete(user)
-        await session.commit()
+        async with unit_of_work(session):
+            await session.delete(user)
+        user_count_cache.adjust(-1)
         return True
 
     @classmethod
-    async def list_users(cls, session: AsyncSession, skip: int = 0, limit: int = 10) -> List[User]:
-        query = select(User).offset(skip).limit(limit)
-        result = await cls._execute_query(session, query)
-        return result.scalars().all() if result else []
+    def filter_conditions(cls, filters: Optional[UserListFilters]) -> list:
+        """
+        SQL predicates for the set fields of `filters`.
+
+        Flags compare against literal true/false rather than a bound parameter, so the planner can match
+        the partial indexes on users whatever plan the statement is cached with.
+        """
+        if filters is None:
+            return []
+        conditions = []
+        if filters.role is not None:
+            conditions.append(User.role == filters.role)
+        for flag in ("is_locked", "is_professional", "email_verified"):
+            value = getattr(filters, flag)
+            if value is not None:
+                conditions.append(getattr(User, flag) == value)
+        if filters.created_after is not None:
+            conditions.append(User.created_at >= filters.created_after)
+        if filters.created_before is not None:
+            conditions.append(User.created_at < filters.created_before)
+        if filters.last_login_after is not None:
+            conditions.append(User.last_login_at >= filters.last_login_after)
+        if filters.last_login_before is not None:
+            conditions.append(User.last_login_at < filters.last_login_before)
+        return conditions
+
+    @classmethod
+    async def count_users(cls, session: AsyncSession, filters: Optional[UserListFilters] = None) -> Tuple[int, CountStrategy]:
+        """
+        Count the users matching `filters`.
+
+        Unfiltered totals use the configured count strategy; filtered ones are always counted exactly,
+        on the same indexes as the page itself.
+        """
+        conditions = cls.filter_conditions(filters)
+        if not conditions:
+            return await UserCountService.total(session)
+        return await UserCountService.exact(session, conditions), CountStrategy.EXACT
+
+    @classmethod
+    async def list_users(
+        cls,
+        session: AsyncSession,
+        skip: int = 0,
+        limit: int = 10,
+        filters: Optional[UserListFilters] = None,
+        sort_by: UserSortField = UserSortField.CREATED_AT,
+        order: SortOrder = SortOrder.ASC,
+    ) -> List[Row]:
+        """List users by offset, as lightweight rows of `PROFILE_COLUMNS`, filtered and sorted with `id` as tie-breaker."""
+        query = PROFILE_LISTS[UserSortField(sort_by), SortOrder(order)]
+        conditions = cls.filter_conditions(filters)
+        if conditions:
+            query = query.where(*conditions)
+        result = await cls._read(session, query, {"skip": skip, "limit": limit})
+        return result.all() if result else []
+
+    @classmethod
+    async def list_users_page(
+        cls,
+        session: AsyncSession,
+        limit: int = 10,
+        cursor: Optional[str] = None,
+        filters: Optional[UserListFilters] = None,
+    ) -> Tuple[List[Row], Optional[str], Optional[str]]:
+        """
+        List users by keyset pagination on (created_at, id), as lightweight rows of `PROFILE_COLUMNS`.
+
+        Each page is an index range scan on `ix_users_created_at_id` starting at the cursor, so its
+        cost does not grow with how deep the page is, unlike OFFSET.
+
+        Args:
+            session: Database session
+            limit: Maximum number of users on the page
+            cursor: Cursor from a previous page's next/prev link, or None for the first page
+            filters: Filters applied to every page; pass the same filters with each cursor
+
+        Returns:
+            Tuple[List[Row], Optional[str], Optional[str]]: The users, and the cursors of the next and
+            previous pages (None where there is no such page).
+
+        Raises:
+            InvalidCursorError: If the cursor is malformed.
+        """
+        sort_key = tuple_(User.created_at, User.id)
+        direction = NEXT
+        query = select(*PROFILE_COLUMNS).where(*cls.filter_conditions(filters))
+        if cursor:
+            created_at, user_id, direction = decode_cursor(cursor)
+            position = tuple_(created_at, user_id)
+            query = query.where(sort_key > position if direction == NEXT else sort_key < position)
+        if direction == NEXT:
+            query = query.order_by(User.created_at, User.id)
+        else:
+            query = query.order_by(User.created_at.desc(), User.id.desc())
+        # One extra row tells whether another page follows in this direction
+        result = await cls._read(session, query.limit(limit + 1))
+        users = list(result.all()) if result else []
+        has_more = len(users) > limit
+        users = users[:limit]
+        if direction == PREV:
+            users.reverse()
+        if not users:
+            return users, None, None
+        has_next = has_more if direction == NEXT else True
+        has_prev = bool(cursor) if direction == NEXT else has_more
+        next_cursor = encode_cursor(users[-1].created_at, users[-1].id, NEXT) if has_next else None
+        prev_cursor = encode_cursor(users[0].created_at, users[0].id, PREV) if has_prev else None
+        return users, next_cursor, prev_cursor
+
+    @classmethod
+    async def search(cls, session: AsyncSession, q: str, limit: int = 20) -> List[Row]:
+        """
+        Search users by nickname, email, first or last name, best matches first.
+
+        A user matches when `q` is word-similar (pg_trgm `%>`) to one of the columns, which covers
+        substrings and small typos; each column's trigram GIN index answers its part of the OR as a
+        bitmap scan. Rows are `PROFILE_COLUMNS` plus a `score`.
+        """
+        columns = [getattr(User, column) for column in SEARCH_COLUMNS]
+        score = func.greatest(*(func.word_similarity(q, column) for column in columns)).label("score")
+        query = (
+            select(*PROFILE_COLUMNS, score)
+            .where(or_(*(column.op("%>")(q) for column in columns)))
+            .order_by(score.desc(), User.id)
+            .limit(limit)
+        )
+        result = await cls._read(session, query)
+        return result.all() if result else []
+
+    @classmethod
+    async def autocomplete(cls, session: AsyncSession, prefix: str, field: AutocompleteField = AutocompleteField.NICKNAME, limit: int = 10) -> List[Row]:
+        """
+        Suggest (id, value) rows whose nickname or email starts with `prefix`, case-sensitively.
+
+        The prefix is matched as a byte-ordered range, `prefix <= value < next prefix`, which is an
+        index-only scan of `ix_users_<field>_prefix` that stops after `limit` rows.
+        """
+        value = getattr(User, AutocompleteField(field).value).collate("C")
+        conditions = [value >= prefix]
+        upper = _prefix_upper_bound(prefix)
+        if upper is not None:
+            conditions.append(value < upper)
+        query = select(User.id, value.label("value")).where(*conditions).order_by(value).limit(limit)
+        result = await cls._read(session, query)
+        return result.all() if result else []
+
+    @classmethod
+    async def stream_profiles(cls, session: AsyncSession, batch_size: int = 1000) -> AsyncIterator[List[Row]]:
+        """
+        Stream every user as rows of `PROFILE_COLUMNS`, in (created_at, id) order, `batch_size` at a time.
+
+        Rows come from a server-side cursor, so memory use stays at one batch however large the table is.
+        The session must stay open until the iteration ends.
+        """
+        query = select(*PROFILE_COLUMNS).order_by(User.created_at, User.id).execution_options(yield_per=batch_size)
+        result = await session.stream(query)
+        async for partition in result.partitions():
+            yield partition
 
     @classmethod
     async def register_user(cls, session: AsyncSession, user_data: Dict[str, str], get_email_service) -> Optional[User]:
         return await cls.create(session, user_data, get_email_service)
     
 
+    @classmethod
+    async def authenticate(cls, session: AsyncSession, email: str, password: str, client_ip: Optional[str] = None) -> Tuple[LoginOutcome, Union[User, int, None]]:
+        """
+        Authenticate a user by email and password.
+
+        The user row is read once, and its transaction ends before the password is checked, so no
+        pooled connection waits on the hashing pool. Failed attempts are counted in the login attempt
+        tracker per email and per client IP rather than in the database; the only write on the failure
+        path is the lock, once an email reaches `max_login_attempts` in the window.
+        A success is written with a single UPDATE ... RETURNING that resets the persisted counter and
+        stamps `last_login_at`.
+
+        Args:
+            session: Database session
+            email: Email address the user logs in with
+            password: Plain text password to check
+            client_ip: Address of the client, used for per-IP throttling when known
+
+        Returns:
+            Tuple[LoginOutcome, Union[User, int, None]]: The outcome and, on success, the updated user;
+            when throttled, the seconds until the client IP may try again instead.
+        """
+        retry_after = await login_attempt_tracker.ip_retry_after(client_ip)
+        if retry_after is not None:
+            return LoginOutcome.THROTTLED, retry_after
+
+        result = await session.execute(USER_BY_EMAIL, {"email": email})
+        user = result.scalars().first()
+        # End the read's transaction so the pooled connection is not held through the password check
+        await session.commit()
+        if user is None:
+            await login_attempt_tracker.record_failure(email, client_ip)
+            return LoginOutcome.INVALID_CREDENTIALS, None
+        if user.is_locked:
+            return LoginOutcome.LOCKED, None
+        if user.email_verified is False:
+            return LoginOutcome.UNVERIFIED, None
+
+        if not await async_verify_password(password, user.hashed_password):
+            failures = await login_attempt_tracker.record_failure(email, client_ip)
+            if failures >= settings.max_login_attempts:
+                await cls._lock_account(session, user.id, failures)
+            return LoginOutcome.INVALID_CREDENTIALS, None
+
+        values = {"failed_login_attempts": 0, "last_login_at": datetime.now(timezone.utc)}
+        if needs_rehash(user.hashed_password):
+            # Upgrade hashes made with an older scheme or cost while the plain text is at hand
+            values["hashed_password"] = await async_hash_password(password)
+        query = (
+            update(User)
+            .where(User.id == user.id, User.is_locked.isnot(True))
+            .values(**values)
+            .returning(User)
+            .execution_options(populate_existing=True)
+        )
+        async with unit_of_work(session):
+            result = await session.execute(query)
+            logged_in_user = result.scalars().first()
+        if logged_in_user is None:
+            # Locked by a concurrent failed attempt between the read and the update
+            return LoginOutcome.LOCKED, None
+        await login_attempt_tracker.reset(email)
+        return LoginOutcome.SUCCESS, logged_in_user
+
+    @classmethod
+    async def _lock_account(cls, session: AsyncSession, user_id: UUID, failures: int):
+        # Only the unlocked -> locked transition is written; repeated failures on a locked row are no-ops
+        query = (
+            update(User)
+            .where(User.id == user_id, User.is_locked.isnot(True))
+            .values(is_locked=True, failed_login_attempts=failures)
+            .execution_options(synchronize_session="fetch")
+        )
+        async with unit_of_work(session):
+            result = await session.execute(query)
+        if result.rowcount:
+            logger.warning(f"User {user_id} locked after {failures} failed login attempts.")
+
     @classmethod
     async def login_user(cls, session: AsyncSession, email: str, password: str) -> Optional[User]:
-        user = await cls.get_by_email(session, email)
-        if user:
-            if user.email_verified is False:
-                return None
-            if user.is_locked:
-                return None
-            if verify_password(password, user.hashed_password):
-                user.failed_login_attempts = 0
-                user.last_login_at = datetime.now(timezone.utc)
-                session.add(user)
-                await session.commit()
-                return user
-            else:
-                user.failed_login_attempts += 1
-                if user.failed_login_attempts >= settings.max_login_attempts:
-                    user.is_locked = True
-                session.add(user)
-                await session.commit()
-        return None
+        outcome, user = await cls.authenticate(session, email, password)
+        return user if outcome is LoginOutcome.SUCCESS else None
 
     @classmethod
     async def is_account_locked(cls, session: AsyncSession, email: str) -> bool:
-        user = await cls.get_by_email(session, email)
-        return user.is_locked if user else False
+        result = await cls._read(session, USER_LOCKED_BY_EMAIL, {"email": email})
+        return bool(result.scalar()) if result else False
 
 
     @classmethod
     async def reset_password(cls, session: AsyncSession, user_id: UUID, new_password: str) -> bool:
-        hashed_password = hash_password(new_password)
+        hashed_password = await async_hash_password(new_password)
         user = await cls.get_by_id(session, user_id)
         if user:
-            user.hashed_password = hashed_password
-            user.failed_login_attempts = 0  # Resetting failed login attempts
-            user.is_locked = False  # Unlocking the user account, if locked
-            session.add(user)
-            await session.commit()
+            async with unit_of_work(session):
+                user.hashed_password = hashed_password
+                user.failed_login_attempts = 0  # Resetting failed login attempts
+                user.is_locked = False  # Unlocking the user account, if locked
+                session.add(user)
+            await login_attempt_tracker.reset(user.email)
             return True
         return False
 
@@ -193,12 +618,11 @@ class UserService:
             if user.verification_token == token:
                 logger.info(f"Token matched for user {user_id}, verifying email")
                 
-                user.email_verified = True
-                user.verification_token = None  # Clear the token once used
-                user.role = UserRole.AUTHENTICATED
-                
-                session.add(user)
-                await session.commit()
+                async with unit_of_work(session):
+                    user.email_verified = True
+                    user.verification_token = None  # Clear the token once used
+                    user.role = UserRole.AUTHENTICATED
+                    session.add(user)
                 logger.info(f"Email verified successfully for user {user_id}")
                 return True
             else:
@@ -217,18 +641,21 @@ class UserService:
         :param session: The AsyncSession instance for database access.
         :return: The count of users.
         """
-        query = select(func.count()).select_from(User)
-        result = await session.execute(query)
-        count = result.scalar()
-        return count
+        return await UserCountService.exact(session)
     
     @classmethod
     async def unlock_user_account(cls, session: AsyncSession, user_id: UUID) -> bool:
         user = await cls.get_by_id(session, user_id)
         if user and user.is_locked:
-            user.is_locked = False
-            user.failed_login_attempts = 0  # Optionally reset failed login attempts
-            session.add(user)
-            await session.commit()
+            async with unit_of_work(session):
+                user.is_locked = False
+                user.failed_login_attempts = 0  # Optionally reset failed login attempts
+                session.add(user)
+            await login_attempt_tracker.reset(user.email)
             return True
         return False
+
+# Process-wide loaders, so concurrent GET /users/{id} requests of this worker share one query
+user_loader = BatchLoader(lambda ids: UserService._load_by_ids(USERS_BY_IDS, ids), settings.user_lookup_batch_delay_ms / 1000)
+profile_loader = BatchLoader(lambda ids: UserService._load_by_ids(PROFILES_BY_IDS, ids), settings.user_lookup_batch_delay_ms / 1000)
+register_metrics_source("user_lookup_batching", lambda: {"users": user_loader.stats(), "profiles": profile_loader.stats()})
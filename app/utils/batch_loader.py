@@ -0,0 +1,66 @@
+from builtins import Exception, dict, float, list
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, List
+
+class BatchLoader:
+    """
+    Coalesces single-key loads into batch loads, in the manner of a DataLoader.
+
+    Every `load(key)` made before the pending batch is dispatched is answered by one call to
+    `batch_fn(keys)`, which returns a dict of the keys it found. A batch is dispatched on the next
+    event loop tick, or `delay` seconds after its first load when that is set. Batches may run
+    concurrently, so `batch_fn` must not share a database session between calls.
+    """
+
+    def __init__(self, batch_fn: Callable[[List[Hashable]], Awaitable[Dict[Hashable, Any]]], delay: float = 0.0):
+        self.batch_fn = batch_fn
+        self.delay = delay
+        self._pending: Dict[Hashable, List[asyncio.Future]] = {}
+        self._scheduled = False
+        self._tasks = set()  # strong references, so a scheduled dispatch is not garbage collected
+        self.loads = 0
+        self.batches = 0
+
+    async def load(self, key: Hashable) -> Any:
+        """Returns the value for `key`, or None if the batch function did not find it."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.setdefault(key, []).append(future)
+        self.loads += 1
+        if not self._scheduled:
+            self._scheduled = True
+            if self.delay > 0:
+                loop.call_later(self.delay, self._schedule_dispatch, loop)
+            else:
+                loop.call_soon(self._schedule_dispatch, loop)
+        return await future
+
+    def _schedule_dispatch(self, loop: asyncio.AbstractEventLoop):
+        pending, self._pending, self._scheduled = self._pending, {}, False
+        task = loop.create_task(self._dispatch(pending))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self, pending: Dict[Hashable, List[asyncio.Future]]):
+        self.batches += 1
+        try:
+            found = await self.batch_fn(list(pending))
+        except asyncio.CancelledError:
+            # The loader is being torn down; its waiters are cancelled, not failed
+            for futures in pending.values():
+                for future in futures:
+                    future.cancel()
+            raise
+        except Exception as e:
+            for futures in pending.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+            return
+        for key, futures in pending.items():
+            for future in futures:
+                if not future.done():
+                    future.set_result(found.get(key))
+
+    def stats(self) -> dict:
+        return {"loads": self.loads, "batches": self.batches, "delay_seconds": self.delay}
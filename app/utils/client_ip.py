@@ -0,0 +1,46 @@
+from builtins import ValueError, any, reversed, str
+import ipaddress
+from typing import Iterable, List, Optional
+from logging import getLogger
+from fastapi import Request
+from settings.config import settings
+
+logger = getLogger(__name__)
+
+class ClientAddressResolver:
+    """
+    Works out the address of the client behind any trusted reverse proxies.
+
+    The peer of the connection is the client unless it is one of `trusted_proxies`. When it is, the
+    X-Forwarded-For hops are walked from the right, skipping trusted proxies, and the first untrusted
+    hop is the client. Hops further left were written by the client itself and are never believed.
+    """
+
+    def __init__(self, trusted_proxies: Iterable[str] = ()):
+        self.networks = [ipaddress.ip_network(proxy.strip(), strict=False) for proxy in trusted_proxies]
+
+    def is_trusted(self, address: Optional[str]) -> bool:
+        if not address or not self.networks:
+            return False
+        try:
+            ip = ipaddress.ip_address(address)
+        except ValueError:
+            return False
+        return any(ip in network for network in self.networks)
+
+    def resolve(self, peer: Optional[str], forwarded_for: Optional[str]) -> Optional[str]:
+        if not forwarded_for or not self.is_trusted(peer):
+            return peer
+        hops: List[str] = [hop.strip() for hop in forwarded_for.split(",") if hop.strip()]
+        for hop in reversed(hops):
+            if not self.is_trusted(hop):
+                return hop
+        # Every hop is a trusted proxy, so the leftmost one is as close to the client as we can get
+        return hops[0] if hops else peer
+
+client_address_resolver = ClientAddressResolver(settings.trusted_proxies)
+
+def client_ip(request: Request) -> Optional[str]:
+    """Returns the address of the client that sent `request`, looking through trusted proxies."""
+    peer = request.client.host if request.client else None
+    return client_address_resolver.resolve(peer, request.headers.get("x-forwarded-for"))
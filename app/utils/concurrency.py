@@ -0,0 +1,96 @@
+from builtins import RuntimeError, dict, float, int, max, str
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Optional
+from logging import getLogger
+
+logger = getLogger(__name__)
+
+class ConcurrencyLimitExceeded(RuntimeError):
+    """Raised when a `ConcurrencyLimiter` cannot grant a slot within its queue and wait limits."""
+
+class ConcurrencyLimiter:
+    """
+    Bounds how many callers may run a section of code at once.
+
+    At most `max_in_flight` callers hold a slot. Further callers wait for at most `max_wait` seconds,
+    and when `max_queue` is set no more than that many may wait at all; anything beyond those limits
+    gets a `ConcurrencyLimitExceeded` straight away instead of piling up.
+    """
+
+    def __init__(self, name: str, max_in_flight: int, max_wait: float, max_queue: Optional[int] = None):
+        self.name = name
+        self.max_in_flight = max_in_flight
+        self.max_wait = max_wait
+        self.max_queue = max_queue
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.in_flight = 0
+        self.queued = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.total_wait_seconds = 0.0
+        self.peak_wait_seconds = 0.0
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # asyncio primitives are bound to the loop that first uses them, so recreate per loop.
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+            self._loop = loop
+        return self._semaphore
+
+    async def acquire(self):
+        """Waits for a slot; every successful call must be paired with `release()`."""
+        semaphore = self._get_semaphore()
+        if semaphore.locked() and self.max_queue is not None and self.queued >= self.max_queue:
+            self.rejected += 1
+            logger.warning("%s queue is full (%s waiting)", self.name, self.queued)
+            raise ConcurrencyLimitExceeded(f"{self.name} queue is full")
+
+        started = time.monotonic()
+        self.queued += 1
+        try:
+            await asyncio.wait_for(semaphore.acquire(), timeout=self.max_wait)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            logger.warning("%s: timed out after %.2fs waiting for a slot", self.name, self.max_wait)
+            raise ConcurrencyLimitExceeded(f"Timed out waiting for a {self.name} slot")
+        finally:
+            self.queued -= 1
+
+        waited = time.monotonic() - started
+        self.total_wait_seconds += waited
+        self.peak_wait_seconds = max(self.peak_wait_seconds, waited)
+        self.admitted += 1
+        self.in_flight += 1
+
+    def release(self):
+        self.in_flight -= 1
+        self._semaphore.release()
+
+    @asynccontextmanager
+    async def slot(self):
+        """Holds a slot for the duration of the `async with` block."""
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> dict:
+        """Returns the limiter configuration, gauges and counters."""
+        return {
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+            "max_wait_seconds": self.max_wait,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "avg_wait_seconds": self.total_wait_seconds / self.admitted if self.admitted else 0.0,
+            "peak_wait_seconds": self.peak_wait_seconds,
+        }
@@ -0,0 +1,41 @@
+from builtins import KeyError, TypeError, UnicodeDecodeError, ValueError, len, str
+import base64
+import binascii
+from datetime import datetime
+import json
+from typing import Tuple
+from uuid import UUID
+
+# Cursor directions: "next" continues after the row, "prev" pages back from before it
+NEXT = "next"
+PREV = "prev"
+
+class InvalidCursorError(ValueError):
+    """Raised when a pagination cursor cannot be decoded."""
+
+def encode_cursor(created_at: datetime, user_id: UUID, direction: str = NEXT) -> str:
+    """
+    Encodes a keyset position as an opaque, URL-safe cursor.
+
+    Clients must treat the value as opaque; it only carries the sort key of the row the page starts
+    after (or before, for `PREV`).
+    """
+    payload = json.dumps({"c": created_at.isoformat(), "i": str(user_id), "d": direction}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, UUID, str]:
+    """
+    Decodes a cursor made by `encode_cursor`.
+
+    Raises:
+        InvalidCursorError: If the cursor was not produced by `encode_cursor`.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        direction = payload["d"]
+        if direction not in (NEXT, PREV):
+            raise InvalidCursorError("Invalid pagination cursor")
+        return datetime.fromisoformat(payload["c"]), UUID(payload["i"]), direction
+    except (binascii.Error, UnicodeDecodeError, KeyError, TypeError, ValueError) as e:
+        raise InvalidCursorError("Invalid pagination cursor") from e
@@ -1,19 +1,28 @@
 from builtins import dict, int, max, str
-from typing import List, Callable
-from urllib.parse import urlencode
+from typing import List, Callable, Optional, Sequence, Tuple
+from urllib.parse import parse_qsl, urlencode
 from uuid import UUID
 
 from fastapi import Request
 from app.schemas.link_schema import Link
 from app.schemas.pagination_schema import PaginationLink
 
+# Query parameters that pagination links set themselves
+_PAGING_PARAMS = ("skip", "limit", "cursor")
+
 # Utility function to create a link
 def create_link(rel: str, href: str, method: str = "GET", action: str = None) -> Link:
     return Link(rel=rel, href=href, method=method, action=action)
 
-def create_pagination_link(rel: str, base_url: str, params: dict) -> PaginationLink:
+def create_pagination_link(rel: str, base_url: str, params: dict, extra_params: Sequence[Tuple[str, str]] = ()) -> PaginationLink:
     # Ensure parameters are added in a specific order
-    query_string = f"skip={params['skip']}&limit={params['limit']}"
+    if 'cursor' in params:
+        query_string = urlencode({'cursor': params['cursor'], 'limit': params['limit']})
+    else:
+        query_string = f"skip={params['skip']}&limit={params['limit']}"
+    # Other query parameters, such as filters, carry over unchanged to every page
+    if extra_params:
+        query_string += "&" + urlencode(extra_params)
     return PaginationLink(rel=rel, href=f"{base_url}?{query_string}")
 
 def create_user_links(user_id: UUID, request: Request) -> List[Link]:
@@ -30,19 +39,46 @@ def create_user_links(user_id: UUID, request: Request) -> List[Link]:
         for rel, action, method, action_desc in actions
     ]
 
-def generate_pagination_links(request: Request, skip: int, limit: int, total_items: int) -> List[PaginationLink]:
-    base_url = str(request.url)
+def generate_pagination_links(
+    request: Request,
+    skip: int,
+    limit: int,
+    total_items: int,
+    cursor: Optional[str] = None,
+    next_cursor: Optional[str] = None,
+    prev_cursor: Optional[str] = None,
+) -> List[PaginationLink]:
+    """
+    Builds pagination links for offset pages, or for keyset pages when `cursor` is given.
+
+    In keyset mode `cursor` is the cursor of the current page ("" for the first one) and the next/prev
+    links carry `next_cursor`/`prev_cursor`. There is no "last" link, since reaching it would mean
+    walking every page.
+    """
+    base_url, _, query = str(request.url).partition("?")
+    extra = [(key, value) for key, value in parse_qsl(query, keep_blank_values=True) if key not in _PAGING_PARAMS]
+    if cursor is not None:
+        links = [
+            create_pagination_link("self", base_url, {'cursor': cursor, 'limit': limit}, extra),
+            create_pagination_link("first", base_url, {'cursor': "", 'limit': limit}, extra),
+        ]
+        if next_cursor:
+            links.append(create_pagination_link("next", base_url, {'cursor': next_cursor, 'limit': limit}, extra))
+        if prev_cursor:
+            links.append(create_pagination_link("prev", base_url, {'cursor': prev_cursor, 'limit': limit}, extra))
+        return links
+
     total_pages = (total_items + limit - 1) // limit
     links = [
-        create_pagination_link("self", base_url, {'skip': skip, 'limit': limit}),
-        create_pagination_link("first", base_url, {'skip': 0, 'limit': limit}),
-        create_pagination_link("last", base_url, {'skip': max(0, (total_pages - 1) * limit), 'limit': limit})
+        create_pagination_link("self", base_url, {'skip': skip, 'limit': limit}, extra),
+        create_pagination_link("first", base_url, {'skip': 0, 'limit': limit}, extra),
+        create_pagination_link("last", base_url, {'skip': max(0, (total_pages - 1) * limit), 'limit': limit}, extra)
     ]
 
     if skip + limit < total_items:
-        links.append(create_pagination_link("next", base_url, {'skip': skip + limit, 'limit': limit}))
+        links.append(create_pagination_link("next", base_url, {'skip': skip + limit, 'limit': limit}, extra))
 
     if skip > 0:
-        links.append(create_pagination_link("prev", base_url, {'skip': max(skip - limit, 0), 'limit': limit}))
+        links.append(create_pagination_link("prev", base_url, {'skip': max(skip - limit, 0), 'limit': limit}, extra))
 
     return links
@@ -0,0 +1,201 @@
+from builtins import ValueError, dict, float, hash, int, len, max, range, str, sum, type
+from collections import OrderedDict, deque
+import os
+import threading
+import time
+from typing import Optional, Tuple
+from logging import getLogger
+from settings.config import settings
+from app.utils.metrics import register_metrics_source
+
+logger = getLogger(__name__)
+
+class InMemoryLoginAttemptBackend:
+    """
+    Sliding windows of failure timestamps held in this process, split across independently locked shards.
+
+    Each shard keeps at most `max_keys_per_shard` keys and evicts the least recently failed one beyond
+    that, so a flood of random emails or addresses cannot grow memory without bound.
+    """
+
+    def __init__(self, shards: int = 16, max_keys_per_shard: int = 10000):
+        self._shards = [OrderedDict() for _ in range(shards)]
+        self._locks = [threading.Lock() for _ in range(shards)]
+        self.max_keys_per_shard = max_keys_per_shard
+
+    def _shard(self, key: str) -> int:
+        return hash(key) % len(self._shards)
+
+    @staticmethod
+    def _prune(events: deque, cutoff: float):
+        while events and events[0] <= cutoff:
+            events.popleft()
+
+    async def add(self, key: str, now: float, window: float) -> int:
+        index = self._shard(key)
+        shard = self._shards[index]
+        with self._locks[index]:
+            events = shard.get(key)
+            if events is None:
+                events = shard[key] = deque()
+            self._prune(events, now - window)
+            events.append(now)
+            shard.move_to_end(key)
+            while len(shard) > self.max_keys_per_shard:
+                shard.popitem(last=False)
+            return len(events)
+
+    async def count(self, key: str, now: float, window: float) -> Tuple[int, Optional[float]]:
+        index = self._shard(key)
+        shard = self._shards[index]
+        with self._locks[index]:
+            events = shard.get(key)
+            if events is None:
+                return 0, None
+            self._prune(events, now - window)
+            if not events:
+                del shard[key]
+                return 0, None
+            return len(events), events[0]
+
+    async def clear(self, key: str):
+        index = self._shard(key)
+        with self._locks[index]:
+            self._shards[index].pop(key, None)
+
+    def size(self) -> int:
+        return sum(len(shard) for shard in self._shards)
+
+class RedisLoginAttemptBackend:
+    """
+    Sliding windows kept in Redis sorted sets, so every worker sees the same failure counts.
+
+    Requires the optional `redis` package.
+    """
+
+    def __init__(self, url: str, prefix: str = "login-failures:"):
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise ValueError("The redis login attempt backend requires the redis package") from e
+        self._redis = redis.from_url(url)
+        self.prefix = prefix
+
+    async def add(self, key: str, now: float, window: float) -> int:
+        redis_key = self.prefix + key
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.zremrangebyscore(redis_key, 0, now - window)
+            # A unique member per event: two failures in the same instant must both count
+            pipe.zadd(redis_key, {f"{now}:{time.perf_counter_ns()}": now})
+            pipe.zcard(redis_key)
+            pipe.expire(redis_key, int(window) + 1)
+            _, _, count, _ = await pipe.execute()
+        return count
+
+    async def count(self, key: str, now: float, window: float) -> Tuple[int, Optional[float]]:
+        redis_key = self.prefix + key
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.zremrangebyscore(redis_key, 0, now - window)
+            pipe.zcard(redis_key)
+            pipe.zrange(redis_key, 0, 0, withscores=True)
+            _, count, oldest = await pipe.execute()
+        return count, (oldest[0][1] if oldest else None)
+
+    async def clear(self, key: str):
+        await self._redis.delete(self.prefix + key)
+
+    def size(self) -> Optional[int]:
+        return None
+
+class LoginAttemptTracker:
+    """
+    Tracks failed logins per email and per client IP over a sliding window.
+
+    Failures are counted here instead of being written to the users table, so a brute-force run does
+    not turn into a stream of UPDATEs on one row; the caller only persists the lock once an email's
+    count reaches the limit. The IP window additionally throttles a client that fails across many
+    accounts. With the in-memory backend every worker keeps its own counts, so N workers allow N times
+    the limit; the Redis backend shares them.
+    """
+
+    def __init__(self, backend, window_seconds: float, max_ip_failures: int):
+        self.backend = backend
+        self.window_seconds = window_seconds
+        self.max_ip_failures = max_ip_failures
+        self.failures = 0
+        self.throttled = 0
+
+    @staticmethod
+    def _email_key(email: str) -> str:
+        return "email:" + email.strip().lower()
+
+    @staticmethod
+    def _ip_key(ip: str) -> str:
+        return "ip:" + ip
+
+    async def ip_retry_after(self, ip: Optional[str]) -> Optional[int]:
+        """Returns the seconds until `ip` may try again if it is throttled, otherwise None."""
+        if not ip:
+            return None
+        now = time.time()
+        count, oldest = await self.backend.count(self._ip_key(ip), now, self.window_seconds)
+        if count < self.max_ip_failures:
+            return None
+        self.throttled += 1
+        return max(1, int(oldest + self.window_seconds - now) + 1)
+
+    async def record_failure(self, email: str, ip: Optional[str] = None) -> int:
+        """Records a failed login and returns the number of failures for `email` in the window."""
+        self.failures += 1
+        now = time.time()
+        if ip:
+            await self.backend.add(self._ip_key(ip), now, self.window_seconds)
+        return await self.backend.add(self._email_key(email), now, self.window_seconds)
+
+    async def reset(self, email: str):
+        """Forgets the failures of an email, after a successful login or an unlock."""
+        await self.backend.clear(self._email_key(email))
+
+    def stats(self) -> dict:
+        return {
+            "backend": type(self.backend).__name__,
+            "tracked_keys": self.backend.size(),
+            "window_seconds": self.window_seconds,
+            "failures": self.failures,
+            "ip_throttled": self.throttled,
+        }
+
+def _redis_available() -> bool:
+    if not settings.login_attempt_redis_url:
+        return False
+    try:
+        import redis.asyncio  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+def _build_backend(backend: str):
+    if backend == "auto":
+        # Uvicorn and gunicorn take their worker count from WEB_CONCURRENCY; counting in memory across
+        # several workers would let every worker allow the full limit
+        backend = "redis" if int(os.environ.get("WEB_CONCURRENCY") or 1) > 1 else "memory"
+        if backend == "redis" and not _redis_available():
+            # Keep serving with per-worker counts rather than failing the deploy at import time
+            logger.warning(
+                "Several workers are running but no shared login attempt backend is available (set "
+                "login_attempt_redis_url and install redis); each worker counts failed logins separately"
+            )
+            backend = "memory"
+    if backend == "memory":
+        shards = settings.login_attempt_shards
+        return InMemoryLoginAttemptBackend(shards, max(1, settings.login_attempt_max_keys // shards))
+    if backend == "redis":
+        if not settings.login_attempt_redis_url:
+            raise ValueError("The redis login attempt backend requires login_attempt_redis_url")
+        return RedisLoginAttemptBackend(settings.login_attempt_redis_url)
+    raise ValueError(f"Unsupported login attempt backend: {backend}")
+
+login_attempt_tracker = LoginAttemptTracker(
+    _build_backend(settings.login_attempt_backend), settings.login_attempt_window_seconds, settings.login_ip_max_failures
+)
+register_metrics_source("login_attempts", login_attempt_tracker.stats)
@@ -0,0 +1,34 @@
+from builtins import dict, str
+from typing import Callable, Dict
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Each source is a zero-argument callable returning a JSON-serialisable dict of counters/gauges.
+_metrics_sources: Dict[str, Callable[[], dict]] = {}
+
+def register_metrics_source(name: str, source: Callable[[], dict]) -> None:
+    """
+    Registers a named metrics source that is included in `collect_metrics()`.
+
+    Args:
+        name (str): Section name the metrics are reported under.
+        source (Callable[[], dict]): Callable returning the current values for that section.
+    """
+    _metrics_sources[name] = source
+
+def collect_metrics() -> Dict[str, dict]:
+    """
+    Collects a snapshot from every registered metrics source.
+
+    A failing source is logged and reported as an error entry so one broken
+    section never hides the others.
+    """
+    snapshot = {}
+    for name, source in _metrics_sources.items():
+        try:
+            snapshot[name] = source()
+        except Exception as e:
+            logger.error(f"Failed to collect metrics for {name}: {e}")
+            snapshot[name] = {"error": str(e)}
+    return snapshot
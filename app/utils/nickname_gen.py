@@ -1,10 +1,72 @@
-from builtins import str
+from builtins import ValueError, all, len, list, max, range, set, str, tuple
 import random
+import re
+from typing import Sequence, Set
+from settings.config import settings
 
+ADJECTIVES = (
+    "agile", "amber", "ancient", "bold", "brave", "breezy", "bright", "brisk", "calm", "candid",
+    "cheerful", "clever", "cosmic", "crimson", "curious", "daring", "dapper", "eager", "early", "electric",
+    "fancy", "fearless", "fierce", "fluffy", "frosty", "gentle", "giant", "golden", "graceful", "happy",
+    "hidden", "humble", "icy", "jolly", "keen", "kind", "lively", "lucky", "lunar", "mellow",
+    "merry", "mighty", "misty", "noble", "nimble", "patient", "plucky", "polite", "proud", "quick",
+    "quiet", "rapid", "rustic", "shiny", "silent", "sly", "snowy", "solar", "steady", "sunny",
+    "swift", "tidy", "vivid", "witty",
+)
+ANIMALS = (
+    "albatross", "alpaca", "badger", "beaver", "bison", "bobcat", "buffalo", "camel", "caribou", "cheetah",
+    "condor", "cougar", "coyote", "crane", "dingo", "dolphin", "eagle", "falcon", "ferret", "finch",
+    "fox", "gazelle", "gecko", "gibbon", "heron", "hedgehog", "ibis", "iguana", "impala", "jackal",
+    "jaguar", "kestrel", "koala", "lemur", "leopard", "lion", "llama", "lynx", "magpie", "marmot",
+    "meerkat", "mongoose", "moose", "narwhal", "ocelot", "octopus", "orca", "otter", "owl", "panda",
+    "panther", "parrot", "pelican", "penguin", "puffin", "raccoon", "raven", "seal", "sparrow", "tiger",
+    "toucan", "walrus", "weasel", "wolf",
+)
+
+# Generated nicknames must satisfy the nickname rules of the user schemas
+_WORD = re.compile(r"^\w+$")
+_MAX_NICKNAME_LENGTH = 50
+
+class NicknameGenerator:
+    """Draws `<adjective>_<animal>_<number>` nicknames from configurable word lists."""
+
+    def __init__(self, adjectives: Sequence[str], animals: Sequence[str], number_max: int):
+        words = list(adjectives) + list(animals)
+        if not adjectives or not animals:
+            raise ValueError("Nickname word lists must not be empty")
+        if not all(_WORD.match(word) for word in words):
+            raise ValueError("Nickname words may only contain letters, digits and underscores")
+        longest = max(len(word) for word in adjectives) + max(len(word) for word in animals) + len(str(number_max)) + 2
+        if longest > _MAX_NICKNAME_LENGTH:
+            raise ValueError(f"Generated nicknames could exceed {_MAX_NICKNAME_LENGTH} characters")
+        self.adjectives = tuple(adjectives)
+        self.animals = tuple(animals)
+        self.number_max = number_max
+
+    @property
+    def capacity(self) -> int:
+        """Number of distinct nicknames this generator can produce."""
+        return len(self.adjectives) * len(self.animals) * (self.number_max + 1)
+
+    def generate(self) -> str:
+        number = random.randint(0, self.number_max)
+        return f"{random.choice(self.adjectives)}_{random.choice(self.animals)}_{number}"
+
+    def generate_many(self, count: int) -> Set[str]:
+        """Returns up to `count` distinct nicknames; fewer only if the generator is nearly exhausted."""
+        nicknames: Set[str] = set()
+        for _ in range(count * 2):
+            if len(nicknames) >= count:
+                break
+            nicknames.add(self.generate())
+        return nicknames
+
+nickname_generator = NicknameGenerator(
+    settings.nickname_adjectives or ADJECTIVES,
+    settings.nickname_animals or ANIMALS,
+    settings.nickname_number_max,
+)
 
 def generate_nickname() -> str:
     """Generate a URL-safe nickname using adjectives and animal names."""
-    adjectives = ["clever", "jolly", "brave", "sly", "gentle"]
-    animals = ["panda", "fox", "raccoon", "koala", "lion"]
-    number = random.randint(0, 999)
-    return f"{random.choice(adjectives)}_{random.choice(animals)}_{number}"
+    return nickname_generator.generate()
@@ -0,0 +1,110 @@
+from builtins import KeyError, dict, enumerate, int, str
+from enum import IntFlag
+from typing import Dict, Iterable
+from app.models.user_model import UserRole
+
+class Permission(IntFlag):
+    """Fine-grained permissions, one bit each, so a set of them is a single integer."""
+    NONE = 0
+    UPDATE_OWN_PROFILE = 1 << 0
+    READ_USERS = 1 << 1
+    CREATE_USERS = 1 << 2
+    UPDATE_USERS = 1 << 3
+    DELETE_USERS = 1 << 4
+    MANAGE_PROFESSIONAL_STATUS = 1 << 5
+    REVOKE_SESSIONS = 1 << 6
+    VIEW_METRICS = 1 << 7
+    IMPORT_USERS = 1 << 8
+    EXPORT_USERS = 1 << 9
+
+_MANAGER_PERMISSIONS = (
+    Permission.UPDATE_OWN_PROFILE
+    | Permission.READ_USERS
+    | Permission.CREATE_USERS
+    | Permission.UPDATE_USERS
+    | Permission.DELETE_USERS
+    | Permission.MANAGE_PROFESSIONAL_STATUS
+)
+
+# What each role may do. Edit this table, not the routes, to change who can do what.
+ROLE_PERMISSIONS: Dict[UserRole, Permission] = {
+    UserRole.ANONYMOUS: Permission.UPDATE_OWN_PROFILE,
+    UserRole.AUTHENTICATED: Permission.UPDATE_OWN_PROFILE,
+    UserRole.MANAGER: _MANAGER_PERMISSIONS,
+    UserRole.ADMIN: (
+        _MANAGER_PERMISSIONS
+        | Permission.REVOKE_SESSIONS
+        | Permission.VIEW_METRICS
+        | Permission.IMPORT_USERS
+        | Permission.EXPORT_USERS
+    ),
+}
+
+# What each route requires, keyed by route name. Every route guarded with `authorize()` must appear here.
+ROUTE_POLICIES: Dict[str, Permission] = {
+    "get_user": Permission.READ_USERS,
+    "list_users": Permission.READ_USERS,
+    "batch_get_users": Permission.READ_USERS,
+    "search_users": Permission.READ_USERS,
+    "autocomplete_users": Permission.READ_USERS,
+    "create_user": Permission.CREATE_USERS,
+    "update_user": Permission.UPDATE_USERS,
+    "delete_user": Permission.DELETE_USERS,
+    "update_professional_status": Permission.MANAGE_PROFESSIONAL_STATUS,
+    "force_logout_user": Permission.REVOKE_SESSIONS,
+    "get_metrics": Permission.VIEW_METRICS,
+    "bulk_import_users": Permission.IMPORT_USERS,
+    "export_users": Permission.EXPORT_USERS,
+    "update_own_profile": Permission.UPDATE_OWN_PROFILE,
+}
+
+def _compile_role_masks() -> Dict[str, int]:
+    # Token roles are upper-case, but accept the lower-case spelling without normalising per request.
+    masks = {}
+    for role, permissions in ROLE_PERMISSIONS.items():
+        masks[role.name] = int(permissions)
+        masks[role.name.lower()] = int(permissions)
+    return masks
+
+def _compile_role_bits() -> Dict[str, int]:
+    bits = {}
+    for index, role in enumerate(UserRole):
+        bits[role.name] = 1 << index
+        bits[role.name.lower()] = 1 << index
+    return bits
+
+ROLE_MASKS: Dict[str, int] = _compile_role_masks()
+ROLE_BITS: Dict[str, int] = _compile_role_bits()
+
+def permissions_for(role: str) -> int:
+    """Returns the permission mask granted to a role name, or 0 for an unknown role."""
+    mask = ROLE_MASKS.get(role)
+    if mask is None:
+        mask = ROLE_MASKS.get(role.upper(), 0)
+    return mask
+
+def role_bit(role: str) -> int:
+    """Returns the bit identifying a role name, or 0 for an unknown role."""
+    bit = ROLE_BITS.get(role)
+    if bit is None:
+        bit = ROLE_BITS.get(role.upper(), 0)
+    return bit
+
+def roles_mask(roles: Iterable[str]) -> int:
+    """Compiles a list of role names into a mask of role bits."""
+    mask = 0
+    for role in roles:
+        mask |= role_bit(role)
+    return mask
+
+def route_permission(route_name: str) -> int:
+    """
+    Returns the permission a route requires.
+
+    Raises:
+        KeyError: If the route has no entry in `ROUTE_POLICIES`, so a missing policy fails at import time
+            rather than leaving a route unguarded.
+    """
+    if route_name not in ROUTE_POLICIES:
+        raise KeyError(f"No authorization policy defined for route '{route_name}'")
+    return int(ROUTE_POLICIES[route_name])
@@ -0,0 +1,155 @@
+from builtins import UnicodeDecodeError, ValueError, bytes, dict, isinstance, len, next, str, zip
+import csv
+from datetime import datetime
+from enum import Enum
+import io
+import json
+from typing import Any, AsyncIterator, Iterable, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+# Media types accepted and produced for streamed user records
+NDJSON_MEDIA_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+CSV_MEDIA_TYPES = ("text/csv",)
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+# (row number, record, error): exactly one of record and error is set
+ParsedRecord = Tuple[int, Optional[dict], Optional[str]]
+
+def record_format(content_type: Optional[str]) -> Optional[str]:
+    """Maps a Content-Type header to "ndjson" or "csv", or None if it is neither."""
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    if media_type in NDJSON_MEDIA_TYPES:
+        return "ndjson"
+    if media_type in CSV_MEDIA_TYPES:
+        return "csv"
+    return None
+
+# Default longest line accepted from an upload, terminator included
+MAX_LINE_BYTES = 64 * 1024
+
+async def iter_lines(chunks: AsyncIterator[bytes], max_line_bytes: int = MAX_LINE_BYTES) -> AsyncIterator[Optional[bytes]]:
+    """
+    Splits a stream of byte chunks into lines, holding at most `max_line_bytes` of one partial line.
+
+    A line longer than that is skipped up to its newline and reported as None in its place. Each chunk
+    is scanned once: the partial line is kept as a list of pieces and only joined when it ends.
+    """
+    parts: List[bytes] = []
+    size = 0
+    too_long = False
+    async for chunk in chunks:
+        start = 0
+        end = chunk.find(b"\n")
+        while end >= 0:
+            piece = chunk[start:end]
+            if too_long or size + len(piece) > max_line_bytes:
+                yield None
+            else:
+                parts.append(piece)
+                yield b"".join(parts).rstrip(b"\r")
+            parts, size, too_long = [], 0, False
+            start = end + 1
+            end = chunk.find(b"\n", start)
+        if too_long or start == len(chunk):
+            continue
+        piece = chunk[start:]
+        size += len(piece)
+        if size > max_line_bytes:
+            parts, too_long = [], True
+        else:
+            parts.append(piece)
+    if too_long:
+        yield None
+        return
+    tail = b"".join(parts)
+    if tail.strip():
+        yield tail.rstrip(b"\r")
+
+async def parse_ndjson(chunks: AsyncIterator[bytes], max_line_bytes: int = MAX_LINE_BYTES) -> AsyncIterator[ParsedRecord]:
+    """Parses one JSON object per line; blank lines are skipped and do not count as rows."""
+    row = 0
+    async for line in iter_lines(chunks, max_line_bytes):
+        if line is None:
+            row += 1
+            yield row, None, f"Line exceeds {max_line_bytes} bytes"
+            continue
+        if not line.strip():
+            continue
+        row += 1
+        try:
+            record = json.loads(line)
+        except (UnicodeDecodeError, ValueError) as e:
+            yield row, None, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(record, dict):
+            yield row, None, "Each line must be a JSON object"
+            continue
+        yield row, record, None
+
+async def parse_csv(chunks: AsyncIterator[bytes], max_line_bytes: int = MAX_LINE_BYTES) -> AsyncIterator[ParsedRecord]:
+    """
+    Parses CSV with a header line; one record per line, empty fields are read as missing.
+
+    Quoted fields may contain commas but not line breaks.
+    """
+    header = None
+    row = 0
+    async for line in iter_lines(chunks, max_line_bytes):
+        if line is None:
+            if header is None:
+                raise ValueError(f"Invalid CSV header: line exceeds {max_line_bytes} bytes")
+            row += 1
+            yield row, None, f"Line exceeds {max_line_bytes} bytes"
+            continue
+        if not line.strip():
+            continue
+        try:
+            values = next(csv.reader([line.decode("utf-8-sig" if header is None else "utf-8")]))
+        except (UnicodeDecodeError, csv.Error) as e:
+            if header is None:
+                raise ValueError(f"Invalid CSV header: {e}") from e
+            row += 1
+            yield row, None, f"Invalid CSV: {e}"
+            continue
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        row += 1
+        if len(values) != len(header):
+            yield row, None, f"Expected {len(header)} fields, got {len(values)}"
+            continue
+        yield row, {name: value for name, value in zip(header, values) if value != ""}, None
+
+def parse_records(chunks: AsyncIterator[bytes], fmt: str, max_line_bytes: int = MAX_LINE_BYTES) -> AsyncIterator[ParsedRecord]:
+    return parse_ndjson(chunks, max_line_bytes) if fmt == "ndjson" else parse_csv(chunks, max_line_bytes)
+
+def _plain(value: Any) -> Any:
+    # UUIDs, datetimes and enums become the strings a client would send back
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.name
+    return value
+
+def ndjson_lines(fields: Sequence[str], rows: Iterable[Sequence]) -> bytes:
+    """Encodes rows as NDJSON objects keyed by `fields`."""
+    return "".join(
+        json.dumps({name: _plain(value) for name, value in zip(fields, row)}, separators=(",", ":")) + "\n" for row in rows
+    ).encode("utf-8")
+
+def csv_lines(rows: Iterable[Sequence]) -> bytes:
+    """Encodes rows (or a header) as CSV lines; missing values are written as empty fields."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    for row in rows:
+        writer.writerow(["" if value is None else _plain(value) for value in row])
+    return buffer.getvalue().encode("utf-8")
+
+async def encode_records(fields: Sequence[str], batches: AsyncIterator[List[Sequence]], fmt: str) -> AsyncIterator[bytes]:
+    """Turns batches of rows into response body chunks, one chunk per batch."""
+    if fmt == "csv":
+        yield csv_lines([fields])
+    async for batch in batches:
+        yield csv_lines(batch) if fmt == "csv" else ndjson_lines(fields, batch)
@@ -1,33 +1,208 @@
 # app/security.py
-from builtins import Exception, ValueError, bool, int, str
+from builtins import Exception, ValueError, bool, float, int, list, max, min, object, range, str
+import asyncio
 import secrets
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
 import bcrypt
 from logging import getLogger
+from settings.config import settings
+from app.utils.concurrency import ConcurrencyLimitExceeded, ConcurrencyLimiter
+from app.utils.metrics import register_metrics_source
+
+try:
+    from argon2 import PasswordHasher as Argon2PasswordHasher, Type as Argon2Type, extract_parameters as extract_argon2_parameters
+    from argon2.exceptions import VerifyMismatchError
+    from argon2.low_level import ARGON2_VERSION
+except ImportError:  # argon2-cffi is optional; bcrypt is always available
+    Argon2PasswordHasher = None
 
 # Set up logging
 logger = getLogger(__name__)
 
-def hash_password(password: str, rounds: int = 12) -> str:
+class BcryptScheme:
+    """bcrypt hashing; the cost factor is stored in the hash itself (`$2b$<rounds>$...`)."""
+    name = "bcrypt"
+    prefixes = ("$2a$", "$2b$", "$2y$")
+    min_rounds = 10
+    max_rounds = 16
+
+    def __init__(self, rounds: int = 12):
+        self.rounds = rounds
+
+    def params(self) -> dict:
+        return {"rounds": self.rounds}
+
+    def identify(self, hashed_password: str) -> bool:
+        return hashed_password.startswith(self.prefixes)
+
+    def hash(self, password: str) -> str:
+        salt = bcrypt.gensalt(rounds=self.rounds)
+        return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+
+    def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+
+    def needs_rehash(self, hashed_password: str) -> bool:
+        # Only upgrade: workers calibrated to different costs must not flip a hash back and forth
+        return int(hashed_password.split("$")[2]) < self.rounds
+
+    def calibrate(self, target_seconds: float):
+        """Picks the highest cost whose hash time stays within `target_seconds`."""
+        # Each extra round doubles the work, so time one cheap hash and extrapolate.
+        base_rounds = 8
+        elapsed = min(_time_call(BcryptScheme(base_rounds).hash, "calibration") for _ in range(3))
+        rounds = base_rounds
+        while rounds < self.max_rounds and elapsed * 2 ** (rounds + 1 - base_rounds) <= target_seconds:
+            rounds += 1
+        self.rounds = max(rounds, self.min_rounds)
+
+class Argon2idScheme:
+    """argon2id hashing; parameters are stored in the hash itself (`$argon2id$v=19$m=..,t=..,p=..$...`)."""
+    name = "argon2id"
+    prefixes = ("$argon2id$",)
+    min_time_cost = 2
+    max_time_cost = 20
+
+    def __init__(self, time_cost: int = 3, memory_cost: int = 65536, parallelism: int = 4):
+        if Argon2PasswordHasher is None:
+            raise ValueError("The argon2id password hashing scheme requires the argon2-cffi package")
+        self.time_cost = time_cost
+        self.memory_cost = memory_cost
+        self.parallelism = parallelism
+
+    def params(self) -> dict:
+        return {"time_cost": self.time_cost, "memory_cost": self.memory_cost, "parallelism": self.parallelism}
+
+    def _hasher(self):
+        return Argon2PasswordHasher(
+            time_cost=self.time_cost, memory_cost=self.memory_cost, parallelism=self.parallelism, type=Argon2Type.ID
+        )
+
+    def identify(self, hashed_password: str) -> bool:
+        return hashed_password.startswith(self.prefixes)
+
+    def hash(self, password: str) -> str:
+        return self._hasher().hash(password)
+
+    def verify(self, plain_password: str, hashed_password: str) -> bool:
+        try:
+            return self._hasher().verify(hashed_password, plain_password)
+        except VerifyMismatchError:
+            return False
+
+    def needs_rehash(self, hashed_password: str) -> bool:
+        # Only upgrade, as for bcrypt; parallelism changes the layout of the work, not its cost
+        stored = extract_argon2_parameters(hashed_password)
+        return (
+            stored.type is not Argon2Type.ID
+            or stored.version < ARGON2_VERSION
+            or stored.time_cost < self.time_cost
+            or stored.memory_cost < self.memory_cost
+            or stored.hash_len < self._hasher().hash_len
+        )
+
+    def calibrate(self, target_seconds: float):
+        """Picks the highest time cost, at the configured memory cost, that stays within `target_seconds`."""
+        # Time cost scales the work roughly linearly, so time a single pass and extrapolate.
+        single_pass = Argon2idScheme(1, self.memory_cost, self.parallelism)
+        elapsed = min(_time_call(single_pass.hash, "calibration") for _ in range(3))
+        time_cost = int(target_seconds // elapsed) if elapsed > 0 else self.max_time_cost
+        self.time_cost = min(max(time_cost, self.min_time_cost), self.max_time_cost)
+
+def _time_call(func: Callable, *args) -> float:
+    started = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - started
+
+class PasswordHashRegistry:
+    """
+    Holds the supported password hashing schemes and the one used for new hashes.
+
+    Stored hashes are matched to a scheme by their prefix, so hashes created under older schemes or
+    parameters keep verifying and can be upgraded with `needs_rehash` when the user next logs in.
     """
-    Hashes a password using bcrypt with a specified cost factor.
+
+    def __init__(self, default: str, schemes: Dict[str, object]):
+        if default not in schemes:
+            raise ValueError(f"Unsupported password hashing scheme: {default}")
+        self.default = default
+        self.schemes = schemes
+
+    def default_scheme(self):
+        return self.schemes[self.default]
+
+    def identify(self, hashed_password: str):
+        for scheme in self.schemes.values():
+            if scheme.identify(hashed_password):
+                return scheme
+        return None
+
+    def needs_rehash(self, hashed_password: str) -> bool:
+        scheme = self.identify(hashed_password)
+        if scheme is None or scheme.name != self.default:
+            return True
+        try:
+            return scheme.needs_rehash(hashed_password)
+        except Exception:
+            return True
+
+    def calibrate(self, target_seconds: float):
+        """Tunes the default scheme's cost so one hash takes about `target_seconds` on this machine."""
+        scheme = self.default_scheme()
+        scheme.calibrate(target_seconds)
+        logger.info("Calibrated %s password hashing to %s for a %.0f ms target", scheme.name, scheme.params(), target_seconds * 1000)
+
+    def describe(self) -> dict:
+        return {"default": self.default, "params": self.default_scheme().params()}
+
+def _build_registry() -> PasswordHashRegistry:
+    schemes = {BcryptScheme.name: BcryptScheme(settings.bcrypt_rounds)}
+    if Argon2PasswordHasher is not None:
+        schemes[Argon2idScheme.name] = Argon2idScheme(
+            settings.argon2_time_cost, settings.argon2_memory_cost, settings.argon2_parallelism
+        )
+    return PasswordHashRegistry(settings.password_hash_scheme, schemes)
+
+password_hashers = _build_registry()
+register_metrics_source("password_hash_scheme", password_hashers.describe)
+
+def _resolve_scheme(rounds: Optional[int]):
+    # An explicit bcrypt cost is honoured for callers that pin it; otherwise use the configured default.
+    return password_hashers.default_scheme() if rounds is None else BcryptScheme(rounds)
+
+def _hash_with(scheme, password: str) -> str:
+    try:
+        return scheme.hash(password)
+    except Exception as e:
+        logger.error("Failed to hash password: %s", e)
+        raise ValueError("Failed to hash password") from e
+
+def _verify_with(scheme, plain_password: str, hashed_password: str) -> bool:
+    try:
+        if scheme is None:
+            raise ValueError("Unrecognised password hash format")
+        return scheme.verify(plain_password, hashed_password)
+    except Exception as e:
+        logger.error("Error verifying password: %s", e)
+        raise ValueError("Authentication process encountered an unexpected error") from e
+
+def hash_password(password: str, rounds: Optional[int] = None) -> str:
+    """
+    Hashes a password using the configured default scheme.
     
     Args:
         password (str): The plain text password to hash.
-        rounds (int): The cost factor that determines the computational cost of hashing.
+        rounds (int): Optional bcrypt cost factor; when given, bcrypt is used with that cost.
 
     Returns:
-        str: The hashed password.
+        str: The hashed password, carrying its scheme and parameters.
 
     Raises:
         ValueError: If hashing the password fails.
     """
-    try:
-        salt = bcrypt.gensalt(rounds=rounds)
-        hashed_password = bcrypt.hashpw(password.encode('utf-8'), salt)
-        return hashed_password.decode('utf-8')
-    except Exception as e:
-        logger.error("Failed to hash password: %s", e)
-        raise ValueError("Failed to hash password") from e
+    return _hash_with(_resolve_scheme(rounds), password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
@@ -35,7 +210,7 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     
     Args:
         plain_password (str): The plain text password to verify.
-        hashed_password (str): The bcrypt hashed password.
+        hashed_password (str): The hashed password, in any registered scheme.
 
     Returns:
         bool: True if the password is correct, False otherwise.
@@ -43,11 +218,131 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     Raises:
         ValueError: If the hashed password format is incorrect or the function fails to verify.
     """
+    return _verify_with(password_hashers.identify(hashed_password), plain_password, hashed_password)
+
+def needs_rehash(hashed_password: str) -> bool:
+    """
+    Checks whether a stored hash uses another scheme, or a lower cost, than the current default.
+
+    Args:
+        hashed_password (str): The stored hashed password.
+
+    Returns:
+        bool: True if the password should be re-hashed the next time the plain text is known.
+    """
+    return password_hashers.needs_rehash(hashed_password)
+
+def calibrate_password_hashing(target_ms: int):
+    """
+    Calibrates the default scheme's cost so one hash takes about `target_ms` on the current hardware.
+
+    Args:
+        target_ms (int): Target latency for a single hash in milliseconds.
+    """
+    password_hashers.calibrate(target_ms / 1000)
+
+class PasswordHashingBusyError(ConcurrencyLimitExceeded):
+    """Raised when the password hashing pool cannot accept or start more work in time."""
+
+class PasswordHashingPool:
+    """
+    Runs blocking password hashing calls on a bounded worker pool so they never block the event loop.
+
+    At most `workers` calls run at once. Up to `max_queue` further callers may wait, each for at most
+    `max_wait` seconds, before a `PasswordHashingBusyError` is raised.
+    """
+
+    def __init__(self, workers: int, max_queue: int, max_wait: float, executor_type: str = "thread"):
+        if executor_type not in ("thread", "process"):
+            raise ValueError(f"Unsupported password hashing executor: {executor_type}")
+        self.workers = workers
+        self.executor_type = executor_type
+        self.limiter = ConcurrencyLimiter("password hashing", workers, max_wait, max_queue)
+        self._executor: Optional[Executor] = None
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.executor_type == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+        return self._executor
+
+    async def run(self, func: Callable, *args):
+        """Runs `func(*args)` on the pool once a worker slot is free."""
+        try:
+            await self.limiter.acquire()
+        except ConcurrencyLimitExceeded as e:
+            raise PasswordHashingBusyError(str(e)) from e
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._get_executor(), func, *args)
+        finally:
+            self.limiter.release()
+
+    def stats(self) -> dict:
+        """Returns the current pool configuration, gauges and counters."""
+        return {"executor": self.executor_type, "workers": self.workers, **self.limiter.stats()}
+
+    def shutdown(self):
+        """Stops the underlying executor; it is recreated lazily on the next call."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+hashing_pool = PasswordHashingPool(
+    workers=settings.password_hash_workers,
+    max_queue=settings.password_hash_max_queue,
+    max_wait=settings.password_hash_max_wait_seconds,
+    executor_type=settings.password_hash_executor,
+)
+register_metrics_source("password_hashing", hashing_pool.stats)
+
+async def async_hash_password(password: str, rounds: Optional[int] = None) -> str:
+    """
+    Hashes a password on the password hashing pool without blocking the event loop.
+
+    Raises:
+        ValueError: If hashing the password fails.
+        PasswordHashingBusyError: If no worker becomes available in time.
+    """
+    return await hashing_pool.run(_hash_with, _resolve_scheme(rounds), password)
+
+async def async_verify_password(plain_password: str, hashed_password: str) -> bool:
+    """
+    Verifies a password on the password hashing pool without blocking the event loop.
+
+    Raises:
+        ValueError: If the hashed password format is incorrect or the function fails to verify.
+        PasswordHashingBusyError: If no worker becomes available in time.
+    """
+    return await hashing_pool.run(_verify_with, password_hashers.identify(hashed_password), plain_password, hashed_password)
+
+async def async_hash_passwords(passwords: List[str], concurrency: int) -> List[str]:
+    """
+    Hashes many passwords on the password hashing pool, at most `concurrency` at a time.
+
+    Keeping `concurrency` below the pool size leaves workers free for interactive logins while a
+    bulk job runs.
+
+    Raises:
+        ValueError: If hashing a password fails.
+        PasswordHashingBusyError: If no worker becomes available in time.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def hash_one(password: str) -> str:
+        async with semaphore:
+            return await async_hash_password(password)
+
+    tasks = [asyncio.ensure_future(hash_one(password)) for password in passwords]
     try:
-        return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
-    except Exception as e:
-        logger.error("Error verifying password: %s", e)
-        raise ValueError("Authentication process encountered an unexpected error") from e
+        return list(await asyncio.gather(*tasks))
+    except BaseException:
+        # Give back the worker slots of a batch that has already failed
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
 
 def generate_verification_token():
-    return secrets.token_urlsafe(16)  # Generates a secure 16-byte URL-safe token
\ No newline at end of file
+    return secrets.token_urlsafe(16)  # Generates a secure 16-byte URL-safe token
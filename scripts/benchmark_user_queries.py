@@ -0,0 +1,96 @@
+"""
+Micro-benchmark of the per-call overhead of UserService's hot queries.
+
+Compares building each statement per call, as UserService used to, with executing the statements it
+now builds once. The first section times statement preparation alone (building the construct and
+generating the cache key SQLAlchemy looks compiled SQL up by), without a database. With --execute, the
+queries also run against DATABASE_URL, which should contain some users.
+
+    python -m scripts.benchmark_user_queries [--iterations N] [--execute]
+"""
+from builtins import len, max, min, print, range, sorted
+import argparse
+import asyncio
+import time
+import uuid
+from sqlalchemy import func, select
+from app.database import build_engine
+from app.models.user_model import User
+from app.services.user_count_service import USER_COUNT
+from app.services.user_service import PROFILE_BY_ID, PROFILE_COLUMNS, PROFILE_LISTS, USER_BY_EMAIL
+from app.schemas.user_schemas import SortOrder, UserSortField
+from settings.config import settings
+
+EMAIL = "benchmark@example.com"
+USER_ID = uuid.uuid4()
+
+def _rebuilt_queries():
+    return {
+        "user_by_email": lambda: (select(User).where(User.email == EMAIL), None),
+        "profile_by_id": lambda: (select(*PROFILE_COLUMNS).where(User.id == USER_ID), None),
+        "list_users": lambda: (select(*PROFILE_COLUMNS).order_by(User.created_at, User.id).offset(0).limit(10), None),
+        "count": lambda: (select(func.count()).select_from(User), None),
+    }
+
+def _cached_queries():
+    return {
+        "user_by_email": lambda: (USER_BY_EMAIL, {"email": EMAIL}),
+        "profile_by_id": lambda: (PROFILE_BY_ID, {"id": USER_ID}),
+        "list_users": lambda: (PROFILE_LISTS[UserSortField.CREATED_AT, SortOrder.ASC], {"skip": 0, "limit": 10}),
+        "count": lambda: (USER_COUNT, None),
+    }
+
+def _per_call_us(elapsed: float, iterations: int) -> float:
+    return elapsed / iterations * 1_000_000
+
+def bench_preparation(iterations: int):
+    print(f"Statement preparation, {iterations} calls (us per call)")
+    rebuilt, cached = _rebuilt_queries(), _cached_queries()
+    for name in rebuilt:
+        timings = []
+        for queries in (rebuilt, cached):
+            started = time.perf_counter()
+            for _ in range(iterations):
+                statement, _params = queries[name]()
+                statement._generate_cache_key()
+            timings.append(_per_call_us(time.perf_counter() - started, iterations))
+        print(f"  {name:<14} rebuilt {timings[0]:8.2f}   cached {timings[1]:8.2f}")
+
+async def bench_execution(iterations: int):
+    engine = build_engine(settings.database_url)
+    try:
+        async with engine.connect() as connection:
+            row = (await connection.execute(select(User.id, User.email).limit(1))).first()
+            if row is None:
+                print("No users in the database; skipping execution")
+                return
+            global EMAIL, USER_ID
+            USER_ID, EMAIL = row.id, row.email
+            print(f"Execution against the database, {iterations} calls (us per call, median of 5 rounds)")
+            rebuilt, cached = _rebuilt_queries(), _cached_queries()
+            for name in rebuilt:
+                medians = []
+                for queries in (rebuilt, cached):
+                    rounds = []
+                    for _ in range(5):
+                        started = time.perf_counter()
+                        for _ in range(iterations):
+                            statement, params = queries[name]()
+                            (await connection.execute(statement, params)).all()
+                        rounds.append(_per_call_us(time.perf_counter() - started, iterations))
+                    medians.append(sorted(rounds)[len(rounds) // 2])
+                print(f"  {name:<14} rebuilt {medians[0]:8.2f}   cached {medians[1]:8.2f}")
+    finally:
+        await engine.dispose()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=10_000)
+    parser.add_argument("--execute", action="store_true", help="Also run the queries against DATABASE_URL")
+    args = parser.parse_args()
+    bench_preparation(args.iterations)
+    if args.execute:
+        asyncio.run(bench_execution(max(1, min(args.iterations, 2_000))))
+
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,7 @@ Fixtures:
 - `async_client`: Manages an asynchronous HTTP client for testing interactions with the FastAPI application.
 - `db_session`: Handles database transactions to ensure a clean database state for each test.
 - User fixtures (`user`, `locked_user`, `verified_user`, etc.): Set up various user states to test different behaviors under diverse conditions.
+- `pg_trgm`: Skips a test when the database lacks the pg_trgm extension.
 - `token`: Generates an authentication token for testing secured endpoints.
 - `initialize_database`: Prepares the database at the session start.
 - `setup_database`: Sets up and tears down the database before and after each test.
@@ -23,6 +24,7 @@ from uuid import uuid4
 import pytest
 from fastapi.testclient import TestClient
 from httpx import AsyncClient
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker, scoped_session
 from faker import Faker
@@ -31,11 +33,13 @@ from faker import Faker
 from app.main import app
 from app.database import Base, Database
 from app.models.user_model import User, UserRole
-from app.dependencies import get_db, get_settings
+from app.dependencies import get_db, get_read_db, get_read_session_factory, get_settings
+from app.utils.login_attempts import InMemoryLoginAttemptBackend, login_attempt_tracker
 from app.utils.security import hash_password
 from app.utils.template_manager import TemplateManager
 from app.services.email_service import EmailService
 from app.services.jwt_service import create_access_token
+from app.services.user_service import UserService
 
 fake = Faker()
 
@@ -59,6 +63,8 @@ def email_service():
 async def async_client(db_session):
     async with AsyncClient(app=app, base_url="http://testserver") as client:
         app.dependency_overrides[get_db] = lambda: db_session
+        app.dependency_overrides[get_read_db] = lambda: db_session
+        app.dependency_overrides[get_read_session_factory] = lambda: AsyncTestingSessionLocal
         try:
             yield client
         finally:
@@ -82,6 +88,16 @@ async def setup_database():
          await conn.run_sync(Base.metadata.drop_all)
     await engine.dispose()
 
+# in-memory failed login windows outlive a test, so start each test with empty ones
+@pytest.fixture(scope="function", autouse=True)
+def reset_login_attempts(monkeypatch):
+    monkeypatch.setattr(login_attempt_tracker, "backend", InMemoryLoginAttemptBackend())
+
+# tables are recreated per test, so forget that an earlier test's users existed
+@pytest.fixture(scope="function", autouse=True)
+def reset_first_user_check(monkeypatch):
+    monkeypatch.setattr(UserService, "_users_exist", False)
+
 @pytest.fixture(scope="function")
 async def db_session(setup_database):
     async with AsyncSessionScoped() as session:
@@ -90,6 +106,13 @@ async def db_session(setup_database):
         finally:
             await session.close()
 
+# search relies on the pg_trgm contrib module, which a bare PostgreSQL install may not ship
+@pytest.fixture(scope="function")
+async def pg_trgm(db_session):
+    result = await db_session.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'"))
+    if result.first() is None:
+        pytest.skip("pg_trgm extension is not available")
+
 @pytest.fixture(scope="function")
 async def locked_user(db_session):
     unique_email = fake.email()
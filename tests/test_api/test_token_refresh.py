@@ -0,0 +1,67 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlencode
+from sqlalchemy import func, select, update
+from app.models.token_model import RefreshToken
+from app.services.token_purge_service import ExpiredTokenPurger
+from app.services.jwt_service import decode_token
+
+async def login(async_client, user):
+    form_data = {"username": user.email, "password": "MySuperPassword$1234"}
+    response = await async_client.post("/login/", data=urlencode(form_data), headers={"Content-Type": "application/x-www-form-urlencoded"})
+    assert response.status_code == 200
+    return response.json()
+
+@pytest.mark.asyncio
+async def test_login_returns_refresh_token(async_client, verified_user):
+    data = await login(async_client, verified_user)
+    assert data["refresh_token"]
+
+@pytest.mark.asyncio
+async def test_refresh_rotates_tokens(async_client, verified_user):
+    tokens = await login(async_client, verified_user)
+    response = await async_client.post("/token/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["refresh_token"] != tokens["refresh_token"]
+    assert decode_token(data["access_token"])["role"] == "AUTHENTICATED"
+
+    # The rotated-out token no longer works
+    response = await async_client.post("/token/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert response.status_code == 401
+
+@pytest.mark.asyncio
+async def test_refresh_token_reuse_revokes_family(async_client, verified_user):
+    tokens = await login(async_client, verified_user)
+    rotated = (await async_client.post("/token/refresh", json={"refresh_token": tokens["refresh_token"]})).json()
+    # Replaying the consumed token revokes the token issued from it as well
+    await async_client.post("/token/refresh", json={"refresh_token": tokens["refresh_token"]})
+    response = await async_client.post("/token/refresh", json={"refresh_token": rotated["refresh_token"]})
+    assert response.status_code == 401
+
+@pytest.mark.asyncio
+async def test_revoke_refresh_token(async_client, verified_user):
+    tokens = await login(async_client, verified_user)
+    response = await async_client.post("/token/revoke", json={"refresh_token": tokens["refresh_token"]})
+    assert response.status_code == 204
+    response = await async_client.post("/token/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert response.status_code == 401
+
+@pytest.mark.asyncio
+async def test_refresh_with_unknown_token(async_client):
+    response = await async_client.post("/token/refresh", json={"refresh_token": "unknown"})
+    assert response.status_code == 401
+
+@pytest.mark.asyncio
+async def test_purge_deletes_only_expired_refresh_tokens(async_client, verified_user, db_session):
+    tokens = await login(async_client, verified_user)
+    await async_client.post("/token/refresh", json={"refresh_token": tokens["refresh_token"]})
+    # Expire the rotated-out token; its replacement stays valid
+    await db_session.execute(
+        update(RefreshToken).where(RefreshToken.revoked_at.isnot(None)).values(expires_at=datetime.now(timezone.utc) - timedelta(minutes=1))
+    )
+    await db_session.commit()
+    purger = ExpiredTokenPurger(interval=60)
+    await purger.purge(db_session)
+    assert purger.stats()["refresh_tokens_purged"] == 1
+    assert (await db_session.execute(select(func.count()).select_from(RefreshToken))).scalar() == 1
@@ -0,0 +1,124 @@
+import time
+from datetime import datetime, timedelta, timezone
+import pytest
+from unittest.mock import AsyncMock
+from sqlalchemy import insert
+from sqlalchemy.exc import OperationalError
+from urllib.parse import urlencode
+from uuid import uuid4
+from app.dependencies import get_current_user
+from app.models.token_model import RevokedToken
+from app.services.jwt_service import create_access_token, decode_token
+from app.services.token_revocation_service import TokenRevocationList, revocation_list
+
+@pytest.fixture(autouse=True)
+def reset_revocation_list():
+    revocation_list.reset()
+    yield
+    revocation_list.reset()
+
+async def login(async_client, user):
+    form_data = {"username": user.email, "password": "MySuperPassword$1234"}
+    response = await async_client.post("/login/", data=urlencode(form_data), headers={"Content-Type": "application/x-www-form-urlencoded"})
+    assert response.status_code == 200
+    return response.json()
+
+@pytest.mark.asyncio
+async def test_logout_revokes_access_token(async_client, verified_user):
+    tokens = await login(async_client, verified_user)
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+    response = await async_client.post("/logout/", json={"refresh_token": tokens["refresh_token"]}, headers=headers)
+    assert response.status_code == 204
+
+    response = await async_client.put("/profile/", json={"first_name": "After"}, headers=headers)
+    assert response.status_code == 401
+    response = await async_client.post("/token/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert response.status_code == 401
+
+@pytest.mark.asyncio
+async def test_revocations_loaded_from_database(async_client, verified_user):
+    tokens = await login(async_client, verified_user)
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+    await async_client.post("/logout/", headers=headers)
+    # Simulate another worker that has not seen the revocation yet
+    revocation_list.reset()
+    response = await async_client.put("/profile/", json={"first_name": "After"}, headers=headers)
+    assert response.status_code == 401
+
+@pytest.mark.asyncio
+async def test_force_logout_by_admin(async_client, verified_user, admin_token):
+    tokens = await login(async_client, verified_user)
+    response = await async_client.post(
+        f"/users/{verified_user.id}/force-logout", headers={"Authorization": f"Bearer {admin_token}"}
+    )
+    assert response.status_code == 204
+    response = await async_client.put("/profile/", json={"first_name": "After"}, headers={"Authorization": f"Bearer {tokens['access_token']}"})
+    assert response.status_code == 401
+    response = await async_client.post("/token/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert response.status_code == 401
+
+@pytest.mark.asyncio
+async def test_login_right_after_force_logout_is_accepted(async_client, verified_user, admin_token):
+    response = await async_client.post(
+        f"/users/{verified_user.id}/force-logout", headers={"Authorization": f"Bearer {admin_token}"}
+    )
+    assert response.status_code == 204
+    # Usually minted within the same second as the revocation
+    tokens = await login(async_client, verified_user)
+    response = await async_client.put("/profile/", json={"first_name": "After"}, headers={"Authorization": f"Bearer {tokens['access_token']}"})
+    assert response.status_code == 200
+
+@pytest.mark.asyncio
+async def test_force_logout_requires_admin(async_client, verified_user, manager_token):
+    response = await async_client.post(
+        f"/users/{verified_user.id}/force-logout", headers={"Authorization": f"Bearer {manager_token}"}
+    )
+    assert response.status_code == 403
+
+def test_subject_revocation_spares_later_tokens():
+    revocations = TokenRevocationList(refresh_seconds=5)
+    revoked_at = datetime.now(timezone.utc)
+    revocations._remember(None, "user-id", revoked_at, revoked_at + timedelta(minutes=15))
+    assert revocations.is_revoked({"sub": "user-id", "iat": int(revoked_at.timestamp()) - 60})
+    assert not revocations.is_revoked({"sub": "user-id", "iat": int(revoked_at.timestamp()) + 60})
+    assert not revocations.is_revoked({"sub": "other-user", "iat": int(revoked_at.timestamp()) - 60})
+
+@pytest.mark.asyncio
+async def test_refresh_loads_revocations_stamped_by_a_lagging_clock(db_session):
+    revocations = TokenRevocationList(refresh_seconds=1)
+    expires_at = datetime.now(timezone.utc) + timedelta(minutes=15)
+    await db_session.execute(insert(RevokedToken).values(jti="seen-jti", expires_at=expires_at))
+    await db_session.commit()
+    await revocations.refresh_if_stale(db_session)
+    # Another host whose clock is minutes behind revokes a user after that load
+    lagging = datetime.now(timezone.utc) - timedelta(minutes=5)
+    await db_session.execute(insert(RevokedToken).values(subject="user-id", revoked_at=lagging, expires_at=expires_at))
+    await db_session.commit()
+    revocations._next_refresh = 0
+    await revocations.refresh_if_stale(db_session)
+    assert revocations.is_revoked({"sub": "user-id", "iat": lagging.timestamp() - 1})
+
+@pytest.mark.asyncio
+async def test_failing_refresh_still_authenticates_tokens():
+    session = AsyncMock()
+    session.execute.side_effect = OperationalError("SELECT", {}, Exception("connection refused"))
+    user_id = str(uuid4())
+    token = create_access_token(data={"sub": user_id, "role": "AUTHENTICATED"})
+    current_user = await get_current_user(token, session)
+    assert current_user["user_id"] == user_id
+    assert revocation_list.stats()["refresh_failures"] == 1
+    # The failed load is not retried by the next request
+    await get_current_user(token, session)
+    assert session.execute.await_count == 1
+
+def test_subject_revocation_within_the_same_second():
+    revocations = TokenRevocationList(refresh_seconds=5)
+    revoked_at = datetime(2026, 1, 1, 12, 0, 0, 500000, tzinfo=timezone.utc)
+    revocations._remember(None, "user-id", revoked_at, revoked_at + timedelta(minutes=15))
+    assert revocations.is_revoked({"sub": "user-id", "iat": revoked_at.timestamp() - 0.1})
+    assert not revocations.is_revoked({"sub": "user-id", "iat": revoked_at.timestamp() + 0.1})
+
+def test_access_tokens_carry_jti_and_iat():
+    claims = decode_token(create_access_token(data={"sub": "user-id", "role": "admin"}))
+    assert claims["jti"]
+    assert claims["iat"] <= time.time()
@@ -2,7 +2,9 @@
 from builtins import str
 import pytest
 from httpx import AsyncClient
+from app import dependencies
 from app.models.user_model import User, UserRole
+from app.services.jwt_service import create_access_token, decode_token
 from app.services.user_service import UserService
 
 @pytest.mark.asyncio
@@ -156,4 +158,24 @@ async def test_full_profile_workflow(async_client, verified_user, admin_user, em
     response2 = await async_client.put("/profile/", json=profile_update2, headers=headers_user)
     assert response2.status_code == 200
     assert response2.json()["bio"] == profile_update2["bio"]
-    assert response2.json()["is_professional"] is True
\ No newline at end of file
+    assert response2.json()["is_professional"] is True
+
+@pytest.mark.asyncio
+async def test_login_token_subject_is_user_id(async_client, verified_user):
+    form_data = {"username": verified_user.email, "password": "MySuperPassword$1234"}
+    response = await async_client.post("/login/", data=form_data)
+    assert response.status_code == 200
+    assert decode_token(response.json()["access_token"])["sub"] == str(verified_user.id)
+
+@pytest.mark.asyncio
+async def test_update_own_profile_with_legacy_email_token(async_client, verified_user, monkeypatch):
+    legacy_token = create_access_token(data={"sub": verified_user.email, "role": verified_user.role.name})
+    headers = {"Authorization": f"Bearer {legacy_token}"}
+    response = await async_client.put("/profile/", json={"bio": "Still here"}, headers=headers)
+    assert response.status_code == 200
+    assert response.json()["bio"] == "Still here"
+
+    # Once the transition window closes, email subjects are refused
+    monkeypatch.setattr(dependencies._settings, "jwt_accept_email_subject", False)
+    response = await async_client.put("/profile/", json={"bio": "Gone"}, headers=headers)
+    assert response.status_code == 401
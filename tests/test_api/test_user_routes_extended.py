@@ -2,7 +2,10 @@ import pytest
 from httpx import AsyncClient
 from unittest.mock import patch, MagicMock
 from app.models.user_model import User, UserRole
+from app.services import user_count_service
 from app.services.user_service import UserService
+from app.utils.client_ip import ClientAddressResolver
+from app.utils.login_attempts import login_attempt_tracker
 from app.utils.nickname_gen import generate_nickname
 import uuid
 
@@ -131,3 +134,160 @@ async def test_list_users_pagination(async_client, admin_token, users_with_same_
     page1_ids = [item["id"] for item in page1_data["items"]]
     page2_ids = [item["id"] for item in page2_data["items"]]
     assert not any(id1 == id2 for id1 in page1_ids for id2 in page2_ids)
+
+@pytest.mark.asyncio
+async def test_login_shed_with_429_when_auth_budget_exhausted(async_client, verified_user, monkeypatch):
+    from app.dependencies import auth_admission
+    monkeypatch.setattr(auth_admission, "max_wait", 0.01)
+    for _ in range(auth_admission.max_in_flight):
+        await auth_admission.acquire()
+    try:
+        form_data = {"username": verified_user.email, "password": "MySuperPassword$1234"}
+        response = await async_client.post("/login/", data=form_data)
+        assert response.status_code == 429
+        assert response.headers["Retry-After"] == "1"
+        assert auth_admission.stats()["timeouts"] >= 1
+    finally:
+        for _ in range(auth_admission.max_in_flight):
+            auth_admission.release()
+
+@pytest.mark.asyncio
+async def test_login_returns_503_when_hashing_pool_full(async_client, verified_user, monkeypatch):
+    from app.dependencies import get_db
+    from app.main import app
+    from app.utils.security import hashing_pool
+    # Run the real session dependency, so the error has to pass through it to reach its handler
+    app.dependency_overrides.pop(get_db)
+    monkeypatch.setattr(hashing_pool.limiter, "max_queue", 0)
+    for _ in range(hashing_pool.limiter.max_in_flight):
+        await hashing_pool.limiter.acquire()
+    try:
+        form_data = {"username": verified_user.email, "password": "MySuperPassword$1234"}
+        response = await async_client.post("/login/", data=form_data)
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "1"
+        assert "queue" not in response.text
+    finally:
+        for _ in range(hashing_pool.limiter.max_in_flight):
+            hashing_pool.limiter.release()
+
+@pytest.mark.asyncio
+async def test_login_throttled_retry_after_follows_attempt_window(async_client, verified_user, monkeypatch):
+    async def retry_after(ip):
+        return 7
+    monkeypatch.setattr(login_attempt_tracker, "ip_retry_after", retry_after)
+    form_data = {"username": verified_user.email, "password": "MySuperPassword$1234"}
+    response = await async_client.post("/login/", data=form_data)
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "7"
+
+@pytest.mark.asyncio
+async def test_login_throttles_forwarded_clients_separately(async_client, verified_user, monkeypatch):
+    # The test client connects from 127.0.0.1, standing in for the reverse proxy
+    monkeypatch.setattr("app.utils.client_ip.client_address_resolver", ClientAddressResolver(["127.0.0.1"]))
+    monkeypatch.setattr(login_attempt_tracker, "max_ip_failures", 2)
+    form_data = {"username": verified_user.email, "password": "WrongPassword$1234"}
+    first_client = {"X-Forwarded-For": "198.51.100.7"}
+    for _ in range(2):
+        response = await async_client.post("/login/", data=form_data, headers=first_client)
+        assert response.status_code == 401
+    response = await async_client.post("/login/", data=form_data, headers=first_client)
+    assert response.status_code == 429
+
+    response = await async_client.post("/login/", data=form_data, headers={"X-Forwarded-For": "198.51.100.8"})
+    assert response.status_code == 401
+
+@pytest.mark.asyncio
+async def test_list_users_keyset_pagination(async_client, admin_token, users_with_same_role_50_users):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    seen = []
+    url = "/users/?cursor=&limit=20"
+    pages = 0
+    while url:
+        response = await async_client.get(url, headers=headers)
+        assert response.status_code == 200
+        data = response.json()
+        assert data["page"] is None
+        seen.extend(item["id"] for item in data["items"])
+        links = {link["rel"]: link["href"] for link in data["links"]}
+        url = links.get("next")
+        pages += 1
+    # 50 users plus the admin, each seen once
+    assert pages == 3
+    assert len(seen) == len(set(seen)) == 51
+
+    # Walking back from the last page returns the previous page unchanged
+    response = await async_client.get(links["prev"], headers=headers)
+    previous_page = [item["id"] for item in response.json()["items"]]
+    assert previous_page == seen[20:40]
+
+@pytest.mark.asyncio
+async def test_list_users_invalid_cursor(async_client, admin_token):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    response = await async_client.get("/users/?cursor=not-a-cursor", headers=headers)
+    assert response.status_code == 400
+
+@pytest.mark.asyncio
+async def test_list_users_reports_count_strategy(async_client, admin_token, monkeypatch):
+    monkeypatch.setattr(user_count_service.settings, "user_count_strategy", "cached")
+    user_count_service.user_count_cache.invalidate()
+    response = await async_client.get("/users/", headers={"Authorization": f"Bearer {admin_token}"})
+    user_count_service.user_count_cache.invalidate()
+    assert response.status_code == 200
+    assert response.json()["total_strategy"] == "cached"
+    assert response.json()["total"] == 1
+
+@pytest.mark.asyncio
+async def test_list_users_filtered(async_client, admin_token, manager_user, locked_user, users_with_same_role_50_users):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    response = await async_client.get("/users/?role=AUTHENTICATED&is_locked=false&limit=20&sort_by=email&order=desc", headers=headers)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total"] == 50
+    assert data["total_strategy"] == "exact"
+    emails = [item["email"] for item in data["items"]]
+    assert emails == sorted(emails, reverse=True)
+    # Filters and sort carry over to the other pages
+    links = {link["rel"]: link["href"] for link in data["links"]}
+    assert "role=AUTHENTICATED" in links["next"] and "sort_by=email" in links["next"]
+
+    response = await async_client.get("/users/?is_locked=true", headers=headers)
+    assert [item["id"] for item in response.json()["items"]] == [str(locked_user.id)]
+
+@pytest.mark.asyncio
+async def test_list_users_rejects_invalid_filters(async_client, admin_token):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    assert (await async_client.get("/users/?role=SUPERUSER", headers=headers)).status_code == 422
+    assert (await async_client.get("/users/?sort_by=hashed_password", headers=headers)).status_code == 422
+    # Keyset pages only follow the default order
+    assert (await async_client.get("/users/?cursor=&sort_by=email", headers=headers)).status_code == 400
+
+@pytest.mark.asyncio
+async def test_autocomplete_users(async_client, manager_token, manager_user, admin_user):
+    headers = {"Authorization": f"Bearer {manager_token}"}
+    response = await async_client.get("/users/autocomplete?prefix=man", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["items"] == [{"id": str(manager_user.id), "value": "manager_john"}]
+    response = await async_client.get("/users/autocomplete?prefix=admin&field=email", headers=headers)
+    assert [item["value"] for item in response.json()["items"]] == ["admin@example.com"]
+    # The result limit is capped
+    response = await async_client.get("/users/autocomplete?prefix=a&limit=1000", headers=headers)
+    assert response.status_code == 422
+
+@pytest.mark.asyncio
+async def test_search_users(async_client, admin_token, manager_user, pg_trgm):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    response = await async_client.get("/users/search?q=manager", headers=headers)
+    assert response.status_code == 200
+    items = response.json()["items"]
+    assert items[0]["id"] == str(manager_user.id)
+    assert 0 < items[0]["score"] <= 1
+
+@pytest.mark.asyncio
+async def test_search_users_validation_and_access(async_client, admin_token, user_token):
+    response = await async_client.get("/users/search?q=ab", headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.status_code == 422
+    response = await async_client.get("/users/search?q=manager", headers={"Authorization": f"Bearer {user_token}"})
+    assert response.status_code == 403
+    response = await async_client.get("/users/autocomplete?prefix=man", headers={"Authorization": f"Bearer {user_token}"})
+    assert response.status_code == 403
@@ -1,11 +1,23 @@
-from builtins import str
+from builtins import float, len, range, sorted, str
+import asyncio
+from uuid import uuid4
+import json
 import pytest
 from httpx import AsyncClient
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
 from app.main import app
+from app.database import Database, ReplicaRouter, RoutingSession
+from app.dependencies import get_email_service, get_read_db, get_settings
 from app.models.user_model import User, UserRole
+from app.services import user_import_service
+from app.services.token_revocation_service import revocation_list
+from app.services.user_service import profile_loader
 from app.utils.nickname_gen import generate_nickname
 from app.utils.security import hash_password
 from app.services.jwt_service import decode_token  # Import your FastAPI app
+from tests.conftest import engine
 
 # Example of a test function using the async_client fixture
 @pytest.mark.asyncio
@@ -190,3 +202,162 @@ async def test_list_users_unauthorized(async_client, user_token):
         headers={"Authorization": f"Bearer {user_token}"}
     )
     assert response.status_code == 403  # Forbidden, as expected for regular user
+
+@pytest.mark.asyncio
+async def test_metrics_as_admin(async_client, admin_token):
+    response = await async_client.get("/metrics/", headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.status_code == 200
+    assert "checked_out" in response.json()["database_pool"]
+    assert "in_flight" in response.json()["password_hashing"]
+
+@pytest.mark.asyncio
+async def test_metrics_as_manager_denied(async_client, manager_token):
+    response = await async_client.get("/metrics/", headers={"Authorization": f"Bearer {manager_token}"})
+    assert response.status_code == 403
+
+@pytest.mark.asyncio
+async def test_bulk_import_ndjson(async_client, admin_token, email_service):
+    app.dependency_overrides[get_email_service] = lambda: email_service
+    body = "\n".join(json.dumps(row) for row in [
+        {"email": f"bulk{i}@example.com", "hashed_password": hash_password("Secure*1234", 10)} for i in range(3)
+    ] + [{"email": "bulk0@example.com", "password": "Secure*1234"}])
+    response = await async_client.post(
+        "/users/bulk", content=body,
+        headers={"Authorization": f"Bearer {admin_token}", "Content-Type": "application/x-ndjson"},
+    )
+    assert response.status_code == 200
+    report = response.json()
+    assert (report["created"], report["failed"]) == (3, 1)
+    assert report["rows"][3]["status"] == "duplicate"
+    assert email_service.send_verification_email.call_count == 3
+
+@pytest.mark.asyncio
+async def test_bulk_import_too_large_after_commit_reports_imported_rows(async_client, admin_token, email_service, db_session, monkeypatch):
+    monkeypatch.setattr(user_import_service.settings, "bulk_import_max_rows", 5)
+    monkeypatch.setattr(user_import_service.settings, "bulk_import_batch_size", 2)
+    app.dependency_overrides[get_email_service] = lambda: email_service
+    hashed = hash_password("Secure*1234", 10)
+    body = "\n".join(json.dumps({"email": f"capped{i}@example.com", "hashed_password": hashed}) for i in range(6))
+    response = await async_client.post(
+        "/users/bulk", content=body,
+        headers={"Authorization": f"Bearer {admin_token}", "Content-Type": "application/x-ndjson"},
+    )
+    assert response.status_code == 200
+    report = response.json()
+    # The two committed batches are reported; the pending fifth row is not imported
+    assert report["truncated"] is True
+    assert "at most 5 rows" in report["error"]
+    assert (report["total"], report["created"]) == (4, 4)
+    result = await db_session.execute(select(User.email).where(User.email.like("capped%")))
+    assert sorted(result.scalars()) == [f"capped{i}@example.com" for i in range(4)]
+    assert email_service.send_verification_email.call_count == 4
+
+@pytest.mark.asyncio
+async def test_bulk_import_csv(async_client, admin_token, email_service):
+    app.dependency_overrides[get_email_service] = lambda: email_service
+    body = "email,password,first_name\ncsv1@example.com,Secure*1234,Ann\ncsv2@example.com,,Bob\n"
+    response = await async_client.post(
+        "/users/bulk", content=body,
+        headers={"Authorization": f"Bearer {admin_token}", "Content-Type": "text/csv"},
+    )
+    assert response.status_code == 200
+    assert [row["status"] for row in response.json()["rows"]] == ["created", "invalid"]
+
+@pytest.mark.asyncio
+async def test_bulk_import_rejects_unknown_format(async_client, admin_token):
+    response = await async_client.post(
+        "/users/bulk", content="{}", headers={"Authorization": f"Bearer {admin_token}", "Content-Type": "application/json"}
+    )
+    assert response.status_code == 415
+
+@pytest.mark.asyncio
+async def test_bulk_import_requires_admin(async_client, manager_token):
+    response = await async_client.post(
+        "/users/bulk", content="", headers={"Authorization": f"Bearer {manager_token}", "Content-Type": "text/csv"}
+    )
+    assert response.status_code == 403
+
+@pytest.mark.asyncio
+async def test_export_users_ndjson(async_client, admin_token, users_with_same_role_50_users):
+    response = await async_client.get("/users/export", headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert len(rows) == 51
+    assert "hashed_password" not in rows[0]
+    assert {row["email"] for row in rows} >= {user.email for user in users_with_same_role_50_users}
+
+@pytest.mark.asyncio
+async def test_export_users_csv(async_client, admin_token, users_with_same_role_50_users):
+    response = await async_client.get("/users/export?format=csv", headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.status_code == 200
+    lines = response.text.splitlines()
+    assert lines[0].startswith("id,email,nickname")
+    assert len(lines) == 52
+
+@pytest.mark.asyncio
+async def test_export_users_requires_admin(async_client, manager_token):
+    response = await async_client.get("/users/export", headers={"Authorization": f"Bearer {manager_token}"})
+    assert response.status_code == 403
+
+@pytest.mark.asyncio
+async def test_export_users_rejects_unknown_format(async_client, admin_token):
+    response = await async_client.get("/users/export?format=xml", headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.status_code == 422
+
+@pytest.mark.asyncio
+async def test_batch_get_users(async_client, manager_token, users_with_same_role_50_users):
+    first, second = users_with_same_role_50_users[0], users_with_same_role_50_users[1]
+    missing_id = str(uuid4())
+    response = await async_client.post(
+        "/users/batch-get",
+        json={"ids": [str(first.id), missing_id], "emails": [second.email, "nobody@example.com"]},
+        headers={"Authorization": f"Bearer {manager_token}"},
+    )
+    assert response.status_code == 200
+    body = response.json()
+    assert sorted(item["email"] for item in body["items"]) == sorted([first.email, second.email])
+    assert body["missing"] == [missing_id, "nobody@example.com"]
+
+@pytest.mark.asyncio
+async def test_concurrent_get_user_requests_share_one_select(async_client, manager_token, users_with_same_role_50_users, monkeypatch):
+    # Serve the route from real read-only sessions, each request on its own, as in production
+    read_sessions = sessionmaker(
+        class_=AsyncSession, sync_session_class=RoutingSession,
+        info={"router": ReplicaRouter(engine, [], 1.0, 1.0)}, expire_on_commit=False,
+    )
+    monkeypatch.setattr(Database, "_read_session_factory", read_sessions)
+
+    async def read_db():
+        async with read_sessions() as session:
+            yield session
+
+    app.dependency_overrides[get_read_db] = read_db
+    monkeypatch.setattr(revocation_list, "_next_refresh", float("inf"))
+    monkeypatch.setattr(profile_loader, "delay", 0.05)
+    selects = []
+
+    def count_selects(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and "FROM users" in statement:
+            selects.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", count_selects)
+    try:
+        users = users_with_same_role_50_users[:5]
+        headers = {"Authorization": f"Bearer {manager_token}"}
+        responses = await asyncio.gather(*(async_client.get(f"/users/{user.id}", headers=headers) for user in users))
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", count_selects)
+    assert [response.json()["id"] for response in responses] == [str(user.id) for user in users]
+    assert len(selects) == 1
+
+@pytest.mark.asyncio
+async def test_batch_get_users_too_many_keys(async_client, admin_token):
+    ids = [str(uuid4()) for _ in range(get_settings().batch_get_max_keys + 1)]
+    response = await async_client.post("/users/batch-get", json={"ids": ids}, headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.status_code == 400
+
+@pytest.mark.asyncio
+async def test_batch_get_users_unauthorized(async_client, user_token):
+    response = await async_client.post("/users/batch-get", json={"ids": []}, headers={"Authorization": f"Bearer {user_token}"})
+    assert response.status_code == 403
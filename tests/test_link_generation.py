@@ -49,3 +49,16 @@ def test_generate_pagination_links(mock_request):
     assert len(links) >= 4
     expected_self_url = "http://testserver/users?limit=5&skip=10"
     assert normalize_url(str(links[0].href)) == normalize_url(expected_self_url), "Self link should match expected URL"
+
+def test_generate_keyset_pagination_links(mock_request):
+    links = generate_pagination_links(mock_request, 0, 5, 50, cursor="abc", next_cursor="def", prev_cursor=None)
+    rels = {link.rel: normalize_url(str(link.href)) for link in links}
+    assert rels["next"] == normalize_url("http://testserver/users?cursor=def&limit=5")
+    assert rels["first"] == normalize_url("http://testserver/users?cursor=&limit=5")
+    assert "prev" not in rels and "last" not in rels
+
+def test_pagination_links_keep_other_query_params(mock_request):
+    mock_request.url = "http://testserver/users?skip=0&limit=5&role=MANAGER&is_locked=true"
+    links = generate_pagination_links(mock_request, 0, 5, 50)
+    rels = {link.rel: normalize_url(str(link.href)) for link in links}
+    assert rels["next"] == normalize_url("http://testserver/users?skip=5&limit=5&role=MANAGER&is_locked=true")
@@ -1,7 +1,12 @@
 # test_security.py
 from builtins import RuntimeError, ValueError, isinstance, str
+import asyncio
+import threading
 import pytest
-from app.utils.security import hash_password, verify_password
+from app.utils.security import (
+    Argon2idScheme, BcryptScheme, PasswordHashRegistry, PasswordHashingBusyError, PasswordHashingPool,
+    async_hash_password, async_hash_passwords, async_verify_password, hash_password, needs_rehash, verify_password
+)
 
 def test_hash_password():
     """Test that hashing password returns a bcrypt hashed string."""
@@ -65,3 +70,109 @@ def test_hash_password_internal_error(monkeypatch):
     with pytest.raises(ValueError):
         hash_password("test")
 
+
+@pytest.mark.asyncio
+async def test_async_hash_and_verify_password():
+    """Test that the pooled async helpers round-trip a password."""
+    hashed = await async_hash_password("secure_password", 4)
+    assert hashed.startswith('$2b$04$')
+    assert await async_verify_password("secure_password", hashed) is True
+    assert await async_verify_password("wrong_password", hashed) is False
+
+@pytest.mark.asyncio
+async def test_async_verify_password_invalid_hash():
+    """Test that errors from the worker propagate to the caller."""
+    with pytest.raises(ValueError):
+        await async_verify_password("secure_password", "invalid_hash_format")
+
+@pytest.mark.asyncio
+async def test_hashing_pool_rejects_when_queue_full():
+    """Test that callers beyond the worker and queue limits are rejected instead of piling up."""
+    pool = PasswordHashingPool(workers=1, max_queue=0, max_wait=1.0)
+    release = threading.Event()
+    running = asyncio.ensure_future(pool.run(release.wait))
+    await asyncio.sleep(0.05)
+    try:
+        with pytest.raises(PasswordHashingBusyError):
+            await pool.run(hash_password, "secure_password", 4)
+        assert pool.stats()["rejected"] == 1
+        assert pool.stats()["in_flight"] == 1
+    finally:
+        release.set()
+        await running
+        pool.shutdown()
+
+@pytest.mark.asyncio
+async def test_hashing_pool_times_out_waiting_for_worker():
+    """Test that a queued caller gives up after the configured wait time."""
+    pool = PasswordHashingPool(workers=1, max_queue=5, max_wait=0.05)
+    release = threading.Event()
+    running = asyncio.ensure_future(pool.run(release.wait))
+    await asyncio.sleep(0.05)
+    try:
+        with pytest.raises(PasswordHashingBusyError):
+            await pool.run(hash_password, "secure_password", 4)
+        assert pool.stats()["timeouts"] == 1
+        assert pool.stats()["queued"] == 0
+    finally:
+        release.set()
+        await running
+        pool.shutdown()
+
+@pytest.mark.asyncio
+async def test_async_hash_passwords_cancels_rest_of_failed_batch(monkeypatch):
+    """Test that a failed batch stops its other hash jobs instead of leaving them on the pool."""
+    cancelled = []
+
+    async def fake_hash(password, rounds=None):
+        if password == "busy":
+            await asyncio.sleep(0.01)
+            raise PasswordHashingBusyError("password hashing queue is full")
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(password)
+            raise
+
+    monkeypatch.setattr("app.utils.security.async_hash_password", fake_hash)
+    with pytest.raises(PasswordHashingBusyError):
+        await async_hash_passwords(["busy", "a", "b"], concurrency=3)
+    assert sorted(cancelled) == ["a", "b"]
+
+def test_verify_password_argon2id_hash():
+    """Test that argon2id hashes are recognised and verified alongside bcrypt ones."""
+    hashed = Argon2idScheme(time_cost=2, memory_cost=1024, parallelism=1).hash("secure_password")
+    assert hashed.startswith('$argon2id$v=19$m=1024,t=2,p=1$')
+    assert verify_password("secure_password", hashed) is True
+    assert verify_password("wrong_password", hashed) is False
+
+def test_needs_rehash_outdated_parameters():
+    """Test that hashes made with a lower cost or another scheme are flagged for rehashing."""
+    assert needs_rehash(hash_password("secure_password")) is False
+    assert needs_rehash(hash_password("secure_password", 4)) is True
+    assert needs_rehash(Argon2idScheme(time_cost=2, memory_cost=1024, parallelism=1).hash("secure_password")) is True
+
+def test_registry_rehash_to_new_default_scheme():
+    """Test that switching the default scheme marks existing bcrypt hashes for upgrade."""
+    argon2 = Argon2idScheme(time_cost=2, memory_cost=1024, parallelism=1)
+    registry = PasswordHashRegistry("argon2id", {"bcrypt": BcryptScheme(4), "argon2id": argon2})
+    assert registry.needs_rehash(BcryptScheme(4).hash("secure_password")) is True
+    assert registry.needs_rehash(argon2.hash("secure_password")) is False
+
+def test_stronger_hashes_are_not_downgraded():
+    """Test that a hash made with a higher cost than the default is kept, so workers calibrated differently agree."""
+    argon2 = Argon2idScheme(time_cost=2, memory_cost=1024, parallelism=1)
+    registry = PasswordHashRegistry("bcrypt", {"bcrypt": BcryptScheme(4), "argon2id": argon2})
+    assert registry.needs_rehash(BcryptScheme(5).hash("secure_password")) is False
+    assert argon2.needs_rehash(Argon2idScheme(time_cost=3, memory_cost=2048, parallelism=2).hash("secure_password")) is False
+    assert argon2.needs_rehash(Argon2idScheme(time_cost=1, memory_cost=2048, parallelism=1).hash("secure_password")) is True
+
+def test_registry_rejects_unknown_scheme():
+    with pytest.raises(ValueError):
+        PasswordHashRegistry("md5", {"bcrypt": BcryptScheme()})
+
+def test_bcrypt_calibration_stays_within_bounds():
+    """Test that calibration never drops below the minimum cost, even for a tiny latency target."""
+    scheme = BcryptScheme()
+    scheme.calibrate(0.001)
+    assert scheme.rounds == BcryptScheme.min_rounds
@@ -0,0 +1,80 @@
+import time
+from datetime import timedelta
+import pytest
+from app.services.jwt_service import (
+    VerifiedTokenCache, create_access_token, decode_token_cached, verified_token_cache
+)
+
+@pytest.fixture(autouse=True)
+def clear_token_cache():
+    verified_token_cache.clear()
+    yield
+    verified_token_cache.clear()
+
+def test_decode_token_cached_hits_after_first_verification():
+    token = create_access_token(data={"sub": "user-id", "role": "admin"}, expires_delta=timedelta(minutes=5))
+    hits, misses = verified_token_cache.hits, verified_token_cache.misses
+    first = decode_token_cached(token)
+    second = decode_token_cached(token)
+    assert first == second
+    assert first["role"] == "ADMIN"
+    assert verified_token_cache.misses == misses + 1
+    assert verified_token_cache.hits == hits + 1
+
+def test_decode_token_cached_rejects_invalid_token():
+    assert decode_token_cached("not-a-jwt") is None
+    assert verified_token_cache.stats()["size"] == 0
+
+def test_cache_drops_expired_entries():
+    cache = VerifiedTokenCache(max_size=10)
+    cache.put("token", {"sub": "user-id", "exp": time.time() - 1})
+    assert cache.get("token") is None
+    assert cache.stats()["size"] == 0
+
+def test_cache_evicts_expired_entries_that_are_never_read_again():
+    cache = VerifiedTokenCache(max_size=10)
+    cache.put("live", {"sub": "live", "exp": time.time() + 60})
+    cache.put("expired", {"sub": "expired", "exp": time.time() - 1})
+    cache.put("other", {"sub": "other", "exp": time.time() + 60})
+    assert len(cache._entries) == 2
+    assert cache.get("live")["sub"] == "live"
+
+def test_cache_evicts_least_recently_used():
+    cache = VerifiedTokenCache(max_size=2)
+    expires_at = time.time() + 60
+    cache.put("a", {"sub": "a", "exp": expires_at})
+    cache.put("b", {"sub": "b", "exp": expires_at})
+    cache.get("a")
+    cache.put("c", {"sub": "c", "exp": expires_at})
+    assert cache.get("b") is None
+    assert cache.get("a")["sub"] == "a"
+    assert cache.get("c")["sub"] == "c"
+
+def test_cache_skips_tokens_without_expiry():
+    cache = VerifiedTokenCache(max_size=10)
+    cache.put("token", {"sub": "user-id"})
+    assert cache.get("token") is None
+
+def test_decode_token_cached_disabled(monkeypatch):
+    from settings.config import settings
+    monkeypatch.setattr(settings, "jwt_cache_enabled", False)
+    token = create_access_token(data={"sub": "user-id", "role": "admin"})
+    assert decode_token_cached(token)["sub"] == "user-id"
+    assert verified_token_cache.stats()["size"] == 0
+
+def test_user_access_token_carries_id_subject():
+    import uuid
+    from app.schemas.token_schema import ACCESS_TOKEN_VERSION, AccessTokenClaims
+    from app.services.jwt_service import create_user_access_token
+    user_id = uuid.uuid4()
+    claims = AccessTokenClaims.model_validate(decode_token_cached(create_user_access_token(user_id, "MANAGER")))
+    assert claims.sub == str(user_id)
+    assert claims.ver == ACCESS_TOKEN_VERSION
+    assert not claims.subject_is_email
+
+def test_access_token_claims_reject_email_subject_in_current_version():
+    import pydantic
+    from app.schemas.token_schema import AccessTokenClaims
+    with pytest.raises(pydantic.ValidationError):
+        AccessTokenClaims.model_validate({"sub": "john@example.com", "role": "ADMIN", "ver": 2})
+    assert AccessTokenClaims.model_validate({"sub": "john@example.com", "role": "ADMIN"}).subject_is_email
@@ -0,0 +1,54 @@
+from builtins import len, range
+import asyncio
+import pytest
+from app.models.user_model import User, UserRole
+from app.services.nickname_service import NicknamePool
+from app.utils.nickname_gen import NicknameGenerator
+from tests.conftest import AsyncTestingSessionLocal
+
+def _pool(size=10, refill_threshold=0):
+    # 2 x 2 x 10 = 40 possible nicknames, so collisions with existing users are likely
+    return NicknamePool(NicknameGenerator(["red", "blue"], ["cat", "dog"], 9), size, refill_threshold)
+
+async def test_refill_skips_taken_nicknames(db_session):
+    taken = [f"red_cat_{i}" for i in range(10)]
+    db_session.add_all(User(nickname=nickname, email=f"{nickname}@example.com", hashed_password="hashed", role=UserRole.AUTHENTICATED) for nickname in taken)
+    await db_session.commit()
+    pool = _pool(size=25)
+    await pool.refill(db_session)
+    claimed = {await pool.claim(db_session) for _ in range(len(pool))}
+    assert claimed and not claimed & set(taken)
+
+async def test_claim_is_served_from_the_pool(db_session, mocker):
+    pool = _pool(size=10)
+    await pool.refill(db_session)
+    execute = mocker.spy(db_session, "execute")
+    for _ in range(5):
+        await pool.claim(db_session)
+    assert execute.call_count == 0
+    assert pool.stats()["claims"] == 5 and pool.stats()["misses"] == 0
+
+async def test_empty_pool_refills_inline(db_session):
+    pool = _pool(size=5)
+    nickname = await pool.claim(db_session)
+    assert nickname
+    assert pool.stats()["misses"] == 1 and len(pool) > 0
+
+async def test_low_pool_refills_in_background(db_session):
+    pool = _pool(size=10, refill_threshold=5)
+    pool.start(AsyncTestingSessionLocal)
+    try:
+        for _ in range(50):
+            if len(pool):
+                break
+            await asyncio.sleep(0.02)
+        assert len(pool) >= 5
+        for _ in range(len(pool) - 1):
+            await pool.claim(db_session)
+        for _ in range(50):
+            if len(pool) >= 5:
+                break
+            await asyncio.sleep(0.02)
+        assert pool.stats()["refills"] >= 2
+    finally:
+        await pool.stop()
@@ -0,0 +1,47 @@
+import pytest
+from sqlalchemy import text
+from app.services.user_count_service import USER_COUNT, CountStrategy, UserCountService, user_count_cache
+from app.services.user_service import UserService
+
+pytestmark = pytest.mark.asyncio
+
+@pytest.fixture(autouse=True)
+def fresh_count_cache():
+    user_count_cache.invalidate()
+    yield
+    user_count_cache.invalidate()
+
+async def test_exact_count(db_session, users_with_same_role_50_users):
+    assert await UserCountService.total(db_session, "exact") == (50, CountStrategy.EXACT)
+
+async def test_cached_count_follows_creates_and_deletes(db_session, users_with_same_role_50_users, email_service):
+    assert await UserCountService.total(db_session, "cached") == (50, CountStrategy.CACHED)
+    await UserService.delete(db_session, users_with_same_role_50_users[0].id)
+    assert await UserCountService.total(db_session, "cached") == (49, CountStrategy.CACHED)
+    assert user_count_cache.stats()["recounts"] >= 1
+
+async def test_cached_count_recounts_after_ttl(db_session, users_with_same_role_50_users, monkeypatch):
+    user_count_cache.set(7)
+    monkeypatch.setattr(user_count_cache, "_expires_at", 0.0)
+    assert await UserCountService.total(db_session, "cached") == (50, CountStrategy.CACHED)
+
+async def test_estimated_count_uses_planner_statistics(db_session, users_with_same_role_50_users):
+    # Not analyzed yet: falls back to an exact count and reports it as such
+    assert await UserCountService.total(db_session, "estimated") == (50, CountStrategy.EXACT)
+    await db_session.execute(text("ANALYZE users"))
+    assert await UserCountService.total(db_session, "estimated") == (50, CountStrategy.ESTIMATED)
+
+async def test_unknown_count_strategy(db_session):
+    with pytest.raises(ValueError):
+        await UserCountService.total(db_session, "guess")
+
+async def test_exact_count_reuses_cached_statement(db_session, users_with_same_role_50_users, monkeypatch):
+    executed = []
+    execute = db_session.execute
+    async def recording_execute(statement, *args, **kwargs):
+        executed.append(statement)
+        return await execute(statement, *args, **kwargs)
+    monkeypatch.setattr(db_session, "execute", recording_execute)
+    assert await UserService.count_users(db_session) == (50, CountStrategy.EXACT)
+    assert await UserService.count(db_session) == 50
+    assert executed == [USER_COUNT, USER_COUNT]
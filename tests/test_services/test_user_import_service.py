@@ -0,0 +1,59 @@
+from builtins import RuntimeError, dict, enumerate, isinstance
+from types import SimpleNamespace
+from uuid import uuid4
+import pytest
+from sqlalchemy import select
+from app.models.user_model import User, UserRole
+from app.services import user_import_service
+from app.services.user_import_service import BulkImportTooLarge, UserImportService
+from app.utils.security import hash_password, verify_password
+
+pytestmark = pytest.mark.asyncio
+
+async def records(*items):
+    for row, item in enumerate(items, start=1):
+        yield (row, item, None) if isinstance(item, dict) else (row, None, item)
+
+async def test_import_reports_every_row(db_session, user, monkeypatch):
+    monkeypatch.setattr(user_import_service.settings, "bulk_import_batch_size", 2)
+    existing_hash = hash_password("Imported*1234")
+    report, created = await UserImportService.import_users(db_session, records(
+        {"email": "new1@example.com", "password": "Secure*1234", "first_name": "New"},
+        {"email": "new2@example.com", "hashed_password": existing_hash, "nickname": "chosen_name"},
+        {"email": user.email, "password": "Secure*1234"},
+        {"email": "new1@example.com", "password": "Secure*1234"},
+        {"email": "not-an-email", "password": "Secure*1234"},
+        {"email": "nopassword@example.com"},
+        {"email": "badhash@example.com", "hashed_password": "plaintext"},
+        {"email": "taken@example.com", "password": "Secure*1234", "nickname": user.nickname},
+        "Invalid JSON",
+    ))
+    statuses = [(row.row, row.status) for row in report.rows]
+    assert statuses == [
+        (1, "created"), (2, "created"), (3, "duplicate"), (4, "duplicate"), (5, "invalid"),
+        (6, "invalid"), (7, "invalid"), (8, "duplicate"), (9, "invalid"),
+    ]
+    assert (report.total, report.created, report.failed) == (9, 2, 7)
+    assert {row.email for row in created} == {"new1@example.com", "new2@example.com"}
+
+    result = await db_session.execute(select(User).where(User.email.in_(["new1@example.com", "new2@example.com"])))
+    imported = {u.email: u for u in result.scalars()}
+    assert imported["new2@example.com"].nickname == "chosen_name"
+    assert imported["new2@example.com"].hashed_password == existing_hash
+    assert verify_password("Secure*1234", imported["new1@example.com"].hashed_password)
+    assert all(u.role == UserRole.ANONYMOUS and not u.email_verified and u.verification_token for u in imported.values())
+    assert report.rows[0].id == imported["new1@example.com"].id
+
+async def test_import_rejects_too_many_rows(db_session, monkeypatch):
+    monkeypatch.setattr(user_import_service.settings, "bulk_import_max_rows", 1)
+    with pytest.raises(BulkImportTooLarge):
+        await UserImportService.import_users(db_session, records(
+            {"email": "a@example.com", "password": "Secure*1234"},
+            {"email": "b@example.com", "password": "Secure*1234"},
+        ))
+
+async def test_send_verification_emails_continues_after_failure(email_service):
+    email_service.send_verification_email.side_effect = [RuntimeError("smtp down"), None]
+    users = [SimpleNamespace(id=uuid4()), SimpleNamespace(id=uuid4())]
+    await UserImportService.send_verification_emails(email_service, users)
+    assert email_service.send_verification_email.call_count == 2
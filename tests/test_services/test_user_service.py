@@ -1,10 +1,20 @@
-from builtins import range
+from builtins import hasattr, len, next, range, sorted, sum
+import asyncio
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
 import pytest
-from sqlalchemy import select
+from sqlalchemy import event, select
 from app.dependencies import get_settings
 from app.models.user_model import User, UserRole
-from app.services.user_service import UserService
+from app.schemas.user_schemas import AutocompleteField, SortOrder, UserListFilters, UserSortField
+from app.services.user_count_service import CountStrategy
+from app.services import user_service
+from app.services.nickname_service import nickname_pool
+from app.services.user_service import LoginOutcome, UserExistsError, UserService
 from app.utils.nickname_gen import generate_nickname
+from app.utils.login_attempts import login_attempt_tracker
+from app.utils.security import hash_password, needs_rehash, verify_password
+from tests.conftest import AsyncTestingSessionLocal, engine
 
 pytestmark = pytest.mark.asyncio
 
@@ -20,6 +30,72 @@ async def test_create_user_with_valid_data(db_session, email_service):
     assert user is not None
     assert user.email == user_data["email"]
 
+# Test that a pooled nickname taken in the meantime is replaced by the next one
+async def test_create_user_retries_taken_nickname(db_session, email_service, user, mocker):
+    claim = mocker.patch.object(user_service.nickname_pool, "claim", side_effect=[user.nickname, "fresh_nickname_1"])
+    conflicts = user_service.nickname_pool.conflicts
+    created = await UserService.create(db_session, {
+        "email": "pooled_nickname@example.com",
+        "password": "ValidPassword123!",
+        "role": UserRole.ANONYMOUS.name,
+    }, email_service)
+    assert created.nickname == "fresh_nickname_1"
+    assert claim.call_count == 2
+    assert user_service.nickname_pool.conflicts == conflicts + 1
+
+def _count_statements():
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine.sync_engine, "before_cursor_execute", listener)
+    return statements, lambda: event.remove(engine.sync_engine, "before_cursor_execute", listener)
+
+def _new_user_data(email):
+    return {"email": email, "password": "ValidPassword123!", "role": UserRole.AUTHENTICATED.name}
+
+# Test that creating a user with a registered email is reported as such
+async def test_create_user_duplicate_email(db_session, email_service, user, mocker):
+    hash_password = mocker.patch.object(user_service, "async_hash_password")
+    with pytest.raises(UserExistsError):
+        await UserService.create(db_session, _new_user_data(user.email), email_service)
+    # A known email is rejected before any hashing work
+    hash_password.assert_not_called()
+
+# Test that only the first user becomes admin, even when the first signups race
+async def test_first_user_is_admin_once(email_service):
+    async with AsyncTestingSessionLocal() as first, AsyncTestingSessionLocal() as second:
+        users = await asyncio.gather(
+            UserService.create(first, _new_user_data("first@example.com"), email_service),
+            UserService.create(second, _new_user_data("second@example.com"), email_service),
+        )
+    assert sorted(user.role.name for user in users) == ["ADMIN", "ANONYMOUS"]
+    admin = next(user for user in users if user.role == UserRole.ADMIN)
+    assert admin.email_verified and admin.verification_token is None
+
+# Test that once users exist, a create is an email lookup and a single INSERT ... RETURNING
+async def test_create_user_statement_count(db_session, email_service, user):
+    await UserService.create(db_session, _new_user_data("warmup@example.com"), email_service)
+    await nickname_pool.refill(db_session)
+    statements, stop = _count_statements()
+    try:
+        created = await UserService.create(db_session, _new_user_data("counted@example.com"), email_service)
+    finally:
+        stop()
+    assert created.role == UserRole.ANONYMOUS
+    assert created.created_at is not None
+    # The email pre-check, then the insert
+    assert len(statements) == 2 and statements[0].startswith("SELECT users.id") and statements[1].startswith("INSERT INTO users")
+
+# Test that the email pre-check's transaction has ended before the password is hashed
+async def test_create_user_releases_connection_before_hashing(db_session, email_service, monkeypatch):
+    in_transaction = []
+    hash_password = user_service.async_hash_password
+    async def checking_hash(password):
+        in_transaction.append(db_session.in_transaction())
+        return await hash_password(password)
+    monkeypatch.setattr(user_service, "async_hash_password", checking_hash)
+    assert await UserService.create(db_session, _new_user_data("unhurried@example.com"), email_service) is not None
+    assert in_transaction == [False]
+
 # Test creating a user with invalid data
 async def test_create_user_with_invalid_data(db_session, email_service):
     user_data = {
@@ -35,12 +111,112 @@ async def test_get_by_id_user_exists(db_session, user):
     retrieved_user = await UserService.get_by_id(db_session, user.id)
     assert retrieved_user.id == user.id
 
+# Test that lookups do not commit
+async def test_lookups_do_not_commit(db_session, user, mocker):
+    commit = mocker.spy(db_session, "commit")
+    await UserService.get_by_id(db_session, user.id)
+    await UserService.get_by_email(db_session, user.email)
+    await UserService.list_users(db_session)
+    assert commit.call_count == 0
+
 # Test fetching a user by ID when the user does not exist
 async def test_get_by_id_user_does_not_exist(db_session):
     non_existent_user_id = "non-existent-id"
     retrieved_user = await UserService.get_by_id(db_session, non_existent_user_id)
     assert retrieved_user is None
 
+# Test fetching profiles of many users by id and email
+async def test_get_profiles(db_session, users_with_same_role_50_users):
+    by_id, by_email = users_with_same_role_50_users[0], users_with_same_role_50_users[1]
+    rows = await UserService.get_profiles(db_session, [by_id.id, uuid4()], [by_email.email])
+    assert sorted(row.email for row in rows) == sorted([by_id.email, by_email.email])
+    assert await UserService.get_profiles(db_session) == []
+
+# Test filtering users in the database ("locked managers created this week")
+async def test_list_users_with_filters(db_session, manager_user, locked_user):
+    locked_manager = User(
+        nickname=generate_nickname(), email="locked_manager@example.com", hashed_password="hashed",
+        role=UserRole.MANAGER, is_locked=True,
+    )
+    db_session.add(locked_manager)
+    await db_session.commit()
+    filters = UserListFilters(role=UserRole.MANAGER, is_locked=True, created_after=datetime.now(timezone.utc) - timedelta(days=7))
+    users = await UserService.list_users(db_session, filters=filters)
+    assert [user.id for user in users] == [locked_manager.id]
+    assert await UserService.count_users(db_session, filters) == (1, CountStrategy.EXACT)
+    unlocked = await UserService.list_users(db_session, filters=UserListFilters(is_locked=False))
+    assert [user.id for user in unlocked] == [manager_user.id]
+    later = await UserService.list_users(db_session, filters=UserListFilters(created_after=datetime.now(timezone.utc) + timedelta(days=1)))
+    assert later == []
+
+# Test sorting users
+async def test_list_users_sorted(db_session, users_with_same_role_50_users):
+    users = await UserService.list_users(db_session, limit=50, sort_by=UserSortField.EMAIL, order=SortOrder.DESC)
+    emails = [user.email for user in users]
+    assert emails == sorted((user.email for user in users_with_same_role_50_users), reverse=True)
+
+# Test that hot queries send the same SQL whatever their arguments, so one prepared statement serves them
+async def test_cached_statements_reuse_sql_text(db_session, users_with_same_role_50_users):
+    first, second = users_with_same_role_50_users[:2]
+    statements, stop = _count_statements()
+    try:
+        assert (await UserService.get_by_email(db_session, first.email)).id == first.id
+        assert (await UserService.get_by_email(db_session, second.email)).id == second.id
+        page_1 = await UserService.list_users(db_session, skip=0, limit=5)
+        page_2 = await UserService.list_users(db_session, skip=5, limit=5)
+    finally:
+        stop()
+    assert len(statements) == 4
+    assert statements[0] == statements[1] and statements[2] == statements[3]
+    assert not {user.id for user in page_1} & {user.id for user in page_2}
+    # Filters extend a copy of the cached statement, never the statement itself
+    await UserService.list_users(db_session, filters=UserListFilters(is_locked=True))
+    assert len(await UserService.list_users(db_session, limit=50)) == 50
+
+# Test that a filtered keyset page only contains matching users
+async def test_list_users_page_with_filters(db_session, users_with_same_role_50_users, admin_user):
+    users, next_cursor, _ = await UserService.list_users_page(db_session, 10, None, UserListFilters(role=UserRole.ADMIN))
+    assert [user.id for user in users] == [admin_user.id]
+    assert next_cursor is None
+
+async def _add_users(db_session, *nicknames):
+    users = [
+        User(nickname=nickname, email=f"{nickname}@example.com", first_name=nickname.title(), hashed_password="hashed", role=UserRole.AUTHENTICATED)
+        for nickname in nicknames
+    ]
+    db_session.add_all(users)
+    await db_session.commit()
+    return users
+
+# Test prefix autocomplete on nicknames and emails
+async def test_autocomplete(db_session):
+    await _add_users(db_session, "alice_2", "alice_1", "alicia", "Alina", "bob")
+    suggestions = await UserService.autocomplete(db_session, "ali")
+    assert [row.value for row in suggestions] == ["alice_1", "alice_2", "alicia"]
+    assert len(await UserService.autocomplete(db_session, "ali", limit=2)) == 2
+    by_email = await UserService.autocomplete(db_session, "bob@", AutocompleteField.EMAIL)
+    assert [row.value for row in by_email] == ["bob@example.com"]
+    assert await UserService.autocomplete(db_session, "zed") == []
+
+# Test autocomplete prefixes whose last code point cannot simply be incremented
+async def test_autocomplete_prefix_at_code_point_limits(db_session):
+    await _add_users(db_session, "ali\U0010ffffx", "alj")
+    suggestions = await UserService.autocomplete(db_session, "ali\U0010ffff")
+    assert [row.value for row in suggestions] == ["ali\U0010ffffx"]
+    assert await UserService.autocomplete(db_session, "ali\ud7ff") == []
+    assert await UserService.autocomplete(db_session, "\U0010ffff") == []
+    assert user_service._prefix_upper_bound("a\ud7ff") == "a\ue000"
+    assert user_service._prefix_upper_bound("\U0010ffff\U0010ffff") is None
+
+# Test similarity search across nickname, email and names
+async def test_search_ranks_by_similarity(db_session, pg_trgm):
+    await _add_users(db_session, "margaret", "margarita", "bob")
+    results = await UserService.search(db_session, "margaret")
+    assert [row.nickname for row in results] == ["margaret", "margarita"]
+    assert results[0].score == 1
+    # Small typos still match
+    assert [row.nickname for row in await UserService.search(db_session, "margeret")][0] == "margaret"
+
 # Test fetching a user by nickname when the user exists
 async def test_get_by_nickname_user_exists(db_session, user):
     retrieved_user = await UserService.get_by_nickname(db_session, user.nickname)
@@ -68,6 +244,29 @@ async def test_update_user_valid_data(db_session, user):
     assert updated_user is not None
     assert updated_user.email == new_email
 
+# Test that an update is a single UPDATE ... RETURNING of the profile columns
+async def test_update_user_is_one_statement(db_session, user):
+    statements, stop = _count_statements()
+    try:
+        updated_user = await UserService.update(db_session, user.id, {"first_name": "Renamed"})
+    finally:
+        stop()
+    assert updated_user.first_name == "Renamed" and updated_user.id == user.id
+    assert len(statements) == 1 and statements[0].startswith("UPDATE users") and "RETURNING" in statements[0]
+    assert not hasattr(updated_user, "hashed_password")
+
+# Test updating a user who does not exist
+async def test_update_user_does_not_exist(db_session):
+    assert await UserService.update(db_session, uuid4(), {"first_name": "Nobody"}) is None
+
+# Test that the professional status reports whether it changed
+async def test_set_professional_status(db_session, user):
+    updated_user, changed = await UserService.set_professional_status(db_session, user.id, True)
+    assert updated_user.is_professional is True and changed is True
+    updated_user, changed = await UserService.set_professional_status(db_session, user.id, True)
+    assert updated_user.is_professional is True and changed is False
+    assert await UserService.set_professional_status(db_session, uuid4(), True) == (None, False)
+
 # Test updating a user with invalid data
 async def test_update_user_invalid_data(db_session, user):
     updated_user = await UserService.update(db_session, user.id, {"email": "invalidemail"})
@@ -134,6 +333,15 @@ async def test_login_user_successful(db_session, verified_user):
     logged_in_user = await UserService.login_user(db_session, user_data["email"], user_data["password"])
     assert logged_in_user is not None
 
+# Test that a successful login upgrades a hash made with outdated parameters
+async def test_login_user_rehashes_outdated_hash(db_session, verified_user):
+    verified_user.hashed_password = hash_password("MySuperPassword$1234", 4)
+    await db_session.commit()
+    logged_in_user = await UserService.login_user(db_session, verified_user.email, "MySuperPassword$1234")
+    assert logged_in_user is not None
+    assert not needs_rehash(logged_in_user.hashed_password)
+    assert verify_password("MySuperPassword$1234", logged_in_user.hashed_password)
+
 # Test user login with incorrect email
 async def test_login_user_incorrect_email(db_session):
     user = await UserService.login_user(db_session, "nonexistentuser@noway.com", "Password123!")
@@ -153,6 +361,72 @@ async def test_account_lock_after_failed_logins(db_session, verified_user):
     is_locked = await UserService.is_account_locked(db_session, verified_user.email)
     assert is_locked, "The account should be locked after the maximum number of failed login attempts."
 
+# Test that parallel bad attempts are all counted and lock the account without a write per failure
+async def test_concurrent_failed_logins_are_all_counted(db_session, verified_user):
+    attempts = get_settings().max_login_attempts + 2
+
+    async def attempt():
+        async with AsyncTestingSessionLocal() as session:
+            return await UserService.authenticate(session, verified_user.email, "wrongpassword")
+
+    outcomes = await asyncio.gather(*(attempt() for _ in range(attempts)))
+    failures = sum(1 for outcome, _ in outcomes if outcome is LoginOutcome.INVALID_CREDENTIALS)
+    result = await db_session.execute(
+        select(User.failed_login_attempts, User.is_locked).where(User.id == verified_user.id)
+    )
+    failed_login_attempts, is_locked = result.one()
+    assert is_locked
+    # Only the locking failure is persisted, carrying the count at the time of the lock
+    assert get_settings().max_login_attempts <= failed_login_attempts <= failures
+
+# Test that failures below the limit are not written to the users table
+async def test_failed_login_below_limit_is_not_persisted(db_session, verified_user):
+    await UserService.authenticate(db_session, verified_user.email, "wrongpassword")
+    result = await db_session.execute(
+        select(User.failed_login_attempts, User.is_locked).where(User.id == verified_user.id)
+    )
+    failed_login_attempts, is_locked = result.one()
+    assert not failed_login_attempts
+    assert not is_locked
+
+# Test that no transaction, and so no pooled connection, is held while the password is checked
+async def test_authenticate_releases_connection_before_verifying(db_session, verified_user, monkeypatch):
+    in_transaction = []
+    verify = user_service.async_verify_password
+    async def checking_verify(password, hashed_password):
+        in_transaction.append(db_session.in_transaction())
+        return await verify(password, hashed_password)
+    monkeypatch.setattr(user_service, "async_verify_password", checking_verify)
+    outcome, _ = await UserService.authenticate(db_session, verified_user.email, "MySuperPassword$1234")
+    assert outcome is LoginOutcome.SUCCESS
+    assert in_transaction == [False]
+
+# Test that a client IP failing across many accounts is throttled
+async def test_authenticate_throttles_ip(db_session, verified_user, monkeypatch):
+    monkeypatch.setattr(login_attempt_tracker, "max_ip_failures", 2)
+    for i in range(2):
+        await UserService.authenticate(db_session, f"nobody{i}@example.com", "wrongpassword", "10.0.0.1")
+    outcome, retry_after = await UserService.authenticate(db_session, verified_user.email, "MySuperPassword$1234", "10.0.0.1")
+    assert outcome is LoginOutcome.THROTTLED
+    assert 1 <= retry_after <= login_attempt_tracker.window_seconds + 1
+    outcome, user = await UserService.authenticate(db_session, verified_user.email, "MySuperPassword$1234", "10.0.0.2")
+    assert outcome is LoginOutcome.SUCCESS
+
+# Test that a successful login resets the counter and reports success
+async def test_authenticate_success_resets_failed_attempts(db_session, verified_user):
+    verified_user.failed_login_attempts = 1
+    await db_session.commit()
+    outcome, user = await UserService.authenticate(db_session, verified_user.email, "MySuperPassword$1234")
+    assert outcome is LoginOutcome.SUCCESS
+    assert user.failed_login_attempts == 0
+    assert user.last_login_at is not None
+
+# Test that a locked account is reported as locked
+async def test_authenticate_locked_user(db_session, locked_user):
+    outcome, user = await UserService.authenticate(db_session, locked_user.email, "MySuperPassword$1234")
+    assert outcome is LoginOutcome.LOCKED
+    assert user is None
+
 # Test resetting a user's password
 async def test_reset_password(db_session, user):
     new_password = "NewPassword123!"
@@ -173,3 +447,38 @@ async def test_unlock_user_account(db_session, locked_user):
     assert unlocked, "The account should be unlocked"
     refreshed_user = await UserService.get_by_id(db_session, locked_user.id)
     assert not refreshed_user.is_locked, "The user should no longer be locked"
+
+# Test that keyset pages follow (created_at, id) order in both directions
+async def test_list_users_page_walks_forward_and_back(db_session, users_with_same_role_50_users):
+    page1, next_cursor, prev_cursor = await UserService.list_users_page(db_session, limit=10)
+    assert prev_cursor is None
+    page2, next_cursor, prev_cursor = await UserService.list_users_page(db_session, limit=10, cursor=next_cursor)
+    keys = [(user.created_at, user.id) for user in page1 + page2]
+    assert keys == sorted(keys)
+    back, _, first_prev = await UserService.list_users_page(db_session, limit=10, cursor=prev_cursor)
+    assert [user.id for user in back] == [user.id for user in page1]
+    assert first_prev is None
+
+# Test that offset pages are ordered consistently with keyset pages
+async def test_list_users_offset_is_stably_ordered(db_session, users_with_same_role_50_users):
+    by_offset = await UserService.list_users(db_session, skip=0, limit=50)
+    by_keyset, _, _ = await UserService.list_users_page(db_session, limit=50)
+    assert [user.id for user in by_offset] == [user.id for user in by_keyset]
+
+# Test that read paths select only the profile columns, never secrets
+async def test_read_paths_do_not_load_secrets(db_session, user, users_with_same_role_50_users):
+    profile = await UserService.get_profile(db_session, user.id)
+    assert profile.email == user.email
+    assert "hashed_password" not in profile._fields
+    assert "verification_token" not in profile._fields
+    for rows in (await UserService.list_users(db_session, limit=5), (await UserService.list_users_page(db_session, limit=5))[0]):
+        assert len(rows) == 5
+        assert "hashed_password" not in rows[0]._fields
+    assert await UserService.get_profile(db_session, uuid4()) is None
+    assert await UserService.get_id_by_email(db_session, user.email) == user.id
+
+# Test that streaming yields every user in batches of the requested size
+async def test_stream_profiles_in_batches(db_session, users_with_same_role_50_users):
+    batches = [batch async for batch in UserService.stream_profiles(db_session, batch_size=20)]
+    assert [len(batch) for batch in batches] == [20, 20, 10]
+    assert "hashed_password" not in batches[0][0]._fields
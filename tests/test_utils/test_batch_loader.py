@@ -0,0 +1,53 @@
+import asyncio
+import pytest
+from app.utils.batch_loader import BatchLoader
+
+@pytest.mark.asyncio
+async def test_concurrent_loads_share_one_batch():
+    calls = []
+
+    async def batch_fn(keys):
+        calls.append(sorted(keys))
+        return {key: key * 10 for key in keys if key != 3}
+
+    loader = BatchLoader(batch_fn)
+    results = await asyncio.gather(loader.load(1), loader.load(2), loader.load(2), loader.load(3))
+    assert results == [10, 20, 20, None]
+    assert calls == [[1, 2, 3]]
+    assert (loader.loads, loader.batches) == (4, 1)
+
+@pytest.mark.asyncio
+async def test_sequential_loads_use_separate_batches():
+    async def batch_fn(keys):
+        return {key: key for key in keys}
+
+    loader = BatchLoader(batch_fn)
+    assert await loader.load(1) == 1
+    assert await loader.load(2) == 2
+    assert loader.batches == 2
+
+@pytest.mark.asyncio
+async def test_batch_error_reaches_every_caller():
+    async def batch_fn(keys):
+        raise RuntimeError("boom")
+
+    loader = BatchLoader(batch_fn)
+    results = await asyncio.gather(loader.load(1), loader.load(2), return_exceptions=True)
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+@pytest.mark.asyncio
+async def test_delay_collects_loads_from_later_ticks():
+    calls = []
+
+    async def batch_fn(keys):
+        calls.append(sorted(keys))
+        return {key: key for key in keys}
+
+    loader = BatchLoader(batch_fn, delay=0.05)
+
+    async def load_later(key):
+        await asyncio.sleep(0)
+        return await loader.load(key)
+
+    assert await asyncio.gather(loader.load(1), load_later(2)) == [1, 2]
+    assert calls == [[1, 2]]
@@ -0,0 +1,17 @@
+from app.utils.client_ip import ClientAddressResolver
+
+def test_untrusted_peer_is_the_client():
+    resolver = ClientAddressResolver(["10.0.0.0/8"])
+    assert resolver.resolve("203.0.113.9", "198.51.100.1") == "203.0.113.9"
+    assert ClientAddressResolver().resolve("10.0.0.2", "198.51.100.1") == "10.0.0.2"
+
+def test_trusted_peer_forwards_the_nearest_untrusted_hop():
+    resolver = ClientAddressResolver(["10.0.0.0/8"])
+    # The client prepended a spoofed hop; only the hop our proxies saw is believed
+    assert resolver.resolve("10.0.0.2", "1.2.3.4, 198.51.100.1, 10.0.0.3") == "198.51.100.1"
+    assert resolver.resolve("10.0.0.2", None) == "10.0.0.2"
+
+def test_ignores_hops_that_are_not_addresses():
+    resolver = ClientAddressResolver(["10.0.0.0/8"])
+    assert resolver.resolve("10.0.0.2", "unknown") == "unknown"
+    assert not resolver.is_trusted("unknown")
@@ -0,0 +1,36 @@
+import asyncio
+import pytest
+from app.utils.concurrency import ConcurrencyLimitExceeded, ConcurrencyLimiter
+
+@pytest.mark.asyncio
+async def test_limiter_admits_up_to_max_in_flight():
+    limiter = ConcurrencyLimiter("test", max_in_flight=2, max_wait=0.01)
+    await limiter.acquire()
+    await limiter.acquire()
+    assert limiter.stats()["in_flight"] == 2
+    with pytest.raises(ConcurrencyLimitExceeded):
+        await limiter.acquire()
+    limiter.release()
+    limiter.release()
+    assert limiter.stats()["in_flight"] == 0
+    assert limiter.stats()["timeouts"] == 1
+
+@pytest.mark.asyncio
+async def test_limiter_rejects_when_queue_full():
+    limiter = ConcurrencyLimiter("test", max_in_flight=1, max_wait=1.0, max_queue=0)
+    async with limiter.slot():
+        with pytest.raises(ConcurrencyLimitExceeded):
+            await limiter.acquire()
+    assert limiter.stats()["rejected"] == 1
+
+@pytest.mark.asyncio
+async def test_limiter_waiter_admitted_after_release():
+    limiter = ConcurrencyLimiter("test", max_in_flight=1, max_wait=1.0)
+    await limiter.acquire()
+    waiter = asyncio.ensure_future(limiter.acquire())
+    await asyncio.sleep(0.01)
+    assert limiter.stats()["queued"] == 1
+    limiter.release()
+    await waiter
+    assert limiter.stats()["in_flight"] == 1
+    limiter.release()
@@ -0,0 +1,16 @@
+from datetime import datetime, timezone
+from uuid import uuid4
+import pytest
+from app.utils.cursor import NEXT, PREV, InvalidCursorError, decode_cursor, encode_cursor
+
+def test_cursor_round_trip():
+    created_at = datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=timezone.utc)
+    user_id = uuid4()
+    cursor = encode_cursor(created_at, user_id, PREV)
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (created_at, user_id, PREV)
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", "e30", encode_cursor(datetime.now(timezone.utc), uuid4(), NEXT)[:-4]])
+def test_invalid_cursor(cursor):
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(cursor)
@@ -0,0 +1,54 @@
+import pytest
+from app.utils.login_attempts import InMemoryLoginAttemptBackend, LoginAttemptTracker, RedisLoginAttemptBackend, _build_backend
+from settings.config import settings
+
+@pytest.mark.asyncio
+async def test_window_drops_old_failures():
+    backend = InMemoryLoginAttemptBackend(shards=2)
+    assert await backend.add("email:a@example.com", 100.0, 60) == 1
+    assert await backend.add("email:a@example.com", 130.0, 60) == 2
+    assert await backend.add("email:a@example.com", 170.0, 60) == 2
+    assert await backend.count("email:a@example.com", 231.0, 60) == (0, None)
+
+@pytest.mark.asyncio
+async def test_backend_evicts_least_recent_keys():
+    backend = InMemoryLoginAttemptBackend(shards=1, max_keys_per_shard=2)
+    await backend.add("a", 1.0, 60)
+    await backend.add("b", 2.0, 60)
+    await backend.add("c", 3.0, 60)
+    assert backend.size() == 2
+    assert await backend.count("a", 4.0, 60) == (0, None)
+
+@pytest.mark.asyncio
+async def test_tracker_counts_per_email_case_insensitively():
+    tracker = LoginAttemptTracker(InMemoryLoginAttemptBackend(), window_seconds=60, max_ip_failures=10)
+    assert await tracker.record_failure("User@Example.com") == 1
+    assert await tracker.record_failure("user@example.com") == 2
+    await tracker.reset("USER@example.com")
+    assert await tracker.record_failure("user@example.com") == 1
+
+@pytest.mark.asyncio
+async def test_tracker_throttles_ip_after_limit():
+    tracker = LoginAttemptTracker(InMemoryLoginAttemptBackend(), window_seconds=60, max_ip_failures=2)
+    assert await tracker.ip_retry_after("10.0.0.1") is None
+    await tracker.record_failure("a@example.com", "10.0.0.1")
+    await tracker.record_failure("b@example.com", "10.0.0.1")
+    retry_after = await tracker.ip_retry_after("10.0.0.1")
+    assert 1 <= retry_after <= 61
+    assert await tracker.ip_retry_after("10.0.0.2") is None
+    assert tracker.stats()["ip_throttled"] == 1
+
+def test_auto_backend_is_shared_across_several_workers(monkeypatch):
+    pytest.importorskip("redis")
+    monkeypatch.setattr(settings, "login_attempt_redis_url", "redis://localhost:6379/0")
+    monkeypatch.delenv("WEB_CONCURRENCY", raising=False)
+    assert isinstance(_build_backend("auto"), InMemoryLoginAttemptBackend)
+    monkeypatch.setenv("WEB_CONCURRENCY", "4")
+    assert isinstance(_build_backend("auto"), RedisLoginAttemptBackend)
+
+def test_auto_backend_falls_back_to_memory_without_redis(monkeypatch):
+    monkeypatch.setattr(settings, "login_attempt_redis_url", "")
+    monkeypatch.setenv("WEB_CONCURRENCY", "4")
+    assert isinstance(_build_backend("auto"), InMemoryLoginAttemptBackend)
+    with pytest.raises(ValueError):
+        _build_backend("redis")
@@ -0,0 +1,27 @@
+import re
+import pytest
+from app.utils.nickname_gen import ADJECTIVES, ANIMALS, NicknameGenerator, generate_nickname
+
+def test_generated_nicknames_follow_nickname_rules():
+    for _ in range(100):
+        nickname = generate_nickname()
+        assert re.match(r'^[\w-]+$', nickname) and 3 <= len(nickname) <= 50
+
+def test_default_word_lists_are_large():
+    generator = NicknameGenerator(ADJECTIVES, ANIMALS, 9999)
+    assert generator.capacity == len(ADJECTIVES) * len(ANIMALS) * 10000
+    assert generator.capacity > 10_000_000
+
+def test_generate_many_returns_distinct_nicknames():
+    assert len(NicknameGenerator(["red", "blue"], ["cat", "dog"], 9999).generate_many(30)) == 30
+    # Only 40 names exist, so asking for more returns at most those
+    assert len(NicknameGenerator(["red", "blue"], ["cat", "dog"], 9).generate_many(100)) <= 40
+
+@pytest.mark.parametrize("adjectives, animals, number_max", [
+    ([], ["cat"], 9),
+    (["bad word"], ["cat"], 9),
+    (["x" * 30], ["y" * 20], 9),
+])
+def test_invalid_word_lists_rejected(adjectives, animals, number_max):
+    with pytest.raises(ValueError):
+        NicknameGenerator(adjectives, animals, number_max)
@@ -0,0 +1,42 @@
+import pytest
+from app.main import app
+from app.models.user_model import UserRole
+from app.utils.permissions import (
+    ROUTE_POLICIES, Permission, permissions_for, role_bit, roles_mask, route_permission
+)
+
+def test_admin_has_every_permission():
+    for permission in Permission:
+        assert permissions_for("ADMIN") & permission == permission
+
+def test_manager_cannot_view_metrics_or_revoke_sessions():
+    assert permissions_for("MANAGER") & Permission.READ_USERS
+    assert not permissions_for("MANAGER") & Permission.VIEW_METRICS
+    assert not permissions_for("MANAGER") & Permission.REVOKE_SESSIONS
+
+def test_authenticated_only_updates_own_profile():
+    assert permissions_for("AUTHENTICATED") == int(Permission.UPDATE_OWN_PROFILE)
+
+def test_role_names_are_case_insensitive():
+    assert permissions_for("admin") == permissions_for("ADMIN")
+    assert permissions_for("Manager") == permissions_for("MANAGER")
+    assert role_bit("admin") == role_bit("ADMIN")
+
+def test_unknown_role_has_no_permissions():
+    assert permissions_for("USER") == 0
+    assert permissions_for("") == 0
+    assert role_bit("USER") == 0
+
+def test_roles_mask_combines_roles():
+    mask = roles_mask(["ADMIN", "MANAGER"])
+    assert role_bit("ADMIN") & mask
+    assert role_bit("MANAGER") & mask
+    assert not role_bit(UserRole.AUTHENTICATED.name) & mask
+
+def test_route_without_policy_fails_fast():
+    with pytest.raises(KeyError):
+        route_permission("not_a_route")
+
+def test_every_policy_names_an_existing_route():
+    route_names = {route.name for route in app.routes}
+    assert set(ROUTE_POLICIES) <= route_names
@@ -0,0 +1,44 @@
+import pytest
+from app.utils.record_formats import parse_csv, parse_ndjson, record_format
+
+async def chunks(*parts):
+    for part in parts:
+        yield part
+
+async def collect(records):
+    return [record async for record in records]
+
+def test_record_format():
+    assert record_format("application/x-ndjson; charset=utf-8") == "ndjson"
+    assert record_format("text/csv") == "csv"
+    assert record_format("application/json") is None
+    assert record_format(None) is None
+
+async def test_parse_ndjson_across_chunk_boundaries():
+    records = await collect(parse_ndjson(chunks(b'{"email": "a@exa', b'mple.com"}\n\n[1]\nnot json\r\n{"email": "b@example.com"}')))
+    assert records[0] == (1, {"email": "a@example.com"}, None)
+    assert records[1][0] == 2 and records[1][1] is None
+    assert records[2][0] == 3 and records[2][2].startswith("Invalid JSON")
+    assert records[3] == (4, {"email": "b@example.com"}, None)
+
+async def test_parse_csv_with_header():
+    body = b'\xef\xbb\xbfemail,first_name,bio\r\na@example.com,Ann,"Likes, commas"\nb@example.com,,\nc@example.com\n'
+    records = await collect(parse_csv(chunks(body[:20], body[20:])))
+    assert records[0] == (1, {"email": "a@example.com", "first_name": "Ann", "bio": "Likes, commas"}, None)
+    assert records[1] == (2, {"email": "b@example.com"}, None)
+    assert records[2] == (3, None, "Expected 3 fields, got 1")
+
+async def test_parse_ndjson_reports_overlong_line_without_buffering_it():
+    # 1 MB without a newline, sent in small chunks, followed by a valid row
+    body = [b"x" * 4096] * 256 + [b'\n{"email": "a@example.com"}\n']
+    records = await collect(parse_ndjson(chunks(*body), max_line_bytes=1024))
+    assert records[0] == (1, None, "Line exceeds 1024 bytes")
+    assert records[1] == (2, {"email": "a@example.com"}, None)
+
+async def test_parse_ndjson_overlong_body_without_newlines():
+    records = await collect(parse_ndjson(chunks(*[b"x" * 4096] * 256), max_line_bytes=1024))
+    assert records == [(1, None, "Line exceeds 1024 bytes")]
+
+async def test_parse_csv_rejects_overlong_header():
+    with pytest.raises(ValueError):
+        await collect(parse_csv(chunks(b"email," * 1000 + b"\n"), max_line_bytes=1024))